@@ -1,10 +1,7 @@
-from collections import defaultdict
-
-from scipy.stats import fisher_exact
-
+from analysis.fisher import fisher_cache
 from analysis.models import FoodLogEntry, IngredientSymptomMetrics, SymptomLogEntry
 from analysis.per_ingredient_counts import count_ingredient_occurrences
-from analysis.search import SymptomFoodWindowResult, get_food_logs_within_time_window_before_symptoms
+from analysis.search import iter_symptom_window_spans
 
 
 def get_analysis(
@@ -20,46 +17,74 @@ def get_analysis(
         result[symptom_name] = {}
         total_in_window = foods_in_windows[symptom_name]
 
-        for ingredient, (a, intensities) in ingredient_data.items():
+        for ingredient, (a, intensity_sum, intensity_count) in ingredient_data.items():
             ingredient_total = ingredient_counts.get(ingredient, 0)
             if ingredient_total == 0:
                 continue
 
-            b = ingredient_total - a
-            c = total_in_window - a
-            d = (total_food_events - ingredient_total) - c
+            result[symptom_name][ingredient] = compute_metrics(
+                a=a,
+                ingredient_total=ingredient_total,
+                total_in_window=total_in_window,
+                total_food_events=total_food_events,
+                intensity_sum=intensity_sum,
+                intensity_count=intensity_count,
+            )
 
-            # ── metrics ──
-            # trigger_rate: "when you eat X, how often does symptom follow?"
-            trigger_rate = a / ingredient_total
+    return result
 
-            # base_rate: "when you DON'T eat X, how often does symptom follow?"
-            unexposed_total = total_food_events - ingredient_total
-            base_rate = c / unexposed_total if unexposed_total > 0 else 0.0
 
-            _, p_value = fisher_exact([[a, b], [c, d]], alternative="greater")
+def compute_metrics(
+    a: int,
+    ingredient_total: int,
+    total_in_window: int,
+    total_food_events: int,
+    intensity_sum: int,
+    intensity_count: int,
+) -> IngredientSymptomMetrics:
+    """
+    Derive the metrics for one (symptom, ingredient) cell from its raw counts.
+
+    Args:
+        a: food events containing the ingredient that fell inside a symptom window
+        ingredient_total: food events containing the ingredient
+        total_in_window: distinct food events inside any window of this symptom
+        total_food_events: all food events for the user
+        intensity_sum / intensity_count: summed and counted symptom intensities over the a exposures
+    """
+    b = ingredient_total - a
+    c = total_in_window - a
+    d = (total_food_events - ingredient_total) - c
 
-            avg_intensity = sum(intensities) / len(intensities) if intensities else 0.0
+    # ── metrics ──
+    # trigger_rate: "when you eat X, how often does symptom follow?"
+    trigger_rate = a / ingredient_total
 
-            result[symptom_name][ingredient] = IngredientSymptomMetrics(
-                exposures=a,
-                trigger_rate=round(trigger_rate, 4),
-                base_rate=round(base_rate, 4),
-                fishers_p_value=round(float(p_value), 6),
-                average_intensity=round(avg_intensity, 2),
-            )
+    # base_rate: "when you DON'T eat X, how often does symptom follow?"
+    unexposed_total = total_food_events - ingredient_total
+    base_rate = c / unexposed_total if unexposed_total > 0 else 0.0
 
-    return result
+    p_value = fisher_cache.p_value(a, b, c, d)
+
+    avg_intensity = intensity_sum / intensity_count if intensity_count else 0.0
+
+    return IngredientSymptomMetrics(
+        exposures=a,
+        trigger_rate=round(trigger_rate, 4),
+        base_rate=round(base_rate, 4),
+        fishers_p_value=round(float(p_value), 6),
+        average_intensity=round(avg_intensity, 2),
+    )
 
 
 def get_food_symptom_counts(
     food_logs: list[FoodLogEntry],
     symptom_logs: list[SymptomLogEntry],
     time_window_hours: float,
-) -> tuple[dict[str, dict[str, list]], dict[str, int]]:
+) -> tuple[dict[str, dict[str, list[int]]], dict[str, int]]:
     """
     Returns:
-        counts: symptom_name -> ingredient -> [co_occurrence_count, [intensities]]
+        counts: symptom_name -> ingredient -> [co_occurrence_count, intensity_sum, intensity_count]
         foods_in_windows: symptom_name -> distinct food events found across all windows
                           (needed for computing c in the contingency table)
 
@@ -67,39 +92,54 @@ def get_food_symptom_counts(
     multiple overlapping symptom windows (e.g. two headaches 30 min apart). Intensities
     from every overlapping symptom are still collected so the average reflects all
     associated symptom events.
-    """
-    counts: dict[str, dict[str, list]] = defaultdict(lambda: defaultdict(lambda: [0, []]))
-    foods_in_windows: dict[str, int] = defaultdict(int)
 
-    window_results: list[SymptomFoodWindowResult] = get_food_logs_within_time_window_before_symptoms(
-        food_logs, symptom_logs, time_window_hours
-    )
+    Windows arrive as food-index spans from a two-pointer walk. Each span is folded
+    into per-symptom difference arrays (+1/+intensity at its start, -1/-intensity at
+    its end), so overlapping windows cost O(1) each and a single prefix pass per
+    symptom yields every food's covering-symptom count and intensity total.
+    """
+    n_foods = len(food_logs)
+    # symptom_name -> [hit_diff, intensity_diff, lowest start, highest end]
+    accumulators: dict[str, list] = {}
+
+    for symptom_log, start, end in iter_symptom_window_spans(food_logs, symptom_logs, time_window_hours):
+        if start == end:
+            continue
+
+        acc = accumulators.get(symptom_log.symptom_name)
+        if acc is None:
+            acc = accumulators[symptom_log.symptom_name] = [[0] * (n_foods + 1), [0] * (n_foods + 1), start, end]
+        hit_diff, intensity_diff = acc[0], acc[1]
+        hit_diff[start] += 1
+        hit_diff[end] -= 1
+        intensity_diff[start] += symptom_log.intensity
+        intensity_diff[end] -= symptom_log.intensity
+        acc[2] = min(acc[2], start)
+        acc[3] = max(acc[3], end)
+
+    counts: dict[str, dict[str, list[int]]] = {}
+    foods_in_windows: dict[str, int] = {}
+
+    for s_name, (hit_diff, intensity_diff, lo, hi) in accumulators.items():
+        ingredient_counts: dict[str, list[int]] = {}
+        covered_foods = 0
+        hits = intensity = 0
+
+        for food_index in range(lo, hi):
+            hits += hit_diff[food_index]
+            intensity += intensity_diff[food_index]
+            if hits == 0:
+                continue
 
-    # symptom_name -> food_object_id -> (ingredients_set, [intensities])
-    # Python list slicing returns references to the same objects, so id() is a
-    # stable, unique key for each food log entry within this call even if two
-    # entries share the same timestamp (e.g. three dishes logged at 18:00).
-    seen: dict[str, dict[int, tuple[set, list]]] = defaultdict(dict)
-
-    for window_result in window_results:
-        symp = window_result.symptom_log
-        s_name = symp.symptom_name
-
-        for food in window_result.food_logs:
-            key = id(food)
-            if key not in seen[s_name]:
-                seen[s_name][key] = (set(food.ingredients), [])
-            seen[s_name][key][1].append(symp.intensity)
-
-    counts: dict[str, dict[str, list]] = defaultdict(lambda: defaultdict(lambda: [0, []]))
-    foods_in_windows: dict[str, int] = defaultdict(int)
-
-    for s_name, food_map in seen.items():
-        foods_in_windows[s_name] = len(food_map)
-        for _ts, (ingredients, intensities) in food_map.items():
-            for ingredient in ingredients:
-                entry = counts[s_name][ingredient]
+            covered_foods += 1
+            for ingredient in set(food_logs[food_index].ingredients):
+                entry = ingredient_counts.setdefault(ingredient, [0, 0, 0])
                 entry[0] += 1
-                entry[1].extend(intensities)
+                entry[1] += intensity
+                entry[2] += hits
+
+        foods_in_windows[s_name] = covered_foods
+        if ingredient_counts:
+            counts[s_name] = ingredient_counts
 
     return counts, foods_in_windows
@@ -0,0 +1,157 @@
+"""
+Columnar, integer-coded view of food and symptom logs for the array-backed engines.
+
+FoodLogEntry keeps each food's ingredients as a list of strings, so every counting
+pass re-hashes the same names. Here ingredient names are interned once into a
+vocabulary of dense integer ids and the food events are stored CSR-style: the
+ingredient ids of food ``i`` are ``ingredient_ids[offsets[i]:offsets[i + 1]]``
+(deduplicated per food). Timestamps are int64 microseconds since the Unix epoch,
+so food and symptom columns built separately share one time axis.
+"""
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from analysis.models import FoodLogEntry, SymptomLogEntry
+
+MICROSECOND = timedelta(microseconds=1)
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+
+
+def to_epoch_microseconds(timestamps: Iterable[datetime]) -> np.ndarray:
+    """
+    Integer microseconds since the epoch — exact, and free of local-time/DST effects.
+
+    Naive timestamps are measured from a naive epoch and aware ones from UTC, so
+    differences match plain datetime arithmetic in both cases.
+    """
+    return np.fromiter(
+        ((ts - (_EPOCH if ts.tzinfo is None else _EPOCH_UTC)) // MICROSECOND for ts in timestamps),
+        dtype=np.int64,
+    )
+
+
+def hours_to_microseconds(hours: float) -> int:
+    return timedelta(hours=hours) // MICROSECOND
+
+
+class IngredientVocabulary:
+    """Interns ingredient names to dense integer ids in first-seen order."""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: list[str] = []
+        self._ids: dict[str, int] = {}
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name: str) -> int:
+        ingredient_id = self._ids.get(name)
+        if ingredient_id is None:
+            ingredient_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return ingredient_id
+
+    def id_of(self, name: str) -> int | None:
+        return self._ids.get(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+
+@dataclass
+class FoodColumns:
+    """Food events in timestamp order with their ingredients as CSR integer ids."""
+
+    timestamps: np.ndarray  # int64 epoch microseconds, one per food event
+    offsets: np.ndarray  # int64, length n_foods + 1
+    ingredient_ids: np.ndarray  # int32, distinct ids per food in first-seen order
+    vocabulary: IngredientVocabulary
+
+    @classmethod
+    def from_entries(
+        cls,
+        food_logs: list[FoodLogEntry],
+        vocabulary: IngredientVocabulary | None = None,
+    ) -> "FoodColumns":
+        """
+        Encode food logs, interning their ingredients into ``vocabulary``.
+
+        Passing a user's existing vocabulary keeps ingredient ids stable across
+        calls, so columns built from different slices of history can be combined.
+        """
+        vocabulary = vocabulary if vocabulary is not None else IngredientVocabulary()
+        offsets = np.zeros(len(food_logs) + 1, dtype=np.int64)
+        ids: list[int] = []
+        for i, log in enumerate(food_logs):
+            ids.extend(vocabulary.intern(ingredient) for ingredient in dict.fromkeys(log.ingredients))
+            offsets[i + 1] = len(ids)
+
+        return cls(
+            timestamps=to_epoch_microseconds(log.timestamp for log in food_logs),
+            offsets=offsets,
+            ingredient_ids=np.asarray(ids, dtype=np.int32),
+            vocabulary=vocabulary,
+        )
+
+    @classmethod
+    def of(cls, food_logs: "list[FoodLogEntry] | FoodColumns") -> "FoodColumns":
+        """Accept either representation; columns pass through unchanged."""
+        return food_logs if isinstance(food_logs, cls) else cls.from_entries(food_logs)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def food_index_of(self) -> np.ndarray:
+        """The food index owning each entry of ``ingredient_ids`` (COO row indices of the CSR)."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+
+    def ingredient_totals(self) -> np.ndarray:
+        """Number of food events containing each vocabulary ingredient."""
+        return np.bincount(self.ingredient_ids, minlength=len(self.vocabulary))
+
+    def ingredients_of(self, food_index: int) -> list[str]:
+        start, end = self.offsets[food_index], self.offsets[food_index + 1]
+        return [self.vocabulary.names[i] for i in self.ingredient_ids[start:end]]
+
+
+@dataclass
+class SymptomColumns:
+    """Symptom events with names coded as integer ids."""
+
+    timestamps: np.ndarray  # int64 epoch microseconds
+    name_ids: np.ndarray  # int32 index into names
+    intensities: np.ndarray  # int64
+    names: list[str]
+
+    @classmethod
+    def from_entries(cls, symptom_logs: list[SymptomLogEntry]) -> "SymptomColumns":
+        name_index: dict[str, int] = {}
+        name_ids = [name_index.setdefault(log.symptom_name, len(name_index)) for log in symptom_logs]
+        return cls(
+            timestamps=to_epoch_microseconds(log.timestamp for log in symptom_logs),
+            name_ids=np.asarray(name_ids, dtype=np.int32),
+            intensities=np.asarray([log.intensity for log in symptom_logs], dtype=np.int64),
+            names=list(name_index),
+        )
+
+    @classmethod
+    def of(cls, symptom_logs: "list[SymptomLogEntry] | SymptomColumns") -> "SymptomColumns":
+        """Accept either representation; columns pass through unchanged."""
+        return symptom_logs if isinstance(symptom_logs, cls) else cls.from_entries(symptom_logs)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def groups(self) -> Iterator[tuple[str, np.ndarray, np.ndarray]]:
+        """Yield (symptom_name, timestamps, intensities) per symptom type, each sorted by time."""
+        for name_id, name in enumerate(self.names):
+            members = np.flatnonzero(self.name_ids == name_id)
+            order = np.argsort(self.timestamps[members], kind="stable")
+            yield name, self.timestamps[members][order], self.intensities[members][order]
@@ -2,63 +2,217 @@
 Fetch food and symptom log DTOs from the database for use by the analysis algorithm.
 """
 
-from sqlalchemy import select
+import os
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from datetime import timedelta
+from uuid import UUID
+
+from sqlalchemy import Integer, String, cast, func, literal, null, select, true, union_all
 from sqlalchemy.orm import Session
 
+from analysis.incremental import ExposureCounts, WindowStatsDelta
 from analysis.models import FoodLogEntry, SymptomLogEntry
+from analysis.streaming import window_stats_stream
 from models.food import Food
 from models.food_log import FoodLog
-from models.symptom import Symptom
 from models.symptom_log import SymptomLog
 
+# Rows fetched per round trip when streaming a user's logs.
+FETCH_BATCH_SIZE = int(os.getenv("ANALYSIS_FETCH_BATCH_SIZE", "2000"))
+
+
+def iter_food_logs(db: Session, username: str, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[FoodLogEntry]:
+    """
+    Stream the user's food events in timestamp order, read column-wise without ORM hydration.
 
-def fetch_food_logs(db: Session, username: str) -> list[FoodLogEntry]:
+    Rows arrive ``batch_size`` at a time (a server-side cursor on Postgres). A food
+    without ingredients is an event with no ingredients: it still counts towards
+    the totals but forms no association.
+    """
     stmt = (
-        select(FoodLog, Food)
+        select(FoodLog.timestamp, Food.ingredients)
         .join(Food, FoodLog.food_id == Food.id)
         .where(FoodLog.username == username)
         .order_by(FoodLog.timestamp.asc())
+        .execution_options(yield_per=batch_size)
     )
+    for timestamp, ingredients in db.execute(stmt):
+        yield FoodLogEntry(timestamp=timestamp, ingredients=ingredients or [])
 
-    rows = db.execute(stmt).all()
 
-    return [
-        FoodLogEntry(
-            timestamp=food_log.timestamp,
-            # When a food has no ingredients (e.g. "orange"), treat the food
-            # name itself as the ingredient so it still surfaces in analysis.
-            ingredients=food.ingredients if food.ingredients else [food.name],
-        )
-        for food_log, food in rows
-    ]
+def iter_symptom_logs(
+    db: Session,
+    username: str,
+    symptom_ids: Sequence[UUID] | None = None,
+    batch_size: int = FETCH_BATCH_SIZE,
+) -> Iterator[SymptomLogEntry]:
+    """Stream the user's symptom events in timestamp order, named by symptom id, optionally only ``symptom_ids``."""
+    stmt = (
+        select(SymptomLog.timestamp, SymptomLog.symptom_id, SymptomLog.intensity)
+        .where(SymptomLog.username == username)
+        .order_by(SymptomLog.timestamp.asc())
+        .execution_options(yield_per=batch_size)
+    )
+    if symptom_ids:
+        stmt = stmt.where(SymptomLog.symptom_id.in_(symptom_ids))
+    for timestamp, symptom_id, intensity in db.execute(stmt):
+        yield SymptomLogEntry(timestamp=timestamp, symptom_name=str(symptom_id), intensity=intensity)
 
 
-def fetch_symptom_logs(db: Session, username: str) -> list[SymptomLogEntry]:
-    stmt = (
+def fetch_food_logs(db: Session, username: str, batch_size: int = FETCH_BATCH_SIZE) -> list[FoodLogEntry]:
+    """iter_food_logs, materialised."""
+    return list(iter_food_logs(db, username, batch_size))
+
+
+def fetch_symptom_logs(
+    db: Session,
+    username: str,
+    symptom_ids: Sequence[UUID] | None = None,
+    batch_size: int = FETCH_BATCH_SIZE,
+) -> list[SymptomLogEntry]:
+    """iter_symptom_logs, materialised."""
+    return list(iter_symptom_logs(db, username, symptom_ids, batch_size))
+
+
+@dataclass
+class WindowCounts:
+    """Everything the metrics need for one window, aggregated by the database."""
+
+    stats: WindowStatsDelta  # keyed by str(symptom_id), like the service's symptom entries
+    ingredient_totals: dict[str, int]
+    total_food_events: int
+    symptom_ids: set[UUID]  # symptoms with at least one log, covered or not
+
+
+def fetch_window_counts(
+    db: Session,
+    username: str,
+    time_window_hours: float,
+    symptom_ids: Sequence[UUID] | None = None,
+) -> WindowCounts:
+    """
+    Compute the window co-occurrence counts in Postgres with one statement.
+
+    Equivalent to window_stats_sweep + count_ingredient_occurrences over the user's
+    logs (foods without ingredients count as events with no ingredients), but only
+    the aggregates leave the database: a food belongs to a symptom's window when
+    ``s - window <= food < s``, each food is counted once per symptom type, and the
+    intensities of all covering symptom events are summed.
+    """
+    if time_window_hours < 0:
+        raise ValueError("time_window_hours must be >= 0")
+
+    foods = (
+        select(FoodLog.id, FoodLog.timestamp, Food.ingredients)
+        .join(Food, FoodLog.food_id == Food.id)
+        .where(FoodLog.username == username)
+        .cte("user_foods")
+    )
+    symptoms = select(SymptomLog.symptom_id, SymptomLog.timestamp, SymptomLog.intensity).where(
+        SymptomLog.username == username
+    )
+    if symptom_ids:
+        symptoms = symptoms.where(SymptomLog.symptom_id.in_(symptom_ids))
+    symptoms = symptoms.cte("user_symptoms")
+
+    # one row per (symptom type, covered food): how many of its events cover the food
+    covered = (
         select(
-            Symptom.name,
-            Symptom.location,
-            Symptom.sensation,
-            SymptomLog.intensity,
-            SymptomLog.timestamp,
-            SymptomLog.duration,
+            symptoms.c.symptom_id,
+            foods.c.id.label("food_log_id"),
+            func.count().label("hits"),
+            func.sum(symptoms.c.intensity).label("intensity"),
         )
-        .select_from(SymptomLog)
-        .join(Symptom, SymptomLog.symptom_id == Symptom.id)
-        .where(SymptomLog.username == username)
-        .order_by(SymptomLog.timestamp.asc())
+        .join(
+            foods,
+            (foods.c.timestamp >= symptoms.c.timestamp - timedelta(hours=time_window_hours))
+            & (foods.c.timestamp < symptoms.c.timestamp),
+        )
+        .group_by(symptoms.c.symptom_id, foods.c.id)
+        .cte("covered")
+    )
+    elements = func.jsonb_array_elements_text(foods.c.ingredients).table_valued("value")
+    food_ingredients = (
+        select(foods.c.id.label("food_log_id"), elements.c.value.label("ingredient"))
+        .select_from(foods)
+        .join(elements, true())
+        .distinct()
+        .cte("food_ingredients")
     )
 
-    rows = db.execute(stmt).all()
+    def part(kind, symptom_id, ingredient, *counts):
+        padded = [*counts, *[literal(0)] * (3 - len(counts))]
+        return select(
+            literal(kind).label("kind"),
+            symptom_id.label("symptom_id"),
+            ingredient.label("ingredient"),
+            *(cast(c, Integer).label(f"n{i}") for i, c in enumerate(padded)),
+        )
 
-    return [
-        SymptomLogEntry(
-            symptom_name=row.name,
-            location=row.location,
-            sensation=row.sensation,
-            intensity=row.intensity,
-            timestamp=row.timestamp,
-            duration=row.duration,
+    no_symptom = null().cast(SymptomLog.symptom_id.type)
+    no_ingredient = null().cast(String)
+    window_sizes = (
+        select(covered.c.symptom_id, func.count().label("foods_in_window")).group_by(covered.c.symptom_id).subquery()
+    )
+    logged_symptoms = select(symptoms.c.symptom_id).distinct().subquery()
+    statement = union_all(
+        part(
+            "cell",
+            covered.c.symptom_id,
+            food_ingredients.c.ingredient,
+            func.count(),
+            func.sum(covered.c.intensity),
+            func.sum(covered.c.hits),
         )
-        for row in rows
-    ]
+        .select_from(covered)
+        .join(food_ingredients, food_ingredients.c.food_log_id == covered.c.food_log_id)
+        .group_by(covered.c.symptom_id, food_ingredients.c.ingredient),
+        part("symptom", logged_symptoms.c.symptom_id, no_ingredient, func.coalesce(window_sizes.c.foods_in_window, 0))
+        .select_from(logged_symptoms)
+        .outerjoin(window_sizes, window_sizes.c.symptom_id == logged_symptoms.c.symptom_id),
+        part("ingredient", no_symptom, food_ingredients.c.ingredient, func.count()).group_by(
+            food_ingredients.c.ingredient
+        ),
+        part("total", no_symptom, no_ingredient, select(func.count()).select_from(foods).scalar_subquery()),
+    )
+
+    counts = WindowCounts(stats=WindowStatsDelta(), ingredient_totals={}, total_food_events=0, symptom_ids=set())
+    for row in db.execute(statement):
+        if row.kind == "cell":
+            counts.stats.exposures[(str(row.symptom_id), row.ingredient)] = ExposureCounts(row.n0, row.n1, row.n2)
+        elif row.kind == "symptom":
+            counts.symptom_ids.add(row.symptom_id)
+            if row.n0:
+                counts.stats.foods_in_window[str(row.symptom_id)] = row.n0
+        elif row.kind == "ingredient":
+            counts.ingredient_totals[row.ingredient] = row.n0
+        else:
+            counts.total_food_events = row.n0
+    return counts
+
+
+def stream_window_counts(
+    db: Session,
+    username: str,
+    time_window_hours: float,
+    symptom_ids: Sequence[UUID] | None = None,
+    batch_size: int = FETCH_BATCH_SIZE,
+) -> WindowCounts:
+    """
+    Same result as fetch_window_counts, accumulated in Python from two streaming cursors.
+
+    Only the foods inside the current window and the per-cell counts are held in
+    memory, so very long histories are processed in bounded memory.
+    """
+    streamed = window_stats_stream(
+        iter_food_logs(db, username, batch_size),
+        iter_symptom_logs(db, username, symptom_ids, batch_size),
+        time_window_hours,
+    )
+    return WindowCounts(
+        stats=streamed.stats,
+        ingredient_totals=streamed.ingredient_totals,
+        total_food_events=streamed.total_food_events,
+        symptom_ids={UUID(name) for name in streamed.symptom_names},
+    )
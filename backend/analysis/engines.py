@@ -0,0 +1,47 @@
+"""Registry of interchangeable analysis engines.
+
+Every engine takes (food_logs, symptom_logs, time_window_hours) and returns the
+same symptom -> ingredient -> IngredientSymptomMetrics mapping as get_analysis.
+"""
+
+from collections.abc import Callable
+from typing import Literal
+
+from analysis.algorithm import get_analysis
+from analysis.models import FoodLogEntry, IngredientSymptomMetrics, SymptomLogEntry
+from analysis.sparse import get_analysis_sparse
+from analysis.streaming import get_analysis_stream
+from analysis.sweep import get_analysis_sweep
+from analysis.vectorized import get_analysis_vectorized
+
+AnalysisEngine = Callable[
+    [list[FoodLogEntry], list[SymptomLogEntry], float],
+    dict[str, dict[str, IngredientSymptomMetrics]],
+]
+
+DEFAULT_ENGINE = "python"
+
+# Not an in-process engine: AlgorithmService pushes the window join into Postgres (analysis.data).
+SQL_ENGINE = "sql"
+# AlgorithmService feeds this engine's accumulator from server-side cursors instead of loaded lists.
+STREAM_ENGINE = "stream"
+
+ANALYSIS_ENGINES: dict[str, AnalysisEngine] = {
+    "python": get_analysis,
+    "numpy": get_analysis_vectorized,
+    "sweep": get_analysis_sweep,
+    "sparse": get_analysis_sparse,
+    STREAM_ENGINE: get_analysis_stream,
+}
+
+# Every name AlgorithmService accepts, for request validation and CLI choices.
+ENGINE_NAMES: tuple[str, ...] = (*ANALYSIS_ENGINES, SQL_ENGINE)
+EngineName = Literal[ENGINE_NAMES]
+
+
+def get_engine(name: str) -> AnalysisEngine:
+    """Look up an analysis engine by name, raising ValueError for unknown names."""
+    try:
+        return ANALYSIS_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown analysis engine '{name}'. Choose from: {', '.join(ANALYSIS_ENGINES)}") from None
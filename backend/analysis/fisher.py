@@ -0,0 +1,105 @@
+"""Batched one-sided Fisher's exact test for 2x2 contingency tables, with a shared memo cache."""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from analysis.hypergeometric import fisher_greater_p_values
+
+# Tables are small integer 4-tuples, so even a large cache stays a few MB.
+FISHER_CACHE_SIZE = int(os.getenv("FISHER_CACHE_SIZE", "65536"))
+
+
+class FisherCache:
+    """
+    Bounded LRU memo of one-sided Fisher p-values keyed by the (a, b, c, d) table.
+
+    Misses are computed from the log-factorial table in ``analysis.hypergeometric``.
+    Many cells share a table — rare ingredients with a=0 or a=1 above all — across
+    symptoms, users and batch runs, so one instance is shared per process (see
+    ``fisher_cache``). Thread-safe: requests run the algorithm in FastAPI's threadpool.
+    ``hits`` and ``misses`` count cell lookups; a table repeated within one batched
+    call is computed once and its repeats count as hits.
+    """
+
+    def __init__(self, maxsize: int = FISHER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._values: OrderedDict[tuple[int, int, int, int], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def p_value(self, a: int, b: int, c: int, d: int) -> float:
+        """Cached ``fisher_exact([[a, b], [c, d]], alternative="greater").pvalue`` for one table."""
+        key = (int(a), int(b), int(c), int(d))
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = float(fisher_greater_p_values(*key))
+        with self._lock:
+            self.misses += 1
+            self._store(key, value)
+        return value
+
+    def p_values(self, a, b, c, d) -> np.ndarray:
+        """Cached p-values for arrays of tables: misses are deduplicated and computed in one batched call."""
+        a, b, c, d = np.broadcast_arrays(*(np.asarray(x, dtype=np.int64) for x in (a, b, c, d)))
+        shape = a.shape
+        if a.size == 0:
+            return np.empty(shape, dtype=np.float64)
+
+        tables, inverse = np.unique(np.stack([x.ravel() for x in (a, b, c, d)], axis=1), axis=0, return_inverse=True)
+        keys = [tuple(row) for row in tables.tolist()]
+        values = np.empty(len(keys), dtype=np.float64)
+        missing: list[int] = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._values.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self._values.move_to_end(key)
+                    values[i] = value
+
+        if missing:
+            values[missing] = fisher_greater_p_values(*tables[missing].T)
+        with self._lock:
+            self.hits += a.size - len(missing)
+            self.misses += len(missing)
+            for i in missing:
+                self._store(keys[i], float(values[i]))
+
+        return values[inverse.ravel()].reshape(shape)
+
+    def info(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._values),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self.hits = self.misses = 0
+
+    def _store(self, key: tuple[int, int, int, int], value: float) -> None:
+        if self.maxsize <= 0:
+            return
+        self._values[key] = value
+        self._values.move_to_end(key)
+        while len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+
+
+fisher_cache = FisherCache()
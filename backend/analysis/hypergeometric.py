@@ -0,0 +1,84 @@
+"""
+Exact one-sided Fisher tails from a cached log-factorial table.
+
+A user's contingency tables are bounded by their number of food events N, so every
+hypergeometric probability they need is a combination of log(k!) for k <= N. The
+table below is computed once and grown geometrically as larger N arrive, which
+replaces SciPy's general distribution machinery with array lookups.
+
+For the table [[a, b], [c, d]] with N = a+b+c+d, the one-sided ("greater") p-value
+is P(X >= a) for X ~ Hypergeom(N, a+b, a+c), i.e. the sum of
+
+    pmf(k) = C(a+b, k) C(c+d, a+c-k) / C(N, a+c)    for k = a .. min(a+b, a+c)
+
+which is exactly what ``fisher_exact(..., alternative="greater")`` reports.
+"""
+
+import threading
+
+import numpy as np
+from scipy.special import gammaln
+
+
+class LogFactorialTable:
+    """Growable array of log(k!) for k = 0..n, shared by all callers in a process."""
+
+    def __init__(self, initial_size: int = 1024):
+        self._values = gammaln(np.arange(initial_size + 1, dtype=np.float64) + 1)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def up_to(self, n: int) -> np.ndarray:
+        """The table covering at least 0..n, growing it (to at least double) when needed."""
+        values = self._values
+        if n < len(values):
+            return values
+        with self._lock:
+            if n >= len(self._values):
+                size = max(n + 1, 2 * len(self._values))
+                self._values = gammaln(np.arange(size, dtype=np.float64) + 1)
+            return self._values
+
+
+log_factorials = LogFactorialTable()
+
+
+def fisher_greater_p_values(a, b, c, d) -> np.ndarray:
+    """
+    One-sided Fisher p-values for broadcastable integer arrays of table cells.
+
+    Matches ``fisher_exact([[a, b], [c, d]], alternative="greater").pvalue`` to
+    within floating-point rounding; tables with an all-zero row or column get 1.
+    All tail terms of all tables are evaluated in one flat vectorized pass.
+    Raises ValueError for a negative cell, which has no such table.
+    """
+    a, b, c, d = np.broadcast_arrays(*(np.asarray(x, dtype=np.int64) for x in (a, b, c, d)))
+    shape = a.shape
+    a, b, c, d = (x.ravel() for x in (a, b, c, d))
+    if a.size == 0:
+        return np.empty(shape, dtype=np.float64)
+    if min(a.min(), b.min(), c.min(), d.min()) < 0:
+        raise ValueError("contingency table cells must be non-negative")
+
+    total = a + b + c + d
+    exposed = a + b
+    windowed = a + c
+    degenerate = (exposed == 0) | (c + d == 0) | (windowed == 0) | (b + d == 0)
+
+    lf = log_factorials.up_to(int(total.max()))
+    # log of the k-independent factor (a+b)! (c+d)! (a+c)! (b+d)! / N!
+    log_norm = lf[exposed] + lf[c + d] + lf[windowed] + lf[b + d] - lf[total]
+
+    # Flatten every table's tail k = a..min(a+b, a+c) into one run of terms.
+    lengths = np.minimum(exposed, windowed) - a + 1
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    owner = np.repeat(np.arange(a.size), lengths)
+    k = a[owner] + np.arange(lengths.sum()) - starts[owner]
+    log_terms = log_norm[owner] - (
+        lf[k] + lf[exposed[owner] - k] + lf[windowed[owner] - k] + lf[d[owner] - a[owner] + k]
+    )
+
+    p_values = np.add.reduceat(np.exp(log_terms), starts)
+    return np.where(degenerate, 1.0, np.minimum(p_values, 1.0)).reshape(shape)
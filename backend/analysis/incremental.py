@@ -0,0 +1,132 @@
+"""
+Incremental maintenance of the analysis sufficient statistics.
+
+get_analysis only needs a handful of counts per (symptom, ingredient) cell:
+  - ingredient totals and the number of food events (window independent)
+  - distinct foods inside any window of a symptom (total_in_window)
+  - exposures (a) plus the summed/counted intensities over those exposures
+
+Adding or removing a single food or symptom event only changes those counts for
+the foods and symptoms near it on the timeline, so the deltas below are computed
+from that local neighbourhood instead of the user's full history. Deltas are
+always taken against the state *without* the event, so removing an event is the
+negation of adding it.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from analysis.algorithm import get_food_symptom_counts
+from analysis.models import FoodLogEntry, SymptomLogEntry
+
+
+@dataclass
+class ExposureCounts:
+    """Raw counts behind one (symptom, ingredient) cell."""
+
+    exposures: int = 0
+    intensity_sum: int = 0
+    intensity_count: int = 0
+
+
+@dataclass
+class WindowStatsDelta:
+    """Change to the window-dependent statistics of one time window."""
+
+    # symptom_name -> change in distinct food events inside that symptom's windows
+    foods_in_window: dict[str, int] = field(default_factory=dict)
+    # (symptom_name, ingredient) -> change in that cell's raw counts
+    exposures: dict[tuple[str, str], ExposureCounts] = field(default_factory=dict)
+
+    def add_food(self, symptom_name: str, ingredients: list[str], intensity_sum: int, intensity_count: int, a: int):
+        """Record one food event's contribution to a symptom (``a`` is 1 if it became covered, else 0)."""
+        if a:
+            self.foods_in_window[symptom_name] = self.foods_in_window.get(symptom_name, 0) + a
+        for ingredient in set(ingredients):
+            cell = self.exposures.setdefault((symptom_name, ingredient), ExposureCounts())
+            cell.exposures += a
+            cell.intensity_sum += intensity_sum
+            cell.intensity_count += intensity_count
+
+    def scaled(self, sign: int) -> "WindowStatsDelta":
+        """Return this delta multiplied by ``sign`` (-1 turns an insertion into a removal)."""
+        return WindowStatsDelta(
+            foods_in_window={name: sign * count for name, count in self.foods_in_window.items()},
+            exposures={
+                key: ExposureCounts(sign * c.exposures, sign * c.intensity_sum, sign * c.intensity_count)
+                for key, c in self.exposures.items()
+            },
+        )
+
+
+def food_event_delta(
+    food: FoodLogEntry,
+    symptom_logs: list[SymptomLogEntry],
+    time_window_hours: float,
+) -> WindowStatsDelta:
+    """
+    Delta from adding one food event.
+
+    The food falls inside the window of every symptom with a timestamp in
+    (food.timestamp, food.timestamp + window]; ``symptom_logs`` may contain
+    anything around that range and is filtered here.
+    """
+    window_end = food.timestamp + timedelta(hours=time_window_hours)
+
+    covering: dict[str, list[int]] = {}
+    for symptom in symptom_logs:
+        if food.timestamp < symptom.timestamp <= window_end:
+            covering.setdefault(symptom.symptom_name, []).append(symptom.intensity)
+
+    delta = WindowStatsDelta()
+    for symptom_name, intensities in covering.items():
+        delta.add_food(symptom_name, food.ingredients, sum(intensities), len(intensities), a=1)
+    return delta
+
+
+def symptom_event_delta(
+    symptom: SymptomLogEntry,
+    food_logs: list[FoodLogEntry],
+    other_symptom_logs: list[SymptomLogEntry],
+    time_window_hours: float,
+) -> WindowStatsDelta:
+    """
+    Delta from adding one symptom event.
+
+    Every food in [symptom.timestamp - window, symptom.timestamp) gains this
+    symptom's intensity. A food only becomes a new exposure if no *other* event
+    of the same symptom already covers it, which is what ``other_symptom_logs``
+    (excluding the event itself) is used to decide.
+    """
+    window = timedelta(hours=time_window_hours)
+    window_start = symptom.timestamp - window
+
+    other_times = sorted(other.timestamp for other in other_symptom_logs if other.symptom_name == symptom.symptom_name)
+
+    delta = WindowStatsDelta()
+    for food in food_logs:
+        if not window_start <= food.timestamp < symptom.timestamp:
+            continue
+
+        # Another event of this symptom covers the food iff one lies in (food, food + window].
+        nxt = bisect_right(other_times, food.timestamp)
+        already_covered = nxt < len(other_times) and other_times[nxt] <= food.timestamp + window
+
+        delta.add_food(symptom.symptom_name, food.ingredients, symptom.intensity, 1, a=0 if already_covered else 1)
+    return delta
+
+
+def window_stats_from_history(
+    food_logs: list[FoodLogEntry],
+    symptom_logs: list[SymptomLogEntry],
+    time_window_hours: float,
+) -> WindowStatsDelta:
+    """Full-history statistics for one window, expressed as a delta from empty."""
+    counts, foods_in_windows = get_food_symptom_counts(food_logs, symptom_logs, time_window_hours)
+
+    stats = WindowStatsDelta(foods_in_window=dict(foods_in_windows))
+    for symptom_name, ingredient_data in counts.items():
+        for ingredient, (a, intensity_sum, intensity_count) in ingredient_data.items():
+            stats.exposures[(symptom_name, ingredient)] = ExposureCounts(a, intensity_sum, intensity_count)
+    return stats
@@ -1,11 +1,17 @@
+from analysis.columnar import FoodColumns
 from analysis.models import FoodLogEntry
 
 
 def count_ingredient_occurrences(
-    food_logs: list[FoodLogEntry],
+    food_logs: list[FoodLogEntry] | FoodColumns,
 ) -> tuple[dict[str, int], int]:
     """Returns (ingredient_counts, total_food_events)."""
 
+    if isinstance(food_logs, FoodColumns):
+        totals = food_logs.ingredient_totals().tolist()
+        counts = {name: total for name, total in zip(food_logs.vocabulary.names, totals) if total}
+        return counts, len(food_logs)
+
     ingredient_counts: dict[str, int] = {}
 
     for log in food_logs:
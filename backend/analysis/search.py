@@ -1,6 +1,6 @@
-"""Binary-search utilities for food/symptom time-window lookups."""
+"""Sliding-window utilities for food/symptom time-window lookups."""
 
-from bisect import bisect_left
+from collections.abc import Iterator
 from dataclasses import dataclass
 from datetime import timedelta
 
@@ -26,25 +26,42 @@ def get_food_logs_within_time_window_before_symptoms(
     [symptom_timestamp - time_window_hours, symptom_timestamp)
     """
 
+    return [
+        SymptomFoodWindowResult(symptom_log=symptom_log, food_logs=food_logs[start:end])
+        for symptom_log, start, end in iter_symptom_window_spans(food_logs, symptom_logs, time_window_hours)
+    ]
+
+
+def iter_symptom_window_spans(
+    food_logs: list[FoodLogEntry],
+    symptom_logs: list[SymptomLogEntry],
+    time_window_hours: float,
+) -> Iterator[tuple[SymptomLogEntry, int, int]]:
+    """Yield (symptom_log, start, end) so that food_logs[start:end] is the window before each symptom.
+
+    Two pointers walk the sorted food timeline alongside the symptoms instead of
+    searching it per symptom, so for time-ordered symptoms both timelines are
+    traversed once and no food list is copied. Out-of-order symptoms are still
+    handled correctly by stepping the pointers back.
+    """
+
     if time_window_hours < 0:
         raise ValueError("time_window_hours must be >= 0")
 
     window_delta = timedelta(hours=time_window_hours)
+    n_foods = len(food_logs)
+    start = end = 0
 
-    sorted_food_timestamps = [log.timestamp for log in food_logs]
-
-    results: list[SymptomFoodWindowResult] = []
     for symptom_log in symptom_logs:
         window_start = symptom_log.timestamp - window_delta
 
-        start_index = bisect_left(sorted_food_timestamps, window_start)
-        end_index = bisect_left(sorted_food_timestamps, symptom_log.timestamp)
-
-        results.append(
-            SymptomFoodWindowResult(
-                symptom_log=symptom_log,
-                food_logs=food_logs[start_index:end_index],
-            )
-        )
+        while start < n_foods and food_logs[start].timestamp < window_start:
+            start += 1
+        while start > 0 and food_logs[start - 1].timestamp >= window_start:
+            start -= 1
+        while end < n_foods and food_logs[end].timestamp < symptom_log.timestamp:
+            end += 1
+        while end > 0 and food_logs[end - 1].timestamp >= symptom_log.timestamp:
+            end -= 1
 
-    return results
+        yield symptom_log, start, end
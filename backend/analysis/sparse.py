@@ -0,0 +1,117 @@
+"""
+Sparse-matrix counting stage for the symptom-ingredient association analysis.
+
+Expresses the co-occurrence counts as products of two sparse matrices instead
+of per-ingredient Python accumulators:
+
+  X  (foods x ingredients)         1 where a food contains an ingredient; this is
+                                   exactly the CSR layout of FoodColumns.
+  W  (symptom events x foods)      1 where a food lies in that event's window.
+  G  (symptom types x events)      groups events by symptom; GI is G weighted by intensity.
+
+Then H = G @ W counts the covering events of each food per symptom type and
+I = GI @ W sums their intensities. With C = (H > 0), C @ X is the exposure count
+a, I @ X the intensity sum and H @ X the intensity count of every (symptom,
+ingredient) cell, and the row sums of C are the foods inside any window.
+"""
+
+import numpy as np
+from scipy import sparse
+
+from analysis.columnar import FoodColumns, SymptomColumns, hours_to_microseconds
+from analysis.models import FoodLogEntry, IngredientSymptomMetrics, SymptomLogEntry
+from analysis.vectorized import metrics_from_counts
+
+
+def get_food_symptom_counts_sparse(
+    food_logs: list[FoodLogEntry] | FoodColumns,
+    symptom_logs: list[SymptomLogEntry] | SymptomColumns,
+    time_window_hours: float,
+) -> tuple[dict[str, dict[str, list[int]]], dict[str, int]]:
+    """Same output as ``analysis.algorithm.get_food_symptom_counts``, computed with sparse products."""
+    if time_window_hours < 0:
+        raise ValueError("time_window_hours must be >= 0")
+
+    if not len(food_logs) or not len(symptom_logs):
+        return {}, {}
+
+    foods = FoodColumns.of(food_logs)
+    symptoms = SymptomColumns.of(symptom_logs)
+    n_foods, n_events = len(foods), len(symptoms)
+    ingredient_names = foods.vocabulary.names
+
+    x = sparse.csr_matrix(
+        (np.ones(len(foods.ingredient_ids), dtype=np.int64), foods.ingredient_ids, foods.offsets),
+        shape=(n_foods, len(ingredient_names)),
+    )
+
+    # Window of the event at s is [s - window, s) over the sorted food timeline.
+    window = hours_to_microseconds(time_window_hours)
+    starts = np.searchsorted(foods.timestamps, symptoms.timestamps - window, side="left")
+    ends = np.searchsorted(foods.timestamps, symptoms.timestamps, side="left")
+    lengths = ends - starts
+    indptr = np.concatenate(([0], np.cumsum(lengths)))
+    indices = np.arange(indptr[-1], dtype=np.int64) - np.repeat(indptr[:-1] - starts, lengths)
+    w = sparse.csr_matrix((np.ones(len(indices), dtype=np.int64), indices, indptr), shape=(n_events, n_foods))
+
+    event_ids = np.arange(n_events)
+    g = sparse.csr_matrix(
+        (np.ones(n_events, dtype=np.int64), (symptoms.name_ids, event_ids)), shape=(len(symptoms.names), n_events)
+    )
+    g_intensity = sparse.csr_matrix(
+        (symptoms.intensities, (symptoms.name_ids, event_ids)), shape=(len(symptoms.names), n_events)
+    )
+
+    hits = (g @ w).tocsr()
+    intensity = (g_intensity @ w).tocsr()
+    covered = (hits > 0).astype(np.int64)
+
+    exposures = (covered @ x).tocsr()
+    intensity_sums = (intensity @ x).tocsr()
+    intensity_counts = (hits @ x).tocsr()
+    foods_in_window = np.asarray(covered.sum(axis=1)).ravel()
+
+    counts: dict[str, dict[str, list[int]]] = {}
+    foods_in_windows: dict[str, int] = {}
+    for name_id, symptom_name in enumerate(symptoms.names):
+        if foods_in_window[name_id] == 0:
+            continue
+        foods_in_windows[symptom_name] = int(foods_in_window[name_id])
+
+        row = exposures[name_id]
+        if row.nnz == 0:
+            continue
+        sums = intensity_sums[name_id].toarray().ravel()
+        hit_counts = intensity_counts[name_id].toarray().ravel()
+        counts[symptom_name] = {
+            ingredient_names[ingredient_id]: [int(a), int(sums[ingredient_id]), int(hit_counts[ingredient_id])]
+            for ingredient_id, a in zip(row.indices, row.data)
+            if a
+        }
+
+    return counts, foods_in_windows
+
+
+def get_analysis_sparse(
+    food_logs: list[FoodLogEntry] | FoodColumns,
+    symptom_logs: list[SymptomLogEntry] | SymptomColumns,
+    time_window_hours: float,
+) -> dict[str, dict[str, IngredientSymptomMetrics]]:
+    """Engine entry point, same contract as get_analysis."""
+    foods = FoodColumns.of(food_logs)
+    counts, foods_in_windows = get_food_symptom_counts_sparse(foods, symptom_logs, time_window_hours)
+    ingredient_totals = foods.ingredient_totals()
+
+    result: dict[str, dict[str, IngredientSymptomMetrics]] = {}
+    for symptom_name, cells in counts.items():
+        ingredients = list(cells)
+        metrics = metrics_from_counts(
+            a=[cells[i][0] for i in ingredients],
+            ingredient_total=[ingredient_totals[foods.vocabulary.id_of(i)] for i in ingredients],
+            total_in_window=foods_in_windows[symptom_name],
+            total_food_events=len(foods),
+            intensity_sums=[cells[i][1] for i in ingredients],
+            intensity_counts=[cells[i][2] for i in ingredients],
+        )
+        result[symptom_name] = dict(zip(ingredients, metrics))
+    return result
@@ -0,0 +1,117 @@
+"""
+Single-pass, bounded-memory accumulation of the window statistics.
+
+Food and symptom events are consumed as two timestamp-ordered streams (e.g.
+server-side cursors) and merged. Only the foods that a future symptom could still
+cover — those within one window of the latest event — are kept in memory; a food
+is folded into the counts as soon as it falls out of reach. Memory is therefore
+bounded by the number of foods per window plus the (symptom, ingredient) cells,
+not by the length of the history.
+
+Ties follow the window definition ``s - window <= food < s``: a food logged at the
+same instant as a symptom is not inside that symptom's window.
+"""
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import timedelta
+from heapq import merge
+
+from analysis.incremental import WindowStatsDelta
+from analysis.models import FoodLogEntry, IngredientSymptomMetrics, SymptomLogEntry
+from analysis.sweep import metrics_from_window_stats
+
+_SYMPTOM, _FOOD = 0, 1  # symptoms sort first at equal timestamps
+
+
+@dataclass
+class StreamedWindowStats:
+    """Full-history statistics for one window, as produced by window_stats_stream."""
+
+    stats: WindowStatsDelta = field(default_factory=WindowStatsDelta)
+    ingredient_totals: dict[str, int] = field(default_factory=dict)
+    total_food_events: int = 0
+    symptom_names: set[str] = field(default_factory=set)
+
+
+class _PendingFood:
+    """A food still inside reach of upcoming symptoms, with what has covered it so far."""
+
+    __slots__ = ("timestamp", "ingredients", "covered_by")
+
+    def __init__(self, entry: FoodLogEntry):
+        self.timestamp = entry.timestamp
+        self.ingredients = entry.ingredients
+        self.covered_by: dict[str, list[int]] = {}  # symptom_name -> [intensity_sum, intensity_count]
+
+
+def _ordered(events: Iterable, kind: int, what: str) -> Iterator[tuple]:
+    previous = None
+    for sequence, event in enumerate(events):
+        if previous is not None and event.timestamp < previous:
+            raise ValueError(f"{what} must be in timestamp order for streaming")
+        previous = event.timestamp
+        yield event.timestamp, kind, sequence, event
+
+
+def window_stats_stream(
+    food_logs: Iterable[FoodLogEntry],
+    symptom_logs: Iterable[SymptomLogEntry],
+    time_window_hours: float,
+) -> StreamedWindowStats:
+    """
+    Accumulate one window's statistics from timestamp-ordered food and symptom streams.
+
+    Equivalent to ``window_stats_sweep`` for that window plus
+    ``count_ingredient_occurrences``, but each input is iterated exactly once.
+    """
+    if time_window_hours < 0:
+        raise ValueError("time_window_hours must be >= 0")
+    window = timedelta(hours=time_window_hours)
+
+    result = StreamedWindowStats()
+    pending: deque[_PendingFood] = deque()
+
+    def retire(food: _PendingFood) -> None:
+        for symptom_name, (intensity_sum, intensity_count) in food.covered_by.items():
+            result.stats.add_food(symptom_name, food.ingredients, intensity_sum, intensity_count, a=1)
+
+    events = merge(_ordered(food_logs, _FOOD, "food_logs"), _ordered(symptom_logs, _SYMPTOM, "symptom_logs"))
+    for timestamp, kind, _, event in events:
+        # Every later symptom is at or after this event, so foods before its window start are out of reach.
+        # Retiring on foods too keeps the deque bounded through long stretches without symptoms.
+        window_start = timestamp - window
+        while pending and pending[0].timestamp < window_start:
+            retire(pending.popleft())
+
+        if kind == _FOOD:
+            pending.append(_PendingFood(event))
+            result.total_food_events += 1
+            for ingredient in set(event.ingredients):
+                result.ingredient_totals[ingredient] = result.ingredient_totals.get(ingredient, 0) + 1
+            continue
+
+        result.symptom_names.add(event.symptom_name)
+        for food in pending:  # all earlier than timestamp: equal-time foods are merged after
+            covered = food.covered_by.setdefault(event.symptom_name, [0, 0])
+            covered[0] += event.intensity
+            covered[1] += 1
+
+    for food in pending:
+        retire(food)
+    return result
+
+
+def get_analysis_stream(
+    food_logs: Iterable[FoodLogEntry],
+    symptom_logs: Iterable[SymptomLogEntry],
+    time_window_hours: float,
+) -> dict[str, dict[str, IngredientSymptomMetrics]]:
+    """Engine entry point, same contract as get_analysis; in-memory lists are put in timestamp order first."""
+    if isinstance(food_logs, list):
+        food_logs = sorted(food_logs, key=lambda log: log.timestamp)
+    if isinstance(symptom_logs, list):
+        symptom_logs = sorted(symptom_logs, key=lambda log: log.timestamp)
+    streamed = window_stats_stream(food_logs, symptom_logs, time_window_hours)
+    return metrics_from_window_stats(streamed.stats, streamed.ingredient_totals, streamed.total_food_events)
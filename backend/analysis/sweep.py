@@ -0,0 +1,127 @@
+"""
+Multi-window sweep of the symptom-ingredient association analysis.
+
+Computing the 2h/4h/8h/24h views separately repeats the whole window search and
+counting once per window. Windows are nested, though: a food at time f lies in
+the window of a symptom at s iff f < s <= f + w, so growing w only extends each
+food's look-ahead range. One sorted pass per symptom type finds, for every food,
+the position of the first later symptom; each window then only needs the end of
+that range, and prefix sums over the symptom intensities turn every
+(food, window) pair into O(1) counts.
+"""
+
+import numpy as np
+
+from analysis.columnar import FoodColumns, SymptomColumns, hours_to_microseconds
+from analysis.incremental import ExposureCounts, WindowStatsDelta
+from analysis.models import FoodLogEntry, IngredientSymptomMetrics, SymptomLogEntry
+from analysis.per_ingredient_counts import count_ingredient_occurrences
+from analysis.vectorized import metrics_from_counts
+
+
+def window_stats_sweep(
+    food_logs: list[FoodLogEntry] | FoodColumns,
+    symptom_logs: list[SymptomLogEntry] | SymptomColumns,
+    windows: list[float],
+) -> dict[float, WindowStatsDelta]:
+    """
+    Sufficient statistics for every window in ``windows`` from a single pass.
+
+    Returns window -> statistics, each equal to
+    ``analysis.incremental.window_stats_from_history`` for that window.
+    """
+    if any(window < 0 for window in windows):
+        raise ValueError("time_window_hours must be >= 0")
+
+    windows = sorted(set(windows))
+    stats_by_window = {window: WindowStatsDelta() for window in windows}
+    if not len(food_logs) or not len(symptom_logs):
+        return stats_by_window
+
+    foods = FoodColumns.of(food_logs)
+    symptoms = SymptomColumns.of(symptom_logs)
+    food_times = foods.timestamps
+    window_lengths = [hours_to_microseconds(window) for window in windows]
+    ingredient_names = foods.vocabulary.names
+    n_ingredients = len(ingredient_names)
+    food_index_of = foods.food_index_of()
+    ingredient_id_of = foods.ingredient_ids
+
+    for symptom_name, symptom_times, intensities in symptoms.groups():
+        intensity_prefix = np.concatenate(([0], np.cumsum(intensities)))
+
+        # Symptoms strictly after each food; shared by every window.
+        first_after = np.searchsorted(symptom_times, food_times, side="right")
+
+        for window, length in zip(windows, window_lengths):
+            last_within = np.searchsorted(symptom_times, food_times + length, side="right")
+            hits = last_within - first_after
+            covered = hits > 0
+            foods_in_window = int(np.count_nonzero(covered))
+            if foods_in_window == 0:
+                continue
+
+            stats = stats_by_window[window]
+            stats.foods_in_window[symptom_name] = foods_in_window
+
+            intensity_per_food = intensity_prefix[last_within] - intensity_prefix[first_after]
+            exposures = np.bincount(ingredient_id_of, weights=covered[food_index_of], minlength=n_ingredients)
+            intensity_sums = np.bincount(
+                ingredient_id_of, weights=intensity_per_food[food_index_of], minlength=n_ingredients
+            )
+            intensity_counts = np.bincount(ingredient_id_of, weights=hits[food_index_of], minlength=n_ingredients)
+            for ingredient_id in np.flatnonzero(exposures):
+                stats.exposures[(symptom_name, ingredient_names[ingredient_id])] = ExposureCounts(
+                    exposures=int(exposures[ingredient_id]),
+                    intensity_sum=int(intensity_sums[ingredient_id]),
+                    intensity_count=int(intensity_counts[ingredient_id]),
+                )
+
+    return stats_by_window
+
+
+def metrics_from_window_stats(
+    stats: WindowStatsDelta,
+    ingredient_totals: dict[str, int],
+    total_food_events: int,
+) -> dict[str, dict[str, IngredientSymptomMetrics]]:
+    """Derive the get_analysis output for one window from its sufficient statistics."""
+    cells_by_symptom: dict[str, list[tuple[str, ExposureCounts]]] = {}
+    for (symptom_name, ingredient), counts in stats.exposures.items():
+        cells_by_symptom.setdefault(symptom_name, []).append((ingredient, counts))
+
+    result: dict[str, dict[str, IngredientSymptomMetrics]] = {}
+    for symptom_name, cells in cells_by_symptom.items():
+        metrics = metrics_from_counts(
+            a=[counts.exposures for _, counts in cells],
+            ingredient_total=[ingredient_totals[ingredient] for ingredient, _ in cells],
+            total_in_window=stats.foods_in_window[symptom_name],
+            total_food_events=total_food_events,
+            intensity_sums=[counts.intensity_sum for _, counts in cells],
+            intensity_counts=[counts.intensity_count for _, counts in cells],
+        )
+        result[symptom_name] = {ingredient: m for (ingredient, _), m in zip(cells, metrics)}
+    return result
+
+
+def get_analysis_multi_window(
+    food_logs: list[FoodLogEntry] | FoodColumns,
+    symptom_logs: list[SymptomLogEntry] | SymptomColumns,
+    windows: list[float],
+) -> dict[float, dict[str, dict[str, IngredientSymptomMetrics]]]:
+    """window -> the get_analysis output for that window, computed in one sweep."""
+    foods = FoodColumns.of(food_logs)
+    ingredient_totals, total_food_events = count_ingredient_occurrences(foods)
+    return {
+        window: metrics_from_window_stats(stats, ingredient_totals, total_food_events)
+        for window, stats in window_stats_sweep(foods, symptom_logs, windows).items()
+    }
+
+
+def get_analysis_sweep(
+    food_logs: list[FoodLogEntry] | FoodColumns,
+    symptom_logs: list[SymptomLogEntry] | SymptomColumns,
+    time_window_hours: float,
+) -> dict[str, dict[str, IngredientSymptomMetrics]]:
+    """Single-window engine entry point, same contract as get_analysis."""
+    return get_analysis_multi_window(food_logs, symptom_logs, [time_window_hours])[time_window_hours]
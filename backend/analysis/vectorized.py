@@ -0,0 +1,142 @@
+"""
+Array-backed implementation of the symptom-ingredient association analysis.
+
+Produces the same output as ``analysis.algorithm.get_analysis`` but builds the
+a/b/c/d contingency counts for every ingredient of a symptom as integer NumPy
+vectors and computes all one-sided Fisher p-values for that symptom in one
+batched call instead of one ``fisher_exact`` call per cell.
+"""
+
+import numpy as np
+
+from analysis.columnar import FoodColumns, SymptomColumns, hours_to_microseconds
+from analysis.fisher import fisher_cache
+from analysis.models import FoodLogEntry, IngredientSymptomMetrics, SymptomLogEntry
+
+
+def get_analysis_vectorized(
+    food_logs: list[FoodLogEntry] | FoodColumns,
+    symptom_logs: list[SymptomLogEntry] | SymptomColumns,
+    time_window_hours: float,
+) -> dict[str, dict[str, IngredientSymptomMetrics]]:
+    """
+    Same contract as ``get_analysis``: foods sorted by timestamp, foods counted
+    once per symptom type, intensities collected from every overlapping window.
+    Either log list may already be in the columnar representation.
+    """
+    if time_window_hours < 0:
+        raise ValueError("time_window_hours must be >= 0")
+
+    if not len(food_logs) or not len(symptom_logs):
+        return {}
+
+    foods = FoodColumns.of(food_logs)
+    symptoms = SymptomColumns.of(symptom_logs)
+    window = hours_to_microseconds(time_window_hours)
+    food_times = foods.timestamps
+
+    if not len(foods.ingredient_ids):
+        return {}
+
+    ingredient_names = foods.vocabulary.names
+
+    n_ingredients = len(ingredient_names)
+    food_index_of = foods.food_index_of()
+    ingredient_id_of = foods.ingredient_ids
+    ingredient_totals = foods.ingredient_totals()
+    total_food_events = len(foods)
+
+    result: dict[str, dict[str, IngredientSymptomMetrics]] = {}
+    for symptom_name, symptom_times, intensities in symptoms.groups():
+        # Window for a symptom at s is [s - window, s) over the sorted food timeline.
+        starts = np.searchsorted(food_times, symptom_times - window, side="left")
+        ends = np.searchsorted(food_times, symptom_times, side="left")
+
+        # Difference arrays give, for every food, how many windows cover it and
+        # the summed intensity of those symptoms.
+        hits = _coverage(starts, ends, np.ones_like(intensities), len(foods))
+        intensity_per_food = _coverage(starts, ends, intensities, len(foods))
+        covered = hits > 0
+
+        exposures = np.bincount(ingredient_id_of, weights=covered[food_index_of], minlength=n_ingredients)
+        exposures = exposures.astype(np.int64)
+        present = np.flatnonzero(exposures)
+        if present.size == 0:
+            continue
+
+        intensity_sums = np.bincount(
+            ingredient_id_of, weights=intensity_per_food[food_index_of], minlength=n_ingredients
+        )[present]
+        intensity_counts = np.bincount(ingredient_id_of, weights=hits[food_index_of], minlength=n_ingredients)[present]
+
+        total_in_window = int(np.count_nonzero(covered))
+        metrics = metrics_from_counts(
+            a=exposures[present],
+            ingredient_total=ingredient_totals[present],
+            total_in_window=total_in_window,
+            total_food_events=total_food_events,
+            intensity_sums=intensity_sums,
+            intensity_counts=intensity_counts,
+        )
+        result[symptom_name] = {ingredient_names[i]: m for i, m in zip(present, metrics)}
+
+    return result
+
+
+def metrics_from_counts(
+    a,
+    ingredient_total,
+    total_in_window,
+    total_food_events,
+    intensity_sums,
+    intensity_counts,
+) -> list[IngredientSymptomMetrics]:
+    """
+    Batched ``analysis.algorithm.compute_metrics``: one IngredientSymptomMetrics per cell.
+
+    Arguments are equal-length arrays (or scalars broadcast against them) of the raw
+    counts behind each (symptom, ingredient) cell; results are rounded exactly like
+    the per-cell implementation. Raises ValueError if any cell's counts imply a
+    negative contingency table entry.
+    """
+    a, ingredient_total, total_in_window, total_food_events = (
+        np.asarray(x, dtype=np.int64) for x in (a, ingredient_total, total_in_window, total_food_events)
+    )
+    intensity_sums = np.asarray(intensity_sums, dtype=np.float64)
+    intensity_counts = np.asarray(intensity_counts, dtype=np.float64)
+
+    b = ingredient_total - a
+    c = total_in_window - a
+    unexposed_total = total_food_events - ingredient_total
+    d = unexposed_total - c
+    # Consistent counts never yield a negative cell; publishing metrics for one would be wrong.
+    inconsistent = np.count_nonzero(np.minimum(np.minimum(a, b), np.minimum(c, d)) < 0)
+    if inconsistent:
+        raise ValueError(f"inconsistent counts: {inconsistent} contingency table(s) have a negative cell")
+
+    a, b, c, unexposed_total, ingredient_total = np.broadcast_arrays(a, b, c, unexposed_total, ingredient_total)
+    p_values = fisher_cache.p_values(a, b, c, d)
+    intensity_sums, intensity_counts = np.broadcast_arrays(intensity_sums, intensity_counts)
+
+    metrics: list[IngredientSymptomMetrics] = []
+    for i in range(a.size):
+        base_rate = c[i] / unexposed_total[i] if unexposed_total[i] > 0 else 0.0
+        avg_intensity = intensity_sums[i] / intensity_counts[i] if intensity_counts[i] else 0.0
+        metrics.append(
+            IngredientSymptomMetrics(
+                exposures=int(a[i]),
+                trigger_rate=round(float(a[i] / ingredient_total[i]), 4),
+                base_rate=round(float(base_rate), 4),
+                fishers_p_value=round(float(p_values[i]), 6),
+                average_intensity=round(float(avg_intensity), 2),
+            )
+        )
+    return metrics
+
+
+def _coverage(starts: np.ndarray, ends: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+    """Sum ``weights`` over every half-open index range [starts[i], ends[i]) into a length-``size`` array."""
+    diff = np.zeros(size + 1, dtype=np.int64)
+    np.add.at(diff, starts, weights)
+    np.add.at(diff, ends, -weights)
+    return np.cumsum(diff[:-1])
@@ -17,16 +17,13 @@ Common use cases (Most likely what we'll do):
 import os
 
 import pytest
-from passlib.context import CryptContext
 from sqlalchemy import create_engine, text
 
-import services.auth_service as _auth_svc
-from database import Base
-
 # Use minimal bcrypt rounds in tests — default 12 rounds takes ~200ms per hash,
-# 4 rounds takes ~5ms. Patched here before any test imports auth_service.
-_auth_svc.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4)
+# 4 rounds takes ~5ms. Set here before anything imports auth_service.
+os.environ["BCRYPT_ROUNDS"] = "4"
 
+from database import Base  # noqa: E402
 from models.food import Food  # noqa: E402
 from models.food_log import FoodLog  # noqa: E402
 from models.symptom import Symptom  # noqa: E402
@@ -88,14 +85,26 @@ def test_client(db_session):
     the same isolated, rolled-back test database as direct service tests.
     """
     from fastapi.testclient import TestClient
+    from sqlalchemy.orm import Session
 
-    from database import get_db
+    from database import get_db, get_read_db, get_session_factory
     from main import app
+    from services.principal_cache import principal_cache
 
     def override_get_db():
         yield db_session
 
+    def worker_session():
+        # Work run on a worker pool opens its own session: join the test transaction through a
+        # savepoint so it sees the test's data and is rolled back with it.
+        return Session(bind=db_session.connection(), join_transaction_mode="create_savepoint")
+
+    # Tokens minted in the same second for the same username are identical across tests.
+    principal_cache.clear()
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: worker_session
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
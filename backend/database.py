@@ -1,25 +1,197 @@
 """Database connection and session management."""
 
 import os
+import threading
+import time
+import uuid
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from fastapi import Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Serve read endpoints from an asyncpg-backed AsyncSession instead of the sync pool.
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() == "true"
+
+# Pool sizing is per engine and per process: each uvicorn worker holds up to
+# POOL_SIZE + MAX_OVERFLOW connections (twice that with DATABASE_ASYNC), so keep
+# workers * that total under the server's max_connections.
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+# "true" tests every checkout with a round trip; "false" relies on DATABASE_POOL_RECYCLE
+# to retire connections before the server or a proxy drops them.
+DATABASE_POOL_PRE_PING = os.getenv("DATABASE_POOL_PRE_PING", "true").lower() == "true"
+DATABASE_STATEMENT_TIMEOUT_MS = int(os.getenv("DATABASE_STATEMENT_TIMEOUT_MS", "0"))
+# Behind PgBouncer in transaction mode: no local pool, no session state, no prepared statements.
+DATABASE_PGBOUNCER = os.getenv("DATABASE_PGBOUNCER", "false").lower() == "true"
+
+
+def async_database_url(url: str | URL) -> URL:
+    """The asyncpg form of a postgresql:// URL; libpq's sslmode becomes asyncpg's ssl."""
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    if "sslmode" in url.query:
+        url = url.update_query_dict({"ssl": url.query["sslmode"]}).difference_update_query(["sslmode"])
+    return url
+
+
+class _CheckoutWaits:
+    """How long checkouts waited on a pool, and how many gave up at DATABASE_POOL_TIMEOUT."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def timed(self, connect):
+        started = time.perf_counter()
+        try:
+            return connect()
+        except PoolTimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._lock:
+                self.count += 1
+                self.total_seconds += waited
+                self.max_seconds = max(self.max_seconds, waited)
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    QueuePool that records checkout waits (including connects) for pool_status().
+
+    Engines check out through the public Pool.connect(); the pool's checkout event
+    only fires once a connection is in hand, so it cannot time the wait.
+    """
+
+    def __init__(self, creator, pool_size: int = 5, max_overflow: int = 10, **kwargs):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        self.waits = _CheckoutWaits()
+
+    def connect(self):
+        return self.waits.timed(super().connect)
+
+
+class MeteredAsyncQueuePool(MeteredQueuePool, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool counterpart of MeteredQueuePool."""
+
+
+def engine_options(asynchronous: bool = False, pool_size: int | None = None, max_overflow: int | None = None) -> dict:
+    """
+    create_engine / create_async_engine keyword arguments for the configured pooling.
+
+    ``pool_size`` and ``max_overflow`` replace the configured sizes (e.g. one connection
+    per batch worker process); they do not apply under DATABASE_PGBOUNCER.
+    """
+    if DATABASE_PGBOUNCER:
+        # PgBouncer pools the server connections; holding idle ones here would pin them.
+        options = {"poolclass": NullPool, "pool_pre_ping": False}
+        if asynchronous:
+            # Prepared statements live on one server connection, which the next transaction may not get.
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+    else:
+        options = {
+            "poolclass": MeteredAsyncQueuePool if asynchronous else MeteredQueuePool,
+            "pool_size": DATABASE_POOL_SIZE if pool_size is None else pool_size,
+            "max_overflow": DATABASE_MAX_OVERFLOW if max_overflow is None else max_overflow,
+            "pool_timeout": DATABASE_POOL_TIMEOUT,
+            "pool_recycle": DATABASE_POOL_RECYCLE,
+            "pool_pre_ping": DATABASE_POOL_PRE_PING,
+        }
+        if DATABASE_STATEMENT_TIMEOUT_MS:
+            timeout = str(DATABASE_STATEMENT_TIMEOUT_MS)
+            options["connect_args"] = (
+                {"server_settings": {"statement_timeout": timeout}}
+                if asynchronous
+                else {"options": f"-c statement_timeout={timeout}"}
+            )
+    return options
+
+
+def apply_statement_timeout(engine) -> None:
+    """
+    Under DATABASE_PGBOUNCER, set the statement timeout per transaction.
+
+    PgBouncer rejects it as a startup option, and a session-level SET would leak to
+    whichever client gets the server connection next; SET LOCAL ends with the transaction.
+    """
+    if not (DATABASE_PGBOUNCER and DATABASE_STATEMENT_TIMEOUT_MS):
+        return
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "begin")
+    def _set_local_statement_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {DATABASE_STATEMENT_TIMEOUT_MS}")
+
+
 if DATABASE_URL:
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    engine = create_engine(DATABASE_URL, **engine_options())
+    apply_statement_timeout(engine)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 else:
     engine = None
     SessionLocal = None
 
+if DATABASE_URL and DATABASE_ASYNC:
+    try:
+        import asyncpg  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("DATABASE_ASYNC=true needs the asyncpg package (pip install 'backend[async]')") from e
+    async_engine = create_async_engine(async_database_url(DATABASE_URL), **engine_options(asynchronous=True))
+    apply_statement_timeout(async_engine)
+    # Objects stay readable after commit: lazy refreshes would need an await.
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
 Base = declarative_base()
 
 
+def pool_status(engine) -> dict:
+    """Utilization of an engine's connection pool, for the /db-pool endpoint."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    status = {"pool": type(pool).__name__, "pgbouncer": DATABASE_PGBOUNCER}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            max_overflow=getattr(pool, "max_overflow", None),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            # QueuePool counts overflow from -size; only connections beyond pool_size are overflow.
+            overflow=max(pool.overflow(), 0),
+        )
+    waits = getattr(pool, "waits", None)
+    if waits is not None:
+        with waits._lock:
+            status.update(
+                checkouts=waits.count,
+                avg_wait_ms=waits.total_seconds / waits.count * 1000 if waits.count else 0.0,
+                max_wait_ms=waits.max_seconds * 1000,
+                timeouts=waits.timeouts,
+            )
+    return status
+
+
 def get_db():
     """
     Dependency function to get database session.
@@ -32,3 +204,36 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_session_factory() -> sessionmaker:
+    """
+    Dependency for routes that hand database work to a worker pool.
+
+    The work opens its own Session from the factory (WorkerPool.run_in_session), since
+    the one get_db yields is closed when the request ends, even if a cancelled request
+    left the work running.
+    """
+    return SessionLocal
+
+
+async def get_async_db():
+    """Dependency function to get an AsyncSession; requires DATABASE_ASYNC=true."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db(sync_db: Session = Depends(get_db)):
+    """
+    Dependency for read-only routes: an AsyncSession when DATABASE_ASYNC is on, else a sync Session.
+
+    Routes using it must handle both (``isinstance(db, AsyncSession)``), so they keep
+    working when the async engine is switched off. The sync Session is the request's
+    get_db session, so a route and get_current_user share one connection checkout;
+    it is only opened when first used.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        yield sync_db
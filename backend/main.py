@@ -7,14 +7,17 @@ This module initializes the FastAPI application and registers all route handlers
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from scalar_fastapi import get_scalar_api_reference
 from sqlalchemy import inspect as sa_inspect
 from sqlalchemy import text
 
-from database import Base, engine
-from middleware.logging_middleware import LoggingMiddleware
+from database import Base, async_engine, engine, pool_status
+from middleware.logging_middleware import LoggingMiddleware, configure_logging, stop_logging
+from middleware.metrics_middleware import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, instrument_engine, render_metrics
+from routers.algorithm_router import NEXT_CURSOR_HEADER
 from routers.algorithm_router import router as algorithm_router
 from routers.auth import router as auth_router
 from routers.food_log_router import router as food_log_router
@@ -23,6 +26,9 @@ from routers.ingest_router import router as ingest_router
 from routers.symptom_log_router import router as symptom_log_router
 from routers.symptom_router import router as symptom_router
 from routers.tag_router import router as tag_router
+from schemas.executor import WorkerPoolStats
+from schemas.health import DatabasePoolStats
+from services.executors import POOLS, PoolSaturatedError, shutdown_pools
 
 logger = logging.getLogger(__name__)
 
@@ -55,6 +61,7 @@ def _sync_schema() -> None:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    configure_logging()
     if engine is not None:
         with engine.connect() as conn:
             conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
@@ -62,6 +69,8 @@ async def lifespan(app: FastAPI):
         Base.metadata.create_all(bind=engine)
         _sync_schema()
     yield
+    shutdown_pools()
+    stop_logging()
 
 
 app = FastAPI(
@@ -106,6 +115,11 @@ def custom_openapi():
 app.openapi = custom_openapi
 
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+for instrumented_engine in (engine, async_engine):
+    if instrumented_engine is not None:
+        instrument_engine(instrumented_engine)
 
 
 app.add_middleware(
@@ -114,8 +128,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request: Request, exc: PoolSaturatedError) -> JSONResponse:
+    """A full worker pool sheds load with 503 instead of queueing without bound."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
 app.include_router(auth_router)
 app.include_router(algorithm_router)
 app.include_router(symptom_log_router)
@@ -162,3 +188,37 @@ async def health_check() -> dict[str, str]:
         dict: Service health status
     """
     return {"status": "healthy"}
+
+
+@app.get("/executors", tags=["Health"], response_model=list[WorkerPoolStats])
+async def executor_stats() -> list[WorkerPoolStats]:
+    """
+    Load of the worker pools that algorithm runs, suggestions, ingest and password hashing use.
+
+    Returns:
+        list[WorkerPoolStats]: One entry per pool, for this worker process
+    """
+    return [WorkerPoolStats(**pool.info()) for pool in POOLS]
+
+
+@app.get("/db-pool", tags=["Health"], response_model=list[DatabasePoolStats])
+async def database_pool_stats() -> list[DatabasePoolStats]:
+    """
+    Connection pool utilization of this worker process, to size DATABASE_POOL_SIZE per uvicorn worker.
+
+    Returns:
+        list[DatabasePoolStats]: The sync engine's pool, and the async engine's when enabled
+    """
+    engines = {"sync": engine, "async": async_engine}
+    return [DatabasePoolStats(engine=name, **pool_status(e)) for name, e in engines.items() if e is not None]
+
+
+@app.get("/metrics", tags=["Health"], response_class=Response)
+async def metrics() -> Response:
+    """
+    Request latency, in-flight requests and database queries per route, for Prometheus to scrape.
+
+    Returns:
+        Response: Prometheus text exposition format, for this worker process
+    """
+    return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
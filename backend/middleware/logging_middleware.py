@@ -1,26 +1,144 @@
+"""
+Access logging, written to LOG_FILE off the event loop.
+
+configure_logging() routes the root logger through a QueueHandler: a log call only
+enqueues the record, and a QueueListener thread does the file I/O. The app's lifespan
+configures logging on startup and calls stop_logging() on shutdown. The queue holds
+at most LOG_QUEUE_SIZE records; when the writer falls that far behind, new records
+are dropped and counted rather than blocking requests or growing without bound.
+
+LoggingMiddleware is plain ASGI rather than BaseHTTPMiddleware, and writes one JSON
+line per request once the response has been sent.
+"""
+
+import json
 import logging
+import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
 
-logging.basicConfig(filename="app.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Log request details
-        client_ip = request.client.host
-        method = request.method
-        url = request.url.path
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records, counting them in ``dropped``, while its bounded queue is full."""
+
+    def __init__(self, records: queue.Queue):
+        super().__init__(records)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1  # emit() runs under the handler's lock
+
+
+_queue_handler: DroppingQueueHandler | None = None
+_listener: QueueListener | None = None
+
+
+def queue_logging(
+    *handlers: logging.Handler, maxsize: int = LOG_QUEUE_SIZE
+) -> tuple[DroppingQueueHandler, QueueListener]:
+    """A QueueHandler feeding ``handlers`` through a QueueListener, which the caller starts."""
+    records = queue.Queue(maxsize)
+    return DroppingQueueHandler(records), QueueListener(records, *handlers, respect_handler_level=True)
+
+
+def configure_logging(filename: str = LOG_FILE, level: int = logging.INFO) -> None:
+    """
+    Send the root logger's records to ``filename`` through a queue and start the writer thread.
+
+    Call on startup; repeated calls do nothing until stop_logging().
+    """
+    global _queue_handler, _listener
+    if _listener is not None:
+        return
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _queue_handler, _listener = queue_logging(file_handler)
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Detach from the root logger, write out the queued records and stop the writer thread; call on shutdown."""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    if _queue_handler.dropped:
+        warning = logger.makeRecord(
+            logger.name,
+            logging.WARNING,
+            __file__,
+            0,
+            "Dropped %d log records while the log queue (LOG_QUEUE_SIZE=%d) was full",
+            (_queue_handler.dropped, _queue_handler.queue.maxsize),
+            None,
+        )
+        for handler in _listener.handlers:
+            handler.handle(warning)
+    for handler in _listener.handlers:
+        handler.close()
+    _queue_handler = _listener = None
+
+
+class LoggingMiddleware:
+    """
+    One access log line per HTTP request: method, route template, status, latency and body size.
+
+    ``route`` is the matched path template (``/food/{food_id}``), or null when no route
+    matched; ``path`` is the concrete path. A request whose handler raised before
+    responding is logged with status 500.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        logger.info(f"Request: {method} {url} from {client_ip}")
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        # Process the request
-        response = await call_next(request)
+        started = time.perf_counter()
+        status_code = 500
+        response_bytes = 0
 
-        # Log response details
-        status_code = response.status_code
-        logger.info(f"Response: {method} {url} returned {status_code} to {client_ip}")
+        async def send_and_measure(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
 
-        return response
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            route = scope.get("route")
+            client = scope.get("client")
+            logger.info(
+                json.dumps(
+                    {
+                        "method": scope["method"],
+                        "route": getattr(route, "path", None),
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                        "response_bytes": response_bytes,
+                        "client": client[0] if client else None,
+                    }
+                )
+            )
@@ -0,0 +1,254 @@
+"""
+Request instrumentation exposed in Prometheus text format at GET /metrics.
+
+MetricsMiddleware records, per method and route template, a request counter (by
+status), a latency histogram, and how many database queries each request ran and
+how long they took. A gauge tracks requests in flight. Queries are counted by
+cursor-execute hooks that instrument_engine() installs on an engine. Each query is
+charged to the request whose context ran it, including work the request handed to a
+worker pool or threadpool, since both copy the request's context.
+
+Counters are per process, like the /executors and cache stats: with several
+uvicorn workers, each one is scraped (or summed) separately. The metric types and the
+text format (version 0.0.4) are implemented here rather than with prometheus_client,
+which the backend does not depend on.
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Sequence
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Requests that matched no route share one label, so probing random paths cannot grow the series.
+UNMATCHED_ROUTE = "unmatched"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _escape_help(text: str) -> str:
+    # HELP text escapes backslashes and line feeds, but not double quotes.
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {_escape_help(self.help_text)}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labels:
+            values = [((), 0.0)]
+        return self._header() + [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values: str) -> None:
+        self.inc(*label_values, amount=-1.0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = ()):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: observations per bucket (the last slot is +Inf), their sum, and their count.
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(label_values, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, *label_values: str) -> int:
+        with self._lock:
+            series = self._series.get(label_values)
+            return sum(series[0]) if series else 0
+
+    def sum(self, *label_values: str) -> float:
+        with self._lock:
+            series = self._series.get(label_values)
+            return series[1][0] if series else 0.0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        lines = self._header()
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                bucket = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, bucket)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+requests_total = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"), LATENCY_BUCKETS
+)
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served.", ("method",))
+request_db_queries = Histogram(
+    "http_request_db_queries", "Database queries run per HTTP request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent in database queries per HTTP request.", ("method", "route"), LATENCY_BUCKETS
+)
+db_queries_total = Counter("db_queries_total", "Database queries run by this process, in requests or not.")
+db_query_seconds_total = Counter("db_query_seconds_total", "Time spent in database queries by this process.")
+
+REGISTRY = (
+    requests_total,
+    request_duration,
+    requests_in_flight,
+    request_db_queries,
+    request_db_seconds,
+    db_queries_total,
+    db_query_seconds_total,
+)
+
+
+def render_metrics() -> str:
+    """Every metric in Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class _RequestQueries:
+    """Queries charged to one request; worker threads of the request may add to it concurrently."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+
+
+_request_queries: ContextVar[_RequestQueries | None] = ContextVar("request_queries", default=None)
+
+
+def instrument_engine(engine) -> None:
+    """Count and time every query ``engine`` (sync or async) runs, per request and in total."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        db_queries_total.inc()
+        db_query_seconds_total.inc(amount=seconds)
+        queries = _request_queries.get()
+        if queries is not None:
+            queries.add(seconds)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _drop_query_timer(exception_context):
+        # A failed query never reaches after_cursor_execute; keep the timers paired.
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+class MetricsMiddleware:
+    """
+    Feeds the request metrics above; plain ASGI, like LoggingMiddleware.
+
+    A request whose handler raised before responding is counted with status 500.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_and_record_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        queries = _RequestQueries()
+        token = _request_queries.set(queries)
+        requests_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec(method)
+            _request_queries.reset(token)
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            requests_total.inc(method, route, str(status_code))
+            request_duration.observe(elapsed, method, route)
+            request_db_queries.observe(queries.count, method, route)
+            request_db_seconds.observe(queries.seconds, method, route)
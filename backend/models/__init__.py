@@ -10,6 +10,9 @@ from models import (
 from models import (
     metrics as metrics,
 )
+from models import (
+    metrics_stats as metrics_stats,
+)
 from models import (
     symptom as symptom,
 )
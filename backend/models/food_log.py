@@ -2,7 +2,7 @@
 
 import uuid
 
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -25,3 +25,9 @@ class FoodLog(Base):
 
     food = relationship("Food", back_populates="food_logs")
     food_log_tags = relationship("FoodLogTag", back_populates="food_log")
+
+    # Per-user timelines (analysis reads, list endpoints) filter by username and order by timestamp;
+    # including food_id lets the analysis join to foods straight from the index.
+    __table_args__ = (
+        Index("ix_food_logs_username_timestamp", "username", "timestamp", postgresql_include=["food_id"]),
+    )
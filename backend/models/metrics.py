@@ -2,7 +2,7 @@
 
 import uuid
 
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 
@@ -28,4 +28,10 @@ class Metrics(Base):
 
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    __table_args__ = (UniqueConstraint("username", "symptom_id", "ingredient", name="uq_user_symptom_ingredient"),)
+    # GET /algorithm/user/{user_id} pages through a user's associations by exposures (strongest first) or by
+    # p-value (most significant first); the id tiebreaker makes both orders total, as keyset cursors require.
+    __table_args__ = (
+        UniqueConstraint("username", "symptom_id", "ingredient", name="uq_user_symptom_ingredient"),
+        Index("ix_metrics_username_exposures_id", username, exposures.desc(), id.desc()),
+        Index("ix_metrics_username_p_value_id", username, fishers_p_value, id),
+    )
@@ -0,0 +1,90 @@
+"""Sufficient-statistics models behind the ingredient symptom metrics.
+
+These hold the raw counts the association metrics are derived from, so a single
+food or symptom log write can be folded in without re-reading the user's history.
+"""
+
+import uuid
+
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from database import Base
+
+
+class IngredientTotal(Base):
+    """Number of a user's food events containing each ingredient (window independent)."""
+
+    __tablename__ = "ingredient_totals"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    username = Column(String, ForeignKey("users.username", ondelete="CASCADE"), nullable=False)
+    ingredient = Column(String, nullable=False)
+    food_events = Column(Integer, nullable=False)
+
+    __table_args__ = (UniqueConstraint("username", "ingredient", name="uq_ingredient_totals_user_ingredient"),)
+
+
+class FoodEventTotal(Base):
+    """Number of a user's food events, the N of every contingency table (window independent)."""
+
+    __tablename__ = "food_event_totals"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    username = Column(String, ForeignKey("users.username", ondelete="CASCADE"), nullable=False)
+    food_events = Column(Integer, nullable=False)
+
+    __table_args__ = (UniqueConstraint("username", name="uq_food_event_totals_user"),)
+
+
+class SymptomWindowStat(Base):
+    """Distinct food events inside any window of a symptom.
+
+    A row's presence also marks (user, symptom, window) as tracked for incremental updates.
+    ``backs_metrics`` flags the window of the symptom's latest algorithm run, i.e. the
+    window the stored ingredient_symptom_metrics rows reflect.
+    """
+
+    __tablename__ = "symptom_window_stats"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    username = Column(String, ForeignKey("users.username", ondelete="CASCADE"), nullable=False)
+    symptom_id = Column(UUID(as_uuid=True), ForeignKey("symptoms.id", ondelete="CASCADE"), nullable=False)
+    time_window_hours = Column(Float, nullable=False)
+    foods_in_window = Column(Integer, nullable=False)
+    backs_metrics = Column(Boolean, nullable=False, default=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("username", "symptom_id", "time_window_hours", name="uq_symptom_window_stats_user_symptom"),
+    )
+
+
+class ExposureStat(Base):
+    """Exposure count and intensity totals for one (user, symptom, ingredient, window) cell."""
+
+    __tablename__ = "ingredient_exposure_stats"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    username = Column(String, ForeignKey("users.username", ondelete="CASCADE"), nullable=False)
+    symptom_id = Column(UUID(as_uuid=True), ForeignKey("symptoms.id", ondelete="CASCADE"), nullable=False)
+    ingredient = Column(String, nullable=False)
+    time_window_hours = Column(Float, nullable=False)
+
+    exposures = Column(Integer, nullable=False)
+    intensity_sum = Column(Integer, nullable=False)
+    intensity_count = Column(Integer, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint(
+            "username",
+            "symptom_id",
+            "ingredient",
+            "time_window_hours",
+            name="uq_exposure_stats_user_symptom_ingredient",
+        ),
+    )
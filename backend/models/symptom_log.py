@@ -2,7 +2,7 @@
 
 import uuid
 
-from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -25,3 +25,21 @@ class SymptomLog(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     symptom = relationship("Symptom", back_populates="symptom_logs")
+
+    # Whole-timeline reads and symptom-scoped reads (symptom_ids filters, incremental windows)
+    # both order by timestamp; the included columns are everything the analysis needs.
+    __table_args__ = (
+        Index(
+            "ix_symptom_logs_username_timestamp",
+            "username",
+            "timestamp",
+            postgresql_include=["symptom_id", "intensity"],
+        ),
+        Index(
+            "ix_symptom_logs_username_symptom_timestamp",
+            "username",
+            "symptom_id",
+            "timestamp",
+            postgresql_include=["intensity"],
+        ),
+    )
@@ -2,6 +2,8 @@ import logging
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from models.food_log import FoodLog
@@ -13,13 +15,16 @@ logger = logging.getLogger(__name__)
 class FoodLogRepository:
     """Repository for database interactions related to food logs."""
 
-    def create_food_log(self, db: Session, food_log_data: FoodLogCreate) -> FoodLog:
-        """Create a new food log entry."""
+    def create_food_log(self, db: Session, food_log_data: FoodLogCreate, commit: bool = True) -> FoodLog:
+        """Create a new food log entry. With ``commit=False`` it is only flushed, for the caller to commit."""
         logger.info("Creating food log for user: %s", food_log_data.username)
         try:
             food_log = FoodLog(**food_log_data.model_dump())
             db.add(food_log)
-            db.commit()
+            if commit:
+                db.commit()
+            else:
+                db.flush()
             db.refresh(food_log)
             return food_log
         except Exception as e:
@@ -32,12 +37,18 @@ class FoodLogRepository:
         logger.info("Retrieving food log with ID %s", food_log_id)
         return db.query(FoodLog).filter(FoodLog.id == food_log_id).first()
 
+    def get_food_logs_by_food_id(self, db: Session, food_id: UUID) -> list[FoodLog]:
+        """Retrieve every log of one food, across users."""
+        return db.query(FoodLog).filter(FoodLog.food_id == food_id).all()
+
     def get_food_logs_by_username(self, db: Session, username: str) -> list[FoodLog]:
         """Retrieve all food logs for a given user."""
         logger.info("Retrieving food logs for user: %s", username)
         return db.query(FoodLog).filter(FoodLog.username == username).all()
 
-    def update_food_log_by_id(self, db: Session, food_log_id: UUID, data: FoodLogUpdate) -> Optional[FoodLog]:
+    def update_food_log_by_id(
+        self, db: Session, food_log_id: UUID, data: FoodLogUpdate, commit: bool = True
+    ) -> Optional[FoodLog]:
         """Update a food log by its ID. Returns the updated log or None if not found."""
         food_log = self.get_food_log_by_id(db, food_log_id)
         if not food_log:
@@ -45,7 +56,10 @@ class FoodLogRepository:
         try:
             for field, value in data.model_dump(exclude_unset=True).items():
                 setattr(food_log, field, value)
-            db.commit()
+            if commit:
+                db.commit()
+            else:
+                db.flush()
             db.refresh(food_log)
             return food_log
         except Exception as e:
@@ -53,7 +67,7 @@ class FoodLogRepository:
             logger.error("Error updating food log %s: %s", food_log_id, e)
             raise
 
-    def delete_food_log_by_id(self, db: Session, food_log_id: UUID) -> Optional[FoodLog]:
+    def delete_food_log_by_id(self, db: Session, food_log_id: UUID, commit: bool = True) -> Optional[FoodLog]:
         """Delete a food log by its ID. Returns the deleted log or None if not found."""
         logger.info("Deleting food log with ID %s", food_log_id)
         food_log = self.get_food_log_by_id(db, food_log_id)
@@ -61,9 +75,26 @@ class FoodLogRepository:
             return None
         try:
             db.delete(food_log)
-            db.commit()
+            if commit:
+                db.commit()
+            else:
+                db.flush()
             return food_log
         except Exception as e:
             db.rollback()
             logger.error("Error deleting food log %s: %s", food_log_id, e)
             raise
+
+
+class AsyncFoodLogRepository:
+    """Read-only food log queries on an AsyncSession."""
+
+    async def get_food_log_by_id(self, db: AsyncSession, food_log_id: UUID) -> Optional[FoodLog]:
+        """Retrieve a food log by its ID."""
+        logger.info("Retrieving food log with ID %s", food_log_id)
+        return await db.scalar(select(FoodLog).where(FoodLog.id == food_log_id))
+
+    async def get_food_logs_by_username(self, db: AsyncSession, username: str) -> list[FoodLog]:
+        """Retrieve all food logs for a given user."""
+        logger.info("Retrieving food logs for user: %s", username)
+        return list(await db.scalars(select(FoodLog).where(FoodLog.username == username)))
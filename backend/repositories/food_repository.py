@@ -2,7 +2,9 @@ import logging
 from typing import Optional
 from uuid import UUID
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from models.food import Food
 from schemas.food import FoodCreate
@@ -54,12 +56,13 @@ class FoodRepository:
             db.rollback()
             raise e
 
-    def delete_food_by_id(self, db: Session, food_id: UUID) -> Optional[Food]:
+    def delete_food_by_id(self, db: Session, food_id: UUID, commit: bool = True) -> Optional[Food]:
         """
         Delete a food product from the database by its ID.
 
         Args:
             food_id: The ID of the food to delete
+            commit: False only flushes (which cascades to its logs), for the caller to commit
 
         Returns:
             the food deleted, or None if not found
@@ -73,7 +76,10 @@ class FoodRepository:
             return None
 
         db.delete(food)
-        db.commit()
+        if commit:
+            db.commit()
+        else:
+            db.flush()
         logging.info(f"Food with ID {food_id} successfully deleted")
         return food
 
@@ -104,13 +110,14 @@ class FoodRepository:
             query = query.filter(Food.username == username)
         return query.order_by(Food.created_at.desc()).all()
 
-    def update_food_by_id(self, db: Session, food_id: UUID, food_data: dict) -> Optional[Food]:
+    def update_food_by_id(self, db: Session, food_id: UUID, food_data: dict, commit: bool = True) -> Optional[Food]:
         """
         Update a food product from the database by its ID.
 
         Args:
             food_id (UUID): The ID of the food to retrieve
             food_data (dict): The updated field values
+            commit (bool): False leaves the commit to the caller
 
         Returns:
             Food: the newly updated food with all fields, or None if not found
@@ -118,6 +125,36 @@ class FoodRepository:
         logging.info(f"Updating food with ID {food_id} in database")
 
         db.query(Food).filter(Food.id == food_id).update(food_data)
-        db.commit()
+        if commit:
+            db.commit()
         food = db.query(Food).filter(Food.id == food_id).first()
         return food
+
+
+class AsyncFoodRepository:
+    """
+    Read-only food queries on an AsyncSession, for the async read endpoints.
+
+    Tags are loaded eagerly: an AsyncSession cannot lazy-load them when the response is built.
+    """
+
+    async def get_food_by_id(self, db: AsyncSession, food_id: UUID) -> Optional[Food]:
+        """
+        Retrieve a food product from the database by its ID.
+
+        Returns:
+            The food with the specified ID, or None if not found
+        """
+
+        logging.info(f"Retrieving food with ID {food_id} from database")
+        return await db.scalar(select(Food).options(selectinload(Food.tags)).where(Food.id == food_id))
+
+    async def get_all_foods(self, db: AsyncSession, username: Optional[str] = None) -> list[Food]:
+        """
+        Retrieve a list of all Food products in the database, optionally filtered by username.
+        """
+        logging.info(f"Retrieving all food from the database (username={username})")
+        query = select(Food).options(selectinload(Food.tags))
+        if username:
+            query = query.where(Food.username == username)
+        return list(await db.scalars(query.order_by(Food.created_at.desc())))
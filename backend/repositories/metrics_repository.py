@@ -1,12 +1,109 @@
 """Repository for ingredient symptom metrics."""
 
+import math
+from collections.abc import Collection
+from dataclasses import dataclass
 from uuid import UUID
 
+from sqlalchemy import Float, Integer, column, delete, func, literal, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from models.metrics import Metrics
 
+# Postgres caps a statement at 65535 bind parameters; each metrics row uses 8.
+UPSERT_CHUNK_ROWS = 5000
+
+# Session.info key: users whose metrics this session wrote; the association cache drops them on commit.
+METRICS_WRITTEN_USERS = "metrics_written_users"
+
+_FLOAT_FIELDS = ("trigger_rate", "base_rate", "fishers_p_value", "average_intensity")
+
+
+@dataclass
+class MetricsWriteCounts:
+    """Rows touched by a diffed metrics write."""
+
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+
+def _is_unchanged(row: Metrics, m) -> bool:
+    # Recomputed floats can differ in the last bits (e.g. cached vs freshly computed p-values).
+    return row.exposures == m.exposures and all(
+        math.isclose(getattr(row, name), getattr(m, name), rel_tol=1e-12) for name in _FLOAT_FIELDS
+    )
+
+
+def _metric_rows(username: str, symptom_id: UUID, metrics_by_ingredient: dict) -> list[dict]:
+    return [
+        {
+            "username": username,
+            "symptom_id": symptom_id,
+            "ingredient": ingredient,
+            "exposures": m.exposures,
+            "trigger_rate": m.trigger_rate,
+            "base_rate": m.base_rate,
+            "fishers_p_value": m.fishers_p_value,
+            "average_intensity": m.average_intensity,
+        }
+        for ingredient, m in metrics_by_ingredient.items()
+    ]
+
+
+def _upsert_statement(rows: list[dict]):
+    stmt = insert(Metrics).values(rows)
+    return stmt.on_conflict_do_update(
+        constraint="uq_user_symptom_ingredient",
+        set_={
+            "exposures": stmt.excluded.exposures,
+            "trigger_rate": stmt.excluded.trigger_rate,
+            "base_rate": stmt.excluded.base_rate,
+            "fishers_p_value": stmt.excluded.fishers_p_value,
+            "average_intensity": stmt.excluded.average_intensity,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+def _list_statement(
+    username: str,
+    symptom_ids: Collection[UUID] | None,
+    sort: str,
+    limit: int | None,
+    after: tuple | None,
+    min_exposures: int | None,
+    max_p_value: float | None,
+):
+    stmt = select(Metrics).where(Metrics.username == username)
+    if symptom_ids:
+        stmt = stmt.where(Metrics.symptom_id.in_(list(symptom_ids)))
+    if min_exposures is not None:
+        stmt = stmt.where(Metrics.exposures >= min_exposures)
+    if max_p_value is not None:
+        stmt = stmt.where(Metrics.fishers_p_value <= max_p_value)
+
+    if sort == "exposures":
+        keyset = tuple_(Metrics.exposures, Metrics.id)
+        if after is not None:
+            stmt = stmt.where(keyset < tuple_(literal(after[0], Integer), literal(after[1], PG_UUID(as_uuid=True))))
+        stmt = stmt.order_by(Metrics.exposures.desc(), Metrics.id.desc())
+    elif sort == "p_value":
+        keyset = tuple_(Metrics.fishers_p_value, Metrics.id)
+        if after is not None:
+            stmt = stmt.where(keyset > tuple_(literal(after[0], Float), literal(after[1], PG_UUID(as_uuid=True))))
+        stmt = stmt.order_by(Metrics.fishers_p_value.asc(), Metrics.id.asc())
+    else:
+        raise ValueError(f"Unknown sort {sort!r}")
+
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
 
 class MetricsRepository:
     """Handles all DB operations for ingredient_symptom_metrics."""
@@ -19,6 +116,7 @@ class MetricsRepository:
         username: str,
         symptom_id: UUID,
         metrics_by_ingredient: dict,
+        commit: bool = True,
     ) -> None:
         """
         Bulk upsert metrics for a single (username, symptom_id) pair.
@@ -28,39 +126,131 @@ class MetricsRepository:
             symptom_id: The symptom UUID being analyzed.
             metrics_by_ingredient: Dict of ingredient -> IngredientSymptomMetrics
                                    (the inner dict from get_analysis() output).
+            commit: False leaves the commit to the caller, e.g. to land with the log write it reflects.
         """
         if not metrics_by_ingredient:
             return
 
+        self.db.execute(_upsert_statement(_metric_rows(username, symptom_id, metrics_by_ingredient)))
+        self._mark_written(username)
+        if commit:
+            self.db.commit()
+
+    def bulk_upsert_metrics(self, username: str, metrics_by_symptom: dict) -> list[Metrics]:
+        """
+        Upsert a whole run's metrics, for every symptom, and return the stored rows.
+
+        Rows go out in as few multi-row statements as the bind-parameter limit
+        allows, each reporting back through RETURNING, so no follow-up read is
+        needed. Does not commit: the caller commits the run as one transaction.
+
+        Args:
+            username: The user these metrics belong to.
+            metrics_by_symptom: Dict of symptom UUID -> ingredient -> IngredientSymptomMetrics.
+        """
         rows = [
-            {
-                "username": username,
-                "symptom_id": symptom_id,
-                "ingredient": ingredient,
-                "exposures": m.exposures,
-                "trigger_rate": m.trigger_rate,
-                "base_rate": m.base_rate,
-                "fishers_p_value": m.fishers_p_value,
-                "average_intensity": m.average_intensity,
-            }
-            for ingredient, m in metrics_by_ingredient.items()
+            row
+            for symptom_id, metrics_by_ingredient in metrics_by_symptom.items()
+            for row in _metric_rows(username, symptom_id, metrics_by_ingredient)
         ]
+        stored: list[Metrics] = []
+        if rows:
+            self._mark_written(username)
+        for start in range(0, len(rows), UPSERT_CHUNK_ROWS):
+            stmt = _upsert_statement(rows[start : start + UPSERT_CHUNK_ROWS]).returning(Metrics)
+            stored.extend(self.db.scalars(stmt, execution_options={"populate_existing": True}))
+        return stored
+
+    def sync_metrics(
+        self,
+        username: str,
+        metrics_by_symptom: dict,
+        symptom_ids: Collection[UUID] | None = None,
+    ) -> tuple[list[Metrics], MetricsWriteCounts]:
+        """
+        Make the stored metrics match a run's results, writing only what changed.
+
+        Stored rows in scope (``symptom_ids``, or every symptom of the user) are
+        diffed against ``metrics_by_symptom``: new cells are inserted, changed ones
+        updated, cells the run no longer produces deleted, and identical rows left
+        untouched so their ``updated_at`` stays put. Does not commit.
+
+        Returns:
+            The stored rows for the run's results, and counts of each kind of write.
+        """
+        stmt = select(Metrics).where(Metrics.username == username)
+        if symptom_ids is not None:
+            stmt = stmt.where(Metrics.symptom_id.in_(list(symptom_ids)))
+        stored = {(row.symptom_id, row.ingredient): row for row in self.db.scalars(stmt)}
+
+        new_metrics: dict = {}
+        changed: list[tuple] = []
+        rows: list[Metrics] = []
+        for symptom_id, metrics_by_ingredient in metrics_by_symptom.items():
+            for ingredient, m in metrics_by_ingredient.items():
+                row = stored.pop((symptom_id, ingredient), None)
+                if row is None:
+                    new_metrics.setdefault(symptom_id, {})[ingredient] = m
+                elif _is_unchanged(row, m):
+                    rows.append(row)
+                else:
+                    changed.append((row.id, m.exposures, *(getattr(m, name) for name in _FLOAT_FIELDS)))
+        counts = MetricsWriteCounts(unchanged=len(rows), deleted=len(stored))
+        if changed or stored:
+            self._mark_written(username)
+
+        inserted = self.bulk_upsert_metrics(username, new_metrics)
+        updated = self._update_changed(changed)
+        stale_ids = [row.id for row in stored.values()]
+        for start in range(0, len(stale_ids), UPSERT_CHUNK_ROWS):
+            self.db.execute(
+                delete(Metrics).where(Metrics.id.in_(stale_ids[start : start + UPSERT_CHUNK_ROWS])),
+                execution_options={"synchronize_session": False},
+            )
+        for row in stored.values():
+            self.db.expunge(row)
 
-        stmt = insert(Metrics).values(rows)
-        stmt = stmt.on_conflict_do_update(
-            constraint="uq_user_symptom_ingredient",
-            set_={
-                "exposures": stmt.excluded.exposures,
-                "trigger_rate": stmt.excluded.trigger_rate,
-                "base_rate": stmt.excluded.base_rate,
-                "fishers_p_value": stmt.excluded.fishers_p_value,
-                "average_intensity": stmt.excluded.average_intensity,
-                "updated_at": stmt.excluded.updated_at,
-            },
+        counts.inserted, counts.updated = len(inserted), len(updated)
+        return rows + inserted + updated, counts
+
+    def _update_changed(self, changed: list[tuple]) -> list[Metrics]:
+        """UPDATE ... FROM (VALUES ...) by id, a chunk per statement, returning the rewritten rows."""
+        stored: list[Metrics] = []
+        for start in range(0, len(changed), UPSERT_CHUNK_ROWS):
+            new_values = values(
+                column("id", PG_UUID(as_uuid=True)),
+                column("exposures", Integer),
+                *(column(name, Float) for name in _FLOAT_FIELDS),
+                name="new_values",
+            ).data(changed[start : start + UPSERT_CHUNK_ROWS])
+            stmt = (
+                update(Metrics)
+                .where(Metrics.id == new_values.c.id)
+                .values(
+                    exposures=new_values.c.exposures,
+                    **{name: new_values.c[name] for name in _FLOAT_FIELDS},
+                    updated_at=func.now(),
+                )
+                .returning(Metrics)
+            )
+            stored.extend(
+                self.db.scalars(stmt, execution_options={"synchronize_session": False, "populate_existing": True})
+            )
+        return stored
+
+    def delete_except(self, username: str, symptom_id: UUID, keep_ingredients) -> None:
+        """Delete a (username, symptom_id) pair's rows for ingredients not in keep_ingredients. Does not commit."""
+        self._mark_written(username)
+        self.db.execute(
+            delete(Metrics).where(
+                Metrics.username == username,
+                Metrics.symptom_id == symptom_id,
+                Metrics.ingredient.not_in(list(keep_ingredients)),
+            )
         )
 
-        self.db.execute(stmt)
-        self.db.commit()
+    def _mark_written(self, username: str) -> None:
+        self.db.info.setdefault(METRICS_WRITTEN_USERS, set()).add(username)
 
     def get_by_symptom(
         self,
@@ -85,3 +275,46 @@ class MetricsRepository:
         Fetch all ingredient metrics for a user across all symptoms, sorted by exposures desc.
         """
         return self.db.query(Metrics).filter_by(username=username).order_by(Metrics.exposures.desc()).all()
+
+    def list_by_user(
+        self,
+        username: str,
+        symptom_ids: Collection[UUID] | None = None,
+        sort: str = "exposures",
+        limit: int | None = None,
+        after: tuple | None = None,
+        min_exposures: int | None = None,
+        max_p_value: float | None = None,
+    ) -> list[Metrics]:
+        """
+        Fetch one page of a user's metrics, with filtering, ordering and paging done in SQL.
+
+        Args:
+            sort: "exposures" (most exposures first) or "p_value" (smallest p-value first);
+                  ties are broken by id so the order is total.
+            limit: Page size; None returns every matching row.
+            after: Keyset of the previous page's last row, (exposures or p-value, id).
+        """
+        stmt = _list_statement(username, symptom_ids, sort, limit, after, min_exposures, max_p_value)
+        return list(self.db.scalars(stmt))
+
+
+class AsyncMetricsRepository:
+    """Read-only metrics queries on an AsyncSession, for the async read endpoints."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_by_user(
+        self,
+        username: str,
+        symptom_ids: Collection[UUID] | None = None,
+        sort: str = "exposures",
+        limit: int | None = None,
+        after: tuple | None = None,
+        min_exposures: int | None = None,
+        max_p_value: float | None = None,
+    ) -> list[Metrics]:
+        """Same as MetricsRepository.list_by_user."""
+        stmt = _list_statement(username, symptom_ids, sort, limit, after, min_exposures, max_p_value)
+        return list(await self.db.scalars(stmt))
@@ -0,0 +1,336 @@
+"""Repository for the sufficient statistics behind ingredient symptom metrics."""
+
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from analysis.incremental import WindowStatsDelta
+from analysis.models import FoodLogEntry, SymptomLogEntry
+from models.food import Food
+from models.food_log import FoodLog
+from models.metrics_stats import ExposureStat, FoodEventTotal, IngredientTotal, SymptomWindowStat
+from models.symptom_log import SymptomLog
+
+
+class MetricsStatsRepository:
+    """
+    Handles all DB operations for food_event_totals, ingredient_totals,
+    symptom_window_stats and ingredient_exposure_stats.
+
+    Write methods only execute; the caller commits so that a log write, its
+    statistics delta and the refreshed metrics land in one transaction.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ── locking ──
+
+    def lock_user(self, username: str) -> None:
+        """
+        Take the user's statistics lock until the transaction ends.
+
+        A Postgres transaction-level advisory lock on the username's hash: writers of one
+        user's statistics queue behind each other, other users are unaffected.
+        """
+        self.db.execute(select(func.pg_advisory_xact_lock(func.hashtext(username))))
+
+    # ── tracking ──
+
+    def get_tracked_windows(
+        self,
+        username: str,
+        symptom_id: UUID | None = None,
+        backs_metrics_only: bool = False,
+    ) -> dict[float, set[UUID]]:
+        """Return time_window_hours -> tracked symptom ids for a user."""
+        query = select(SymptomWindowStat.time_window_hours, SymptomWindowStat.symptom_id).where(
+            SymptomWindowStat.username == username
+        )
+        if symptom_id is not None:
+            query = query.where(SymptomWindowStat.symptom_id == symptom_id)
+        if backs_metrics_only:
+            query = query.where(SymptomWindowStat.backs_metrics.is_(True))
+
+        tracked: dict[float, set[UUID]] = {}
+        for window, tracked_symptom_id in self.db.execute(query):
+            tracked.setdefault(window, set()).add(tracked_symptom_id)
+        return tracked
+
+    # ── full rebuild ──
+
+    def replace_stats(
+        self,
+        username: str,
+        time_window_hours: float,
+        symptom_ids: set[UUID],
+        ingredient_totals: dict[str, int],
+        stats: WindowStatsDelta,
+        total_food_events: int,
+        backs_metrics: bool = True,
+    ) -> None:
+        """
+        Replace statistics with freshly computed full-history values.
+
+        The food event and ingredient totals are user-wide and always rebuilt. Window statistics are
+        replaced only for ``symptom_ids`` at ``time_window_hours``; other windows
+        stay tracked. With ``backs_metrics`` this window becomes the one the stored
+        metrics reflect and every other window of those symptoms stops backing them.
+        """
+        self.db.execute(
+            delete(ExposureStat).where(
+                ExposureStat.username == username,
+                ExposureStat.symptom_id.in_(symptom_ids),
+                ExposureStat.time_window_hours == time_window_hours,
+            )
+        )
+        self.db.execute(
+            delete(SymptomWindowStat).where(
+                SymptomWindowStat.username == username,
+                SymptomWindowStat.symptom_id.in_(symptom_ids),
+                SymptomWindowStat.time_window_hours == time_window_hours,
+            )
+        )
+        if backs_metrics:
+            self.db.execute(
+                update(SymptomWindowStat)
+                .where(SymptomWindowStat.username == username, SymptomWindowStat.symptom_id.in_(symptom_ids))
+                .values(backs_metrics=False)
+            )
+        self.db.execute(delete(IngredientTotal).where(IngredientTotal.username == username))
+        stmt = insert(FoodEventTotal).values(username=username, food_events=total_food_events)
+        self.db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_food_event_totals_user", set_={"food_events": stmt.excluded.food_events}
+            )
+        )
+
+        if ingredient_totals:
+            self.db.execute(
+                insert(IngredientTotal).values(
+                    [
+                        {"username": username, "ingredient": ingredient, "food_events": count}
+                        for ingredient, count in ingredient_totals.items()
+                    ]
+                )
+            )
+
+        if symptom_ids:
+            self.db.execute(
+                insert(SymptomWindowStat).values(
+                    [
+                        {
+                            "username": username,
+                            "symptom_id": symptom_id,
+                            "time_window_hours": time_window_hours,
+                            "foods_in_window": stats.foods_in_window.get(str(symptom_id), 0),
+                            "backs_metrics": backs_metrics,
+                        }
+                        for symptom_id in symptom_ids
+                    ]
+                )
+            )
+
+        exposure_rows = [
+            self._exposure_row(username, time_window_hours, symptom_name, ingredient, counts)
+            for (symptom_name, ingredient), counts in stats.exposures.items()
+            if UUID(symptom_name) in symptom_ids
+        ]
+        if exposure_rows:
+            self.db.execute(insert(ExposureStat).values(exposure_rows))
+
+    # ── incremental updates ──
+
+    def apply_food_events(self, username: str, change: int) -> None:
+        """Add ``change`` to the user's stored food event total, if one was seeded."""
+        if change:
+            self.db.execute(
+                update(FoodEventTotal)
+                .where(FoodEventTotal.username == username)
+                .values(food_events=FoodEventTotal.food_events + change)
+            )
+
+    def apply_ingredient_totals(self, username: str, deltas: dict[str, int]) -> None:
+        """Add ``deltas`` to the user's ingredient totals, dropping totals that reach zero."""
+        if not deltas:
+            return
+
+        stmt = insert(IngredientTotal).values(
+            [{"username": username, "ingredient": ingredient, "food_events": d} for ingredient, d in deltas.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_ingredient_totals_user_ingredient",
+            set_={"food_events": IngredientTotal.food_events + stmt.excluded.food_events},
+        )
+        self.db.execute(stmt)
+        self.db.execute(
+            delete(IngredientTotal).where(IngredientTotal.username == username, IngredientTotal.food_events <= 0)
+        )
+
+    def apply_window_delta(
+        self,
+        username: str,
+        time_window_hours: float,
+        delta: WindowStatsDelta,
+        tracked_symptom_ids: set[UUID],
+    ) -> None:
+        """Fold a window delta into the stored statistics for the tracked symptoms only."""
+        for symptom_name, change in delta.foods_in_window.items():
+            if change == 0 or UUID(symptom_name) not in tracked_symptom_ids:
+                continue
+            self.db.execute(
+                update(SymptomWindowStat)
+                .where(
+                    SymptomWindowStat.username == username,
+                    SymptomWindowStat.symptom_id == UUID(symptom_name),
+                    SymptomWindowStat.time_window_hours == time_window_hours,
+                )
+                .values(foods_in_window=SymptomWindowStat.foods_in_window + change)
+            )
+
+        rows = [
+            self._exposure_row(username, time_window_hours, symptom_name, ingredient, counts)
+            for (symptom_name, ingredient), counts in delta.exposures.items()
+            if UUID(symptom_name) in tracked_symptom_ids
+        ]
+        if not rows:
+            return
+
+        stmt = insert(ExposureStat).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_exposure_stats_user_symptom_ingredient",
+            set_={
+                "exposures": ExposureStat.exposures + stmt.excluded.exposures,
+                "intensity_sum": ExposureStat.intensity_sum + stmt.excluded.intensity_sum,
+                "intensity_count": ExposureStat.intensity_count + stmt.excluded.intensity_count,
+                "updated_at": func.now(),
+            },
+        )
+        self.db.execute(stmt)
+        self.db.execute(
+            delete(ExposureStat).where(
+                ExposureStat.username == username,
+                ExposureStat.time_window_hours == time_window_hours,
+                ExposureStat.exposures <= 0,
+            )
+        )
+
+    # ── reads ──
+
+    def get_food_event_total(self, username: str) -> int:
+        """
+        The stored food event total, which moves with the other statistics.
+
+        Statistics seeded before the total was stored have no row; their users' logs
+        are counted instead until the next algorithm run seeds one.
+        """
+        total = self.db.execute(
+            select(FoodEventTotal.food_events).where(FoodEventTotal.username == username)
+        ).scalar()
+        if total is None:
+            total = self.db.execute(
+                select(func.count()).select_from(FoodLog).where(FoodLog.username == username)
+            ).scalar()
+        return total
+
+    def get_cell_counts(
+        self,
+        username: str,
+        time_window_hours: float,
+        symptom_ids: set[UUID] | None = None,
+    ) -> list:
+        """
+        Return the raw counts behind every metric with at least one exposure at one window.
+
+        Each row has id, symptom_id, ingredient, exposures, ingredient_total,
+        foods_in_window, intensity_sum, intensity_count and updated_at, which is all
+        compute_metrics needs besides the user's total food events.
+        """
+        query = (
+            select(
+                ExposureStat.id,
+                ExposureStat.symptom_id,
+                ExposureStat.ingredient,
+                ExposureStat.exposures,
+                IngredientTotal.food_events.label("ingredient_total"),
+                SymptomWindowStat.foods_in_window,
+                ExposureStat.intensity_sum,
+                ExposureStat.intensity_count,
+                ExposureStat.updated_at,
+            )
+            .join(
+                IngredientTotal,
+                and_(
+                    IngredientTotal.username == ExposureStat.username,
+                    IngredientTotal.ingredient == ExposureStat.ingredient,
+                ),
+            )
+            .join(
+                SymptomWindowStat,
+                and_(
+                    SymptomWindowStat.username == ExposureStat.username,
+                    SymptomWindowStat.symptom_id == ExposureStat.symptom_id,
+                    SymptomWindowStat.time_window_hours == ExposureStat.time_window_hours,
+                ),
+            )
+            .where(
+                ExposureStat.username == username,
+                ExposureStat.time_window_hours == time_window_hours,
+                ExposureStat.exposures > 0,
+            )
+            .order_by(ExposureStat.exposures.desc())
+        )
+        if symptom_ids is not None:
+            query = query.where(ExposureStat.symptom_id.in_(symptom_ids))
+        return self.db.execute(query).all()
+
+    def get_symptom_entries_between(
+        self,
+        username: str,
+        start: datetime,
+        end: datetime,
+        symptom_id: UUID | None = None,
+        exclude_log_id: UUID | None = None,
+    ) -> list[SymptomLogEntry]:
+        """Symptom events with start <= timestamp <= end, named by symptom id like AlgorithmService does."""
+        query = select(SymptomLog.id, SymptomLog.symptom_id, SymptomLog.intensity, SymptomLog.timestamp).where(
+            SymptomLog.username == username,
+            SymptomLog.timestamp >= start,
+            SymptomLog.timestamp <= end,
+        )
+        if symptom_id is not None:
+            query = query.where(SymptomLog.symptom_id == symptom_id)
+        if exclude_log_id is not None:
+            query = query.where(SymptomLog.id != exclude_log_id)
+
+        return [
+            SymptomLogEntry(timestamp=row.timestamp, symptom_name=str(row.symptom_id), intensity=row.intensity)
+            for row in self.db.execute(query.order_by(SymptomLog.timestamp.asc()))
+        ]
+
+    def get_food_entries_between(self, username: str, start: datetime, end: datetime) -> list[FoodLogEntry]:
+        """Food events with start <= timestamp <= end and their ingredient lists."""
+        query = (
+            select(FoodLog.timestamp, Food.ingredients)
+            .join(Food, FoodLog.food_id == Food.id)
+            .where(FoodLog.username == username, FoodLog.timestamp >= start, FoodLog.timestamp <= end)
+            .order_by(FoodLog.timestamp.asc())
+        )
+        return [
+            FoodLogEntry(timestamp=row.timestamp, ingredients=row.ingredients or []) for row in self.db.execute(query)
+        ]
+
+    @staticmethod
+    def _exposure_row(username: str, time_window_hours: float, symptom_name: str, ingredient: str, counts) -> dict:
+        return {
+            "username": username,
+            "symptom_id": UUID(symptom_name),
+            "ingredient": ingredient,
+            "time_window_hours": time_window_hours,
+            "exposures": counts.exposures,
+            "intensity_sum": counts.intensity_sum,
+            "intensity_count": counts.intensity_count,
+        }
@@ -1,6 +1,7 @@
 from uuid import UUID
 
 import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from models.symptom_log import SymptomLog
@@ -12,10 +13,13 @@ class SymptomLogRepository:
         result = db.execute(query)
         return result.scalar_one_or_none()
 
-    def create(self, db: Session, data):
+    def create(self, db: Session, data, commit: bool = True):
         log = SymptomLog(**data.model_dump())
         db.add(log)
-        db.commit()
+        if commit:
+            db.commit()
+        else:
+            db.flush()
         db.refresh(log)
         return log
 
@@ -24,18 +28,32 @@ class SymptomLogRepository:
         result = db.execute(query)
         return result.scalars().all()
 
-    def update(self, db: Session, log_id: UUID, data):
+    def update(self, db: Session, log_id: UUID, data, commit: bool = True):
         log = self.get_by_id(db, log_id)
         if not log:
             return None
         for field, value in data.model_dump(exclude_unset=True).items():
             setattr(log, field, value)
-        db.commit()
+        if commit:
+            db.commit()
+        else:
+            db.flush()
         db.refresh(log)
         return log
 
-    def delete(self, db: Session, log_id: UUID) -> bool:
+    def delete(self, db: Session, log_id: UUID, commit: bool = True) -> bool:
         query = sa.delete(SymptomLog).where(SymptomLog.id == log_id)
         result = db.execute(query)
-        db.commit()
+        if commit:
+            db.commit()
         return result.rowcount > 0
+
+
+class AsyncSymptomLogRepository:
+    async def get_by_id(self, db: AsyncSession, log_id: UUID):
+        query = sa.select(SymptomLog).where(SymptomLog.id == log_id)
+        return await db.scalar(query)
+
+    async def get_by_username(self, db: AsyncSession, username: str):
+        query = sa.select(SymptomLog).where(SymptomLog.username == username)
+        return (await db.scalars(query)).all()
@@ -2,6 +2,8 @@ import logging
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from models.symptom import Symptom
@@ -115,3 +117,28 @@ class SymptomRepository:
 
         logging.info(f"Symptom with ID {symptom_id} successfully deleted")
         return symptom
+
+
+class AsyncSymptomRepository:
+    """Read-only symptom queries on an AsyncSession, for the async read endpoints."""
+
+    async def get_symptom_by_id(self, db: AsyncSession, symptom_id: UUID) -> Optional[Symptom]:
+        """
+        Retrieve a symptom from the database by its ID.
+        """
+
+        logging.info(f"Retrieving symptom with ID {symptom_id} from database")
+
+        return await db.scalar(select(Symptom).where(Symptom.id == symptom_id))
+
+    async def get_all_symptoms(self, db: AsyncSession, username: Optional[str] = None) -> list[Symptom]:
+        """
+        Retrieve all symptoms from the database, optionally filtered by username.
+        """
+
+        logging.info(f"Retrieving all symptoms from database (username={username})")
+
+        query = select(Symptom)
+        if username:
+            query = query.where(Symptom.username == username)
+        return list(await db.scalars(query.order_by(Symptom.created_at.desc())))
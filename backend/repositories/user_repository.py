@@ -2,6 +2,8 @@
 
 from typing import Optional
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from models.user import User
@@ -59,6 +61,18 @@ class UserRepository:
         db.refresh(user)
         return user
 
+    def update_password_hash(self, db: Session, user: User, password_hash: str) -> None:
+        """
+        Replace a user's stored password hash, e.g. after rehashing at a new bcrypt cost.
+
+        Args:
+            db: SQLAlchemy database session
+            user: The user whose hash to replace
+            password_hash: The new bcrypt hash
+        """
+        user.password_hash = password_hash
+        db.commit()
+
     def update_user(self, db: Session, username: str, user_update: UserUpdate) -> User:
         """
         Update an existing user's information.
@@ -85,3 +99,23 @@ class UserRepository:
         db.commit()
         db.refresh(user)
         return user
+
+    def list_usernames(self, db: Session) -> list[str]:
+        """
+        Retrieve every username in a stable order.
+
+        Args:
+            db: SQLAlchemy database session
+
+        Returns:
+            list[str]: All usernames, sorted alphabetically
+        """
+        return list(db.execute(select(User.username).order_by(User.username)).scalars())
+
+
+class AsyncUserRepository:
+    """Read-only user queries on an AsyncSession."""
+
+    async def get_by_username(self, db: AsyncSession, username: str) -> Optional[User]:
+        """Retrieve a user by their username, or None."""
+        return await db.scalar(select(User).where(User.username == username))
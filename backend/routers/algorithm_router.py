@@ -1,35 +1,177 @@
 """Router for symptom-food association algorithm endpoints."""
 
+from dataclasses import asdict
+from typing import Annotated, Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
 
-from database import get_db
-from schemas.algorithm import AlgorithmAssociationResponse, AlgorithmRunRequest, AlgorithmRunResponse
+from analysis.fisher import fisher_cache
+from database import get_db, get_read_db, get_session_factory
+from routers.auth import require_admin
+from schemas.algorithm import (
+    AlgorithmAssociationResponse,
+    AlgorithmRunAllRequest,
+    AlgorithmRunAllResponse,
+    AlgorithmRunRequest,
+    AlgorithmRunResponse,
+    AssociationCacheStats,
+    AssociationListQuery,
+    FisherCacheStats,
+    MetricsWriteSummary,
+)
+from schemas.user import UserResponse
 from services.algorithm_service import AlgorithmService
+from services.association_cache import association_cache
+from services.batch_algorithm_service import BATCH_ALGORITHM_WORKERS, BatchAlgorithmService
+from services.executors import algorithm_pool
 
 router = APIRouter(prefix="/algorithm", tags=["Algorithm"])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _described(name: str) -> str:
+    return AssociationListQuery.model_fields[name].description
+
+
+def association_list_query(
+    sort: Literal["exposures", "p_value"] | None = Query(default=None, description=_described("sort")),
+    limit: int | None = Query(default=None, ge=1, le=1000, description=_described("limit")),
+    cursor: str | None = Query(default=None, description=_described("cursor")),
+    min_exposures: int | None = Query(default=None, ge=0, description=_described("min_exposures")),
+    max_p_value: float | None = Query(default=None, ge=0, le=1, description=_described("max_p_value")),
+) -> AssociationListQuery:
+    """
+    The listing parameters as an AssociationListQuery, with only the ones given set.
+
+    A Query() model is only expanded into separate parameters when it is the route's
+    sole query parameter, and get_associations also takes symptom_id and time_window_hours.
+    """
+    given = {
+        "sort": sort,
+        "limit": limit,
+        "cursor": cursor,
+        "min_exposures": min_exposures,
+        "max_p_value": max_p_value,
+    }
+    return AssociationListQuery(**{name: value for name, value in given.items() if value is not None})
+
 
 @router.post("/run", response_model=AlgorithmRunResponse)
 async def run_algorithm(
     payload: AlgorithmRunRequest,
-    db: Session = Depends(get_db),
+    session_factory: sessionmaker = Depends(get_session_factory),
 ) -> AlgorithmRunResponse:
     """Run association algorithm and persist user+symptom+food metrics."""
     service = AlgorithmService()
-    associations = service.run_algorithm(db, payload)
-    return AlgorithmRunResponse(associations=associations)
+
+    def run(db: Session) -> tuple[list, dict]:
+        associations = service.run_algorithm(db, payload)
+        return associations, {
+            window: service.get_associations(db, payload.user_id, payload.symptom_ids, time_window_hours=window)
+            for window in payload.time_windows_hours
+        }
+
+    try:
+        associations, associations_by_window = await algorithm_pool.run_in_session(session_factory, run)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    writes = service.last_write_counts
+    return AlgorithmRunResponse(
+        associations=associations,
+        associations_by_window=associations_by_window,
+        writes=MetricsWriteSummary(**asdict(writes)) if writes else None,
+    )
+
+
+@router.post("/run-all", response_model=AlgorithmRunAllResponse)
+def run_algorithm_for_all_users(
+    payload: AlgorithmRunAllRequest,
+    db: Session = Depends(get_db),
+    _admin: UserResponse = Depends(require_admin),
+) -> AlgorithmRunAllResponse:
+    """
+    Run and persist the algorithm for every user (or ``usernames``) across a process pool.
+
+    Declared sync so the long-running batch executes in the threadpool instead of the event loop.
+    """
+    try:
+        summary = BatchAlgorithmService().run_all(
+            db,
+            usernames=payload.usernames,
+            workers=payload.workers or BATCH_ALGORITHM_WORKERS,
+            time_window_hours=payload.time_window_hours,
+            engine=payload.engine,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    return AlgorithmRunAllResponse(
+        users=len(summary.results),
+        succeeded=summary.succeeded,
+        failed=summary.failed,
+        associations=summary.associations,
+        seconds=summary.seconds,
+    )
 
 
 @router.get("/user/{user_id}", response_model=list[AlgorithmAssociationResponse])
 async def get_associations(
     user_id: str,
+    query: Annotated[AssociationListQuery, Depends(association_list_query)],
     symptom_id: UUID | None = None,
-    db: Session = Depends(get_db),
+    time_window_hours: float | None = Query(
+        default=None,
+        ge=0.0,
+        description="Derive metrics for this window from stored statistics instead of the latest run",
+    ),
+    db: Session | AsyncSession = Depends(get_read_db),
 ) -> list[AlgorithmAssociationResponse]:
-    """Fetch stored association rows for a user, optionally filtered by symptom."""
+    """
+    Fetch stored association rows for a user, optionally filtered by symptom.
+
+    Sorting, filters and keyset paging (``limit`` / ``cursor``) apply to the stored
+    associations; the next page's cursor is returned in the X-Next-Cursor header.
+    """
     service = AlgorithmService()
     symptom_ids = [symptom_id] if symptom_id else None
-    return service.get_associations(db, user_id, symptom_ids)
+    if time_window_hours is None:
+        try:
+            if isinstance(db, AsyncSession):
+                body, next_cursor = await service.get_associations_json_async(db, user_id, symptom_ids, query)
+            else:
+                body, next_cursor = service.get_associations_json(db, user_id, symptom_ids, query)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+        # Stored listings come pre-serialized from the association cache.
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    if query.model_fields_set:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sort, limit, cursor and filters apply to stored associations; omit time_window_hours",
+        )
+    try:
+        if isinstance(db, AsyncSession):
+            # The statistics path has no async repository; run it on the session's sync facade.
+            return await db.run_sync(
+                service.get_associations, user_id, symptom_ids, time_window_hours=time_window_hours
+            )
+        return service.get_associations(db, user_id, symptom_ids, time_window_hours=time_window_hours)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
+
+
+@router.get("/association-cache", response_model=AssociationCacheStats)
+async def get_association_cache_stats() -> AssociationCacheStats:
+    """Hit rate and size of this worker's cache of association listings."""
+    return AssociationCacheStats(**association_cache.info())
+
+
+@router.get("/fisher-cache", response_model=FisherCacheStats)
+async def get_fisher_cache_stats() -> FisherCacheStats:
+    """Hit/miss counters of this worker's Fisher p-value cache, shared by all algorithm runs in the process."""
+    return FisherCacheStats(**fisher_cache.info())
@@ -2,19 +2,24 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
 
-from database import get_db
-from schemas.auth import LoginRequest, TokenResponse
+from database import get_db, get_read_db, get_session_factory
+from schemas.auth import LoginRequest, PrincipalCacheStats, TokenResponse
 from schemas.user import UserCreate, UserResponse, UserUpdate
-from services.auth_service import AuthService, decode_access_token
+from services.auth_service import ADMIN_USERNAMES, AuthService, decode_access_token
+from services.executors import auth_pool
+from services.principal_cache import principal_cache
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserResponse:
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session | AsyncSession = Depends(get_read_db)
+) -> UserResponse:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -26,7 +31,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     username = payload.get("sub")
     if not username:
         raise credentials_exception
-    user = AuthService().get_current_user(db, username)
+    service = AuthService()
+    if isinstance(db, AsyncSession):
+        user = await principal_cache.get_or_load_async(
+            token, username, lambda: service.get_current_user_async(db, username)
+        )
+    else:
+        user = principal_cache.get_or_load(token, username, lambda: service.get_current_user(db, username))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -36,14 +47,20 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     return user
 
 
+async def require_admin(current_user: UserResponse = Depends(get_current_user)) -> UserResponse:
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
+
+
 @router.post("/signup", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
-async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+async def signup(user_data: UserCreate, session_factory: sessionmaker = Depends(get_session_factory)):
     """
     Register a new user and return an access token.
 
     Args:
         user_data: User registration data (username, email, password, etc.)
-        db: Database session (injected by FastAPI)
+        session_factory: Opens the worker's database session (injected by FastAPI)
 
     Returns:
         TokenResponse: Access token issued immediately after registration
@@ -52,17 +69,17 @@ async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
         HTTPException 400: If username or email already exists
     """
     service = AuthService()
-    return service.register_user(db, user_data)
+    return await auth_pool.run_in_session(session_factory, service.register_user, user_data)
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(credentials: LoginRequest, db: Session = Depends(get_db)):
+async def login(credentials: LoginRequest, session_factory: sessionmaker = Depends(get_session_factory)):
     """
     Login with username and password.
 
     Args:
         credentials: Login credentials containing username and password
-        db: Database session (injected by FastAPI)
+        session_factory: Opens the worker's database session (injected by FastAPI)
 
     Returns:
         TokenResponse: Access token, token type, and username
@@ -71,7 +88,9 @@ async def login(credentials: LoginRequest, db: Session = Depends(get_db)):
         HTTPException 401: If credentials are invalid
     """
     service = AuthService()
-    token_data = service.authenticate_user(db, credentials.username, credentials.password)
+    token_data = await auth_pool.run_in_session(
+        session_factory, service.authenticate_user, credentials.username, credentials.password
+    )
 
     if not token_data:
         raise HTTPException(
@@ -97,3 +116,9 @@ async def update_profile(
         return AuthService().update_user(db, current_user.username, user_update)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.get("/principal-cache", response_model=PrincipalCacheStats)
+async def get_principal_cache_stats() -> PrincipalCacheStats:
+    """Hit rate and size of this worker's cache of token principals."""
+    return PrincipalCacheStats(**principal_cache.info())
@@ -3,9 +3,10 @@
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import get_db, get_read_db
 from routers.auth import get_current_user
 from schemas.food_log import FoodLogCreate, FoodLogResponse, FoodLogUpdate
 from schemas.user import UserResponse
@@ -29,23 +30,28 @@ async def create_food_log(food_log: FoodLogCreate, db: Session = Depends(get_db)
 
 @router.get("/user/me", response_model=list[FoodLogResponse])
 async def get_my_food_logs(
-    db: Session = Depends(get_db),
+    db: Session | AsyncSession = Depends(get_read_db),
     current_user: UserResponse = Depends(get_current_user),
 ) -> list[FoodLogResponse]:
     """
     Get all food logs for the authenticated user.
     """
     food_log_service = FoodLogService()
+    if isinstance(db, AsyncSession):
+        return await food_log_service.get_food_logs_by_username_async(db, current_user.username)
     return food_log_service.get_food_logs_by_username(db, current_user.username)
 
 
 @router.get("/{food_log_id}", response_model=FoodLogResponse)
-async def get_food_log(food_log_id: UUID, db: Session = Depends(get_db)) -> FoodLogResponse:
+async def get_food_log(food_log_id: UUID, db: Session | AsyncSession = Depends(get_read_db)) -> FoodLogResponse:
     """
     Get a specific food log by ID.
     """
     food_log_service = FoodLogService()
-    food_log = food_log_service.get_food_log_by_id(db, food_log_id)
+    if isinstance(db, AsyncSession):
+        food_log = await food_log_service.get_food_log_by_id_async(db, food_log_id)
+    else:
+        food_log = food_log_service.get_food_log_by_id(db, food_log_id)
     if not food_log:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -3,13 +3,15 @@
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
 
-from database import get_db
+from database import get_db, get_read_db, get_session_factory
 from routers.auth import get_current_user
 from schemas.food import FoodCreate, FoodResponse, FoodSuggestionRequest
 from schemas.tag import SuggestedTagsAndIngredientsResponse
 from schemas.user import UserResponse
+from services.executors import rag_pool
 from services.food_service import FoodService
 from services.RAGTaggingService import RAGTaggingService
 
@@ -34,21 +36,26 @@ async def create_food(
 @router.post("/suggestions", response_model=SuggestedTagsAndIngredientsResponse)
 async def suggest_tags(
     body: FoodSuggestionRequest,
-    db: Session = Depends(get_db),
+    session_factory: sessionmaker = Depends(get_session_factory),
 ) -> SuggestedTagsAndIngredientsResponse:
     """
     Return LLM/RAG-suggested trigger ingredients and bucket tags for a draft food item.
     No data is persisted.
     """
     rag_service = RAGTaggingService()
-    return rag_service.suggest(db, food_name=body.name, ingredients=body.ingredients)
+    return await rag_pool.run_in_session(
+        session_factory, rag_service.suggest, food_name=body.name, ingredients=body.ingredients
+    )
 
 
 @router.get("/{food_id}", response_model=FoodResponse)
-async def get_food(food_id: UUID, db: Session = Depends(get_db)) -> FoodResponse:
+async def get_food(food_id: UUID, db: Session | AsyncSession = Depends(get_read_db)) -> FoodResponse:
     """Get a specific food by ID."""
     food_service = FoodService()
-    food = food_service.get_food_by_id(db, food_id)
+    if isinstance(db, AsyncSession):
+        food = await food_service.get_food_by_id_async(db, food_id)
+    else:
+        food = food_service.get_food_by_id(db, food_id)
     if not food:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -60,11 +67,13 @@ async def get_food(food_id: UUID, db: Session = Depends(get_db)) -> FoodResponse
 # get all food items
 @router.get("/", response_model=list[FoodResponse])
 async def get_all_foods(
-    db: Session = Depends(get_db),
+    db: Session | AsyncSession = Depends(get_read_db),
     current_user: UserResponse = Depends(get_current_user),
 ) -> list[FoodResponse]:
     """Get all food items for the authenticated user."""
     food_service = FoodService()
+    if isinstance(db, AsyncSession):
+        return await food_service.get_all_foods_async(db, username=current_user.username)
     return food_service.get_all_foods(db, username=current_user.username)
 
 
@@ -1,10 +1,12 @@
+import io
 import logging
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import sessionmaker
 
-from database import get_db
+from database import get_session_factory
+from services.executors import PoolSaturatedError, ingest_pool
 from services.ingest_service import IngestService
 
 logger = logging.getLogger(__name__)
@@ -17,7 +19,7 @@ RAW_DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "raw"
 @router.post("/pdf", status_code=status.HTTP_201_CREATED)
 async def ingest_pdf_endpoint(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    session_factory: sessionmaker = Depends(get_session_factory),
 ):
     """Ingest a single uploaded PDF into the knowledge base."""
     if not file.filename or not file.filename.lower().endswith(".pdf"):
@@ -26,9 +28,15 @@ async def ingest_pdf_endpoint(
             detail="Only PDF files are accepted.",
         )
 
+    # The worker gets the bytes, not the upload, which is closed along with the request.
+    pdf = io.BytesIO(await file.read())
     ingest_service = IngestService()
     try:
-        result = ingest_service.ingest_pdf_file(db, file.file, source=file.filename)
+        result = await ingest_pool.run_in_session(
+            session_factory, ingest_service.ingest_pdf_file, pdf, source=file.filename
+        )
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         logger.error("Failed to ingest '%s': %s", file.filename, e)
         raise HTTPException(
@@ -39,7 +47,7 @@ async def ingest_pdf_endpoint(
 
 
 @router.post("/folder", status_code=status.HTTP_201_CREATED)
-async def ingest_folder_endpoint(db: Session = Depends(get_db)):
+async def ingest_folder_endpoint(session_factory: sessionmaker = Depends(get_session_factory)):
     """Seed the knowledge base from all PDFs in backend/data/raw/. Idempotent."""
     if not RAW_DATA_DIR.exists():
         raise HTTPException(
@@ -52,7 +60,9 @@ async def ingest_folder_endpoint(db: Session = Depends(get_db)):
 
     ingest_service = IngestService()
     try:
-        result = ingest_service.ingest_folder(db)
+        result = await ingest_pool.run_in_session(session_factory, ingest_service.ingest_folder)
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         logger.error("Failed to ingest folder: %s", e)
         raise HTTPException(
@@ -7,9 +7,10 @@ Handles HTTP requests for creating, reading, and deleting symptom logs.
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import get_db, get_read_db
 from routers.auth import get_current_user
 from schemas.symptom_log import SymptomLogCreate, SymptomLogResponse, SymptomLogUpdate
 from schemas.user import UserResponse
@@ -40,11 +41,13 @@ async def create_symptom_log(log: SymptomLogCreate, db: Session = Depends(get_db
     response_model=list[SymptomLogResponse],
 )
 async def get_my_symptom_logs(
-    db: Session = Depends(get_db),
+    db: Session | AsyncSession = Depends(get_read_db),
     current_user: UserResponse = Depends(get_current_user),
 ) -> list[SymptomLogResponse]:
     """Get all symptom logs for the authenticated user."""
     service = SymptomLogService()
+    if isinstance(db, AsyncSession):
+        return await service.get_symptom_logs_by_username_async(db, current_user.username)
     return service.get_symptom_logs_by_username(db, current_user.username)
 
 
@@ -52,10 +55,13 @@ async def get_my_symptom_logs(
     "/{log_id}",
     response_model=SymptomLogResponse,
 )
-async def get_symptom_log(log_id: UUID, db: Session = Depends(get_db)) -> SymptomLogResponse:
+async def get_symptom_log(log_id: UUID, db: Session | AsyncSession = Depends(get_read_db)) -> SymptomLogResponse:
     """Get a specific symptom log by ID."""
     service = SymptomLogService()
-    log = service.get_symptom_log(db, log_id)
+    if isinstance(db, AsyncSession):
+        log = await service.get_symptom_log_async(db, log_id)
+    else:
+        log = service.get_symptom_log(db, log_id)
     if not log:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -3,9 +3,10 @@
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import get_db, get_read_db
 from routers.auth import get_current_user
 from schemas.symptom import SymptomCreate, SymptomResponse
 from schemas.user import UserResponse
@@ -40,7 +41,7 @@ async def create_symptom(
 
 # get symptom
 @router.get("/{symptom_id}", response_model=SymptomResponse)
-async def get_symptom(symptom_id: UUID, db: Session = Depends(get_db)) -> SymptomResponse:
+async def get_symptom(symptom_id: UUID, db: Session | AsyncSession = Depends(get_read_db)) -> SymptomResponse:
     """
     Get a specific symptom by ID.
 
@@ -57,7 +58,10 @@ async def get_symptom(symptom_id: UUID, db: Session = Depends(get_db)) -> Sympto
         HTTPException: If symptom ID doesn't exist
     """
     symptom_service = SymptomService()
-    symptom = symptom_service.get_symptom_by_id(db, symptom_id)
+    if isinstance(db, AsyncSession):
+        symptom = await symptom_service.get_symptom_by_id_async(db, symptom_id)
+    else:
+        symptom = symptom_service.get_symptom_by_id(db, symptom_id)
 
     if not symptom:
         raise HTTPException(
@@ -74,7 +78,7 @@ async def get_symptom(symptom_id: UUID, db: Session = Depends(get_db)) -> Sympto
     response_model=list[SymptomResponse],
 )
 async def get_all_symptoms(
-    db: Session = Depends(get_db),
+    db: Session | AsyncSession = Depends(get_read_db),
     current_user: UserResponse = Depends(get_current_user),
 ) -> list[SymptomResponse]:
     """
@@ -85,7 +89,10 @@ async def get_all_symptoms(
     """
 
     symptom_service = SymptomService()
-    symptoms = symptom_service.get_all_symptoms(db, username=current_user.username)
+    if isinstance(db, AsyncSession):
+        symptoms = await symptom_service.get_all_symptoms_async(db, username=current_user.username)
+    else:
+        symptoms = symptom_service.get_all_symptoms(db, username=current_user.username)
     return symptoms
 
 
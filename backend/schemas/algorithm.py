@@ -1,9 +1,12 @@
 """Schemas for algorithm symptom-food association endpoints."""
 
 from datetime import datetime
+from typing import Literal
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, NonNegativeFloat, model_validator
+
+from analysis.engines import DEFAULT_ENGINE, EngineName
 
 
 class KeyMetrics(BaseModel):
@@ -29,6 +32,24 @@ class AlgorithmAssociationResponse(BaseModel):
     updated_at: datetime
 
 
+class AssociationListQuery(BaseModel):
+    """Ordering, filters and paging for GET /algorithm/user/{user_id}."""
+
+    sort: Literal["exposures", "p_value"] = Field(
+        default="exposures",
+        description="Most exposures first, or most significant (smallest Fisher p-value) first",
+    )
+    limit: int | None = Field(
+        default=None,
+        ge=1,
+        le=1000,
+        description="Page size (top-K); the X-Next-Cursor response header is set when more rows follow",
+    )
+    cursor: str | None = Field(default=None, description="X-Next-Cursor of the previous page")
+    min_exposures: int | None = Field(default=None, ge=0, description="Only associations with at least this many")
+    max_p_value: float | None = Field(default=None, ge=0, le=1, description="Only associations with p <= this")
+
+
 class AlgorithmRunRequest(BaseModel):
     """Request payload for running and persisting algorithm associations."""
 
@@ -39,9 +60,106 @@ class AlgorithmRunRequest(BaseModel):
         ge=0.0,
         description="Hours before each symptom to consider food exposures",
     )
+    time_windows_hours: list[NonNegativeFloat] = Field(
+        default=[],
+        description=(
+            "Extra windows computed in the same sweep as time_window_hours and persisted per window; "
+            "read them back with GET /algorithm/user/{user_id}?time_window_hours=. Only the default "
+            "engine or 'sweep' can be combined with them. Without INCREMENTAL_METRICS_ENABLED the "
+            "persisted windows reflect this run, like the stored metrics, until the next one"
+        ),
+    )
+    engine: EngineName = Field(
+        default=DEFAULT_ENGINE,
+        description=(
+            "Analysis engine for single-window runs: per-cell reference implementation, batched NumPy "
+            "implementation, the multi-window sweep (the one used when time_windows_hours is set), "
+            "sparse-matrix co-occurrence counting, a window join aggregated inside Postgres, or a "
+            "streaming pass over server-side cursors whose memory is bounded by the window size"
+        ),
+    )
+    write_mode: Literal["diff", "upsert"] = Field(
+        default="diff",
+        description=(
+            "How results are stored: diff against the stored rows and write only inserts, updates and "
+            "deletes of stale ingredients, or upsert every row without pruning"
+        ),
+    )
+
+    @model_validator(mode="after")
+    def _windows_run_on_the_sweep(self) -> "AlgorithmRunRequest":
+        if self.time_windows_hours and self.engine not in (DEFAULT_ENGINE, "sweep"):
+            raise ValueError(
+                f"time_windows_hours is computed by the multi-window sweep; engine '{self.engine}' cannot be combined"
+            )
+        return self
+
+
+class MetricsWriteSummary(BaseModel):
+    """Rows a diffed run inserted, updated, deleted and left untouched."""
+
+    inserted: int
+    updated: int
+    deleted: int
+    unchanged: int
 
 
 class AlgorithmRunResponse(BaseModel):
     """Response payload after algorithm run and persistence."""
 
     associations: list[AlgorithmAssociationResponse]
+    writes: MetricsWriteSummary | None = Field(default=None, description="Write counts of a write_mode='diff' run")
+    associations_by_window: dict[float, list[AlgorithmAssociationResponse]] = Field(
+        default={},
+        description="Associations for each of time_windows_hours, derived from the persisted per-window statistics",
+    )
+
+
+class AlgorithmRunAllRequest(BaseModel):
+    """Request payload for running the algorithm for many users in one batch."""
+
+    usernames: list[str] = Field(default=[], description="Users to run; empty runs every user")
+    time_window_hours: float = Field(default=4.0, ge=0.0, description="Hours before each symptom to consider")
+    engine: EngineName = Field(
+        default=DEFAULT_ENGINE, description="Analysis engine"
+    )
+    workers: int | None = Field(
+        default=None,
+        ge=1,
+        description="Worker processes; defaults to BATCH_ALGORITHM_WORKERS (the CPU count)",
+    )
+
+
+class AlgorithmRunAllResponse(BaseModel):
+    """Response payload after a batch algorithm run."""
+
+    users: int
+    succeeded: list[str]
+    failed: dict[str, str] = Field(description="Username to error message for users whose run failed")
+    associations: int = Field(description="Association rows persisted across all users")
+    seconds: float
+
+
+class FisherCacheStats(BaseModel):
+    """Counters of the process-wide Fisher p-value memo cache."""
+
+    hits: int
+    misses: int
+    hit_rate: float
+    size: int = Field(description="Contingency tables currently cached")
+    maxsize: int = Field(description="FISHER_CACHE_SIZE; least recently used tables are evicted beyond it")
+
+
+class AssociationCacheStats(BaseModel):
+    """Counters of the association listing cache behind GET /algorithm/user/{user_id}."""
+
+    backend: str
+    enabled: bool
+    hits: int
+    misses: int
+    hit_rate: float
+    invalidations: int = Field(description="Users whose listings were dropped after a metrics write")
+    backend_errors: int = Field(description="Cache backend calls that failed; the request was served uncached")
+    size: int | None = Field(description="Listings currently cached; None for Redis, whose keyspace is not scanned")
+    maxsize: int | None = Field(description="ASSOCIATION_CACHE_SIZE; None when Redis manages eviction")
+    ttl_seconds: float
@@ -1,6 +1,6 @@
 """Authentication request/response schemas."""
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class LoginRequest(BaseModel):
@@ -16,3 +16,16 @@ class TokenResponse(BaseModel):
     access_token: str
     token_type: str
     username: str
+
+
+class PrincipalCacheStats(BaseModel):
+    """Counters of the token principal cache behind get_current_user."""
+
+    enabled: bool
+    hits: int
+    misses: int
+    hit_rate: float
+    invalidations: int = Field(description="Profile updates that dropped a user's cached tokens")
+    size: int = Field(description="Tokens currently cached")
+    maxsize: int = Field(description="PRINCIPAL_CACHE_SIZE; least recently used tokens are evicted beyond it")
+    ttl_seconds: float = Field(description="PRINCIPAL_CACHE_TTL_SECONDS; 0 disables the cache")
@@ -0,0 +1,20 @@
+"""Schemas for the worker pool stats endpoint."""
+
+from pydantic import BaseModel, Field
+
+
+class WorkerPoolStats(BaseModel):
+    """Load and counters of one worker pool (see services/executors.py)."""
+
+    name: str
+    workers: int
+    queue_depth: int = Field(description="Calls allowed to wait beyond the running ones before 503s")
+    running: int
+    queued: int
+    max_queued: int = Field(description="Most calls ever waiting at once")
+    submitted: int
+    completed: int
+    failed: int
+    rejected: int = Field(description="Calls turned away with 503 because the pool was full")
+    avg_wait_seconds: float = Field(description="Mean time from submission to a worker picking the call up")
+    avg_run_seconds: float
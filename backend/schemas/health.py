@@ -0,0 +1,20 @@
+"""Schemas for the operational health endpoints."""
+
+from pydantic import BaseModel, Field
+
+
+class DatabasePoolStats(BaseModel):
+    """Utilization of one engine's connection pool (see database.pool_status)."""
+
+    engine: str = Field(description="sync, or async when DATABASE_ASYNC is on")
+    pool: str
+    pgbouncer: bool = Field(description="DATABASE_PGBOUNCER: PgBouncer pools connections; no counts below")
+    size: int | None = None
+    max_overflow: int | None = None
+    checked_out: int | None = Field(default=None, description="Connections currently lent to sessions")
+    checked_in: int | None = Field(default=None, description="Idle connections held by the pool")
+    overflow: int | None = Field(default=None, description="Connections open beyond the pool size")
+    checkouts: int | None = None
+    avg_wait_ms: float | None = Field(default=None, description="Mean time to get a connection, connects included")
+    max_wait_ms: float | None = None
+    timeouts: int | None = Field(default=None, description="Checkouts that gave up after DATABASE_POOL_TIMEOUT")
@@ -0,0 +1,135 @@
+"""Benchmark the per-user timeline queries with and without the composite indexes.
+
+Usage:
+    python scripts/seed.py                        # load the 40-user dataset first
+    python scripts/benchmark_indexes.py           # plans + latencies, before and after
+    python scripts/benchmark_indexes.py --repeat 50 --users 10
+
+"Before" drops the model indexes inside a transaction that is rolled back, so the
+database is left unchanged — but the DROP takes exclusive locks on the log tables
+while it runs, so only point this at a local or staging database. "After" creates
+any missing indexes first (same as scripts/init_db.py).
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import joinedload
+
+import models.food  # noqa: F401
+import models.food_log  # noqa: F401
+import models.knowledge_chunk  # noqa: F401
+import models.metrics  # noqa: F401
+import models.metrics_stats  # noqa: F401
+import models.symptom  # noqa: F401
+import models.symptom_log  # noqa: F401
+import models.tag  # noqa: F401
+import models.user  # noqa: F401
+from database import engine
+from models.food_log import FoodLog
+from models.metrics import Metrics
+from models.symptom_log import SymptomLog
+from models.user import User
+
+BENCHMARKED_TABLES = [FoodLog.__table__, SymptomLog.__table__, Metrics.__table__]
+
+
+def user_queries(conn, username: str) -> dict:
+    """The statements the analysis and list endpoints issue for one user."""
+    symptom_id = conn.execute(
+        select(SymptomLog.symptom_id).where(SymptomLog.username == username).limit(1)
+    ).scalar_one_or_none()
+    return {
+        "food timeline (algorithm)": select(FoodLog)
+        .options(joinedload(FoodLog.food))
+        .where(FoodLog.username == username)
+        .order_by(FoodLog.timestamp.asc()),
+        "symptom timeline": select(SymptomLog.symptom_id, SymptomLog.timestamp, SymptomLog.intensity)
+        .where(SymptomLog.username == username)
+        .order_by(SymptomLog.timestamp.asc()),
+        "one symptom's timeline": select(SymptomLog.timestamp, SymptomLog.intensity)
+        .where(SymptomLog.username == username, SymptomLog.symptom_id == symptom_id)
+        .order_by(SymptomLog.timestamp.asc()),
+        "associations by exposures": select(Metrics)
+        .where(Metrics.username == username)
+        .order_by(Metrics.exposures.desc(), Metrics.id.desc()),
+        "top 20 by p-value": select(Metrics)
+        .where(Metrics.username == username)
+        .order_by(Metrics.fishers_p_value.asc(), Metrics.id.asc())
+        .limit(20),
+    }
+
+
+def _driver_sql(conn, statement) -> tuple[str, dict]:
+    compiled = statement.compile(dialect=conn.dialect)
+    return str(compiled), compiled.params
+
+
+def measure(conn, usernames: list[str], repeat: int, show_plans: bool) -> dict[str, float]:
+    """Median latency (ms) of each query across users; prints the first user's plans."""
+    timings: dict[str, list[float]] = {}
+    for i, username in enumerate(usernames):
+        for name, statement in user_queries(conn, username).items():
+            sql, params = _driver_sql(conn, statement)
+            if show_plans and i == 0:
+                plan = conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + sql, params).scalars().all()
+                print(f"\n  -- {name} ({username})")
+                print("\n".join(f"     {line}" for line in plan))
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.exec_driver_sql(sql, params).fetchall()
+                timings.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+    return {name: statistics.median(samples) for name, samples in timings.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark timeline queries before/after the composite indexes.")
+    parser.add_argument("--repeat", type=int, default=20, help="Executions per query per user")
+    parser.add_argument("--users", type=int, default=40, help="Number of users to sample")
+    parser.add_argument("--no-plans", action="store_true", help="Skip printing EXPLAIN ANALYZE output")
+    args = parser.parse_args()
+
+    if engine is None:
+        print("ERROR: DATABASE_URL is not set. Check your .env file.")
+        sys.exit(1)
+
+    indexes = [index for table in BENCHMARKED_TABLES for index in table.indexes]
+    for index in indexes:
+        index.create(bind=engine, checkfirst=True)
+
+    # VACUUM refreshes the visibility map so covering indexes can serve index-only scans.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in BENCHMARKED_TABLES:
+            conn.execute(text(f"VACUUM ANALYZE {table.name}"))
+
+    with engine.connect() as conn:
+        usernames = list(conn.execute(select(User.username).order_by(User.username).limit(args.users)).scalars())
+        if not usernames:
+            print("No users found — run scripts/seed.py first.")
+            sys.exit(1)
+        print(f"Benchmarking {len(usernames)} users, {args.repeat} runs per query.")
+        conn.commit()
+
+        print("\n== Before: without composite indexes ==")
+        for index in indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        before = measure(conn, usernames, args.repeat, not args.no_plans)
+        conn.rollback()  # restores the dropped indexes
+
+        print("\n== After: with composite indexes ==")
+        after = measure(conn, usernames, args.repeat, not args.no_plans)
+        conn.rollback()
+
+    print(f"\n{'query':<30} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name in before:
+        print(f"{name:<30} {before[name]:>10.3f} {after[name]:>10.3f} {before[name] / after[name]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 """Initialize database schema against any PostgreSQL target (local or Supabase).
 
 Usage:
-    python scripts/init_db.py           # create tables only (safe, idempotent)
+    python scripts/init_db.py           # create missing tables and indexes (safe, idempotent)
     python scripts/init_db.py --reset   # DROP all tables then recreate (destructive)
 
 Set DATABASE_URL in .env or as an environment variable before running.
@@ -22,12 +22,16 @@ import models.food  # noqa: F401
 import models.food_log  # noqa: F401
 import models.knowledge_chunk  # noqa: F401
 import models.metrics  # noqa: F401
+import models.metrics_stats  # noqa: F401
 import models.symptom  # noqa: F401
 import models.symptom_log  # noqa: F401
 import models.tag  # noqa: F401
 import models.user  # noqa: F401
 from database import Base, engine
 
+# Indexes replaced by a model change; dropped so they stop costing writes.
+SUPERSEDED_INDEXES = ["ix_metrics_username_exposures"]
+
 
 def init_db(reset: bool = False) -> None:
     if engine is None:
@@ -47,6 +51,16 @@ def init_db(reset: bool = False) -> None:
     Base.metadata.create_all(bind=engine)
     print("Tables created/verified.")
 
+    # create_all skips tables that already exist, so indexes added to a model
+    # later are created here for databases initialised before them.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        for name in SUPERSEDED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    print("Indexes created/verified.")
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Initialize Remetra DB schema.")
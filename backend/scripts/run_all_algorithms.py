@@ -0,0 +1,69 @@
+"""Run and persist the association algorithm for every user across a process pool.
+
+Usage:
+    python scripts/run_all_algorithms.py                       # every user, one worker per CPU
+    python scripts/run_all_algorithms.py --workers 4           # cap the worker processes
+    python scripts/run_all_algorithms.py --window 6 --engine numpy
+    python scripts/run_all_algorithms.py --users alice bob     # only these users
+
+The default worker count comes from BATCH_ALGORITHM_WORKERS (falls back to the CPU count).
+Exits non-zero if any user's run failed.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+from analysis.engines import DEFAULT_ENGINE, ENGINE_NAMES
+from database import SessionLocal
+from services.batch_algorithm_service import BATCH_ALGORITHM_WORKERS, BatchAlgorithmService, BatchUserResult
+
+load_dotenv()
+
+
+def print_progress(done: int, total: int, result: BatchUserResult) -> None:
+    if result.error:
+        print(f"  [{done}/{total}] {result.username}: FAILED — {result.error}")
+    else:
+        print(f"  [{done}/{total}] {result.username}: {result.associations} associations ({result.seconds:.2f}s)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the association algorithm for all users.")
+    parser.add_argument("--workers", type=int, default=BATCH_ALGORITHM_WORKERS, help="Worker processes")
+    parser.add_argument("--window", type=float, default=4.0, help="Time window in hours")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, choices=ENGINE_NAMES)
+    parser.add_argument("--users", nargs="*", default=None, help="Usernames to run (default: all)")
+    args = parser.parse_args()
+
+    if SessionLocal is None:
+        print("DATABASE_URL is not set.")
+        return 1
+
+    db = SessionLocal()
+    try:
+        print(f"Running algorithm with {args.workers} worker(s)...")
+        summary = BatchAlgorithmService().run_all(
+            db,
+            usernames=args.users,
+            workers=args.workers,
+            time_window_hours=args.window,
+            engine=args.engine,
+            progress=print_progress,
+        )
+    finally:
+        db.close()
+
+    print(
+        f"\nDone: {len(summary.succeeded)} succeeded, {len(summary.failed)} failed, "
+        f"{summary.associations} associations in {summary.seconds:.1f}s."
+    )
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,6 +20,7 @@ import models.food  # noqa: F401
 import models.food_log  # noqa: F401
 import models.knowledge_chunk  # noqa: F401
 import models.metrics  # noqa: F401
+import models.metrics_stats  # noqa: F401
 import models.symptom  # noqa: F401
 import models.symptom_log  # noqa: F401
 import models.tag  # noqa: F401
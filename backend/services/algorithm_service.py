@@ -1,92 +1,287 @@
 """Service layer for symptom-ingredient association algorithm."""
 
+import base64
+import json
+import logging
 from collections.abc import Sequence
+from dataclasses import asdict
 from uuid import UUID
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session, joinedload
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-from analysis.algorithm import get_analysis
+from analysis.columnar import FoodColumns
+from analysis.data import fetch_food_logs, fetch_symptom_logs, fetch_window_counts, stream_window_counts
+from analysis.engines import DEFAULT_ENGINE, SQL_ENGINE, STREAM_ENGINE, get_engine
 from analysis.models import FoodLogEntry, SymptomLogEntry
-from models.food_log import FoodLog
+from analysis.per_ingredient_counts import count_ingredient_occurrences
+from analysis.sweep import metrics_from_window_stats, window_stats_sweep
 from models.metrics import Metrics
-from models.symptom_log import SymptomLog
-from repositories.metrics_repository import MetricsRepository
-from schemas.algorithm import AlgorithmAssociationResponse, AlgorithmRunRequest
+from repositories.metrics_repository import AsyncMetricsRepository, MetricsRepository, MetricsWriteCounts
+from repositories.metrics_stats_repository import MetricsStatsRepository
+from schemas.algorithm import AlgorithmAssociationResponse, AlgorithmRunRequest, AssociationListQuery, KeyMetrics
+from services.association_cache import association_cache
+from services.incremental_metrics_service import IncrementalMetricsService, metrics_from_cell_rows
+
+logger = logging.getLogger(__name__)
+
+_ASSOCIATION_LIST = TypeAdapter(list[AlgorithmAssociationResponse])
+
+
+def _in_listing_order(rows: list[Metrics], symptom_ids: Sequence[UUID]) -> list[Metrics]:
+    """Order rows as get_associations lists them: by requested symptom, then by exposures descending."""
+    symptom_rank = {symptom_id: rank for rank, symptom_id in enumerate(symptom_ids)}
+    return sorted(rows, key=lambda row: (symptom_rank.get(row.symptom_id, 0), -row.exposures))
+
+
+def _encode_cursor(sort: str, row: Metrics) -> str:
+    value = row.exposures if sort == "exposures" else row.fishers_p_value
+    return base64.urlsafe_b64encode(json.dumps([sort, value, str(row.id)]).encode()).decode()
+
+
+def _decode_cursor(sort: str, cursor: str) -> tuple:
+    """The (value, id) keyset inside a cursor from _encode_cursor; ValueError if it is malformed or for another sort."""
+    try:
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        row_id = UUID(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor_sort != sort or isinstance(value, bool) or not isinstance(value, int | float):
+        raise ValueError(f"Cursor does not belong to sort={sort}")
+    return value, row_id
 
 
 class AlgorithmService:
     """Runs symptom-ingredient association analysis and persists results."""
 
-    def __init__(self):
+    def __init__(self, incremental_metrics: IncrementalMetricsService | None = None):
         self.repo: MetricsRepository | None = None
+        # Set by run_algorithm for write_mode="diff" runs.
+        self.last_write_counts: MetricsWriteCounts | None = None
+        self.incremental_metrics = incremental_metrics or IncrementalMetricsService()
 
     def run_algorithm(self, db: Session, payload: AlgorithmRunRequest) -> list[AlgorithmAssociationResponse]:
         self.repo = MetricsRepository(db)
-        food_logs = self._get_food_logs_for_user(db, payload.user_id)
-        symptom_logs = self._get_symptom_logs_for_user(db, payload.user_id, payload.symptom_ids)
+        # Log writes of this user wait for the run, so its statistics cannot miss or double-count them.
+        self.incremental_metrics.lock_statistics(db, payload.user_id)
+        if payload.engine in (SQL_ENGINE, STREAM_ENGINE):
+            metrics_by_symptom = self._run_from_counts(db, payload)
+        else:
+            metrics_by_symptom = self._run_in_process(db, payload)
+
+        # One transaction for the whole run; the writes hand back the stored rows without a re-read.
+        metrics_by_symptom = {UUID(symptom_id): metrics for symptom_id, metrics in metrics_by_symptom.items()}
+        if payload.write_mode == "diff":
+            stored, self.last_write_counts = self.repo.sync_metrics(
+                payload.user_id, metrics_by_symptom, payload.symptom_ids or None
+            )
+            logger.info("Stored metrics for user %s: %s", payload.user_id, self.last_write_counts)
+        else:
+            stored = self.repo.bulk_upsert_metrics(payload.user_id, metrics_by_symptom)
+            self.last_write_counts = None
+        associations = self._serialize_metrics_rows(_in_listing_order(stored, payload.symptom_ids))
+        db.commit()
+        return associations
 
-        metrics_by_symptom = self._build_metrics_by_symptom(
-            food_logs=food_logs,
-            symptom_logs=symptom_logs,
+    def _run_in_process(self, db: Session, payload: AlgorithmRunRequest) -> dict:
+        """Load the user's logs and analyse them with the requested engine (or the multi-window sweep)."""
+        food_entries = self._get_food_logs_for_user(db, payload.user_id)
+        symptom_entries = self._get_symptom_logs_for_user(db, payload.user_id, payload.symptom_ids)
+
+        stats_by_window = None
+        if payload.time_windows_hours:
+            # Every window comes out of one sweep; the requested window backs the stored metrics.
+            food_columns = FoodColumns.from_entries(food_entries)
+            stats_by_window = window_stats_sweep(
+                food_columns, symptom_entries, [payload.time_window_hours, *payload.time_windows_hours]
+            )
+            ingredient_totals, total_food_events = count_ingredient_occurrences(food_columns)
+            metrics_by_symptom = metrics_from_window_stats(
+                stats_by_window[payload.time_window_hours], ingredient_totals, total_food_events
+            )
+        else:
+            metrics_by_symptom = self._build_metrics_by_symptom(
+                food_logs=food_entries,
+                symptom_logs=symptom_entries,
+                time_window_hours=payload.time_window_hours,
+                engine=payload.engine,
+            )
+
+        # Seed the sufficient statistics so later log writes can update these metrics incrementally.
+        self.incremental_metrics.seed(
+            db,
+            username=payload.user_id,
             time_window_hours=payload.time_window_hours,
+            symptom_ids=set(payload.symptom_ids) or {UUID(entry.symptom_name) for entry in symptom_entries},
+            food_logs=food_entries,
+            symptom_logs=symptom_entries,
+            stats_by_window=stats_by_window,
+            # The extra windows are served from their statistics, so store them either way.
+            force=stats_by_window is not None,
         )
+        return metrics_by_symptom
 
-        for symptom_id_str, metrics_by_ingredient in metrics_by_symptom.items():
-            self.repo.upsert_metrics(
-                username=payload.user_id,
-                symptom_id=UUID(symptom_id_str),
-                metrics_by_ingredient=metrics_by_ingredient,
-            )
+    def _run_from_counts(self, db: Session, payload: AlgorithmRunRequest) -> dict:
+        """
+        Build the metrics from aggregated window counts without materialising the logs.
 
-        return self.get_associations(db=db, user_id=payload.user_id, symptom_ids=payload.symptom_ids)
+        "sql" lets Postgres do the window join and counting; "stream" accumulates the
+        counts from server-side cursors, holding only one window of foods in memory.
+        """
+        fetch_counts = fetch_window_counts if payload.engine == SQL_ENGINE else stream_window_counts
+        counts = fetch_counts(db, payload.user_id, payload.time_window_hours, payload.symptom_ids)
+        self.incremental_metrics.seed(
+            db,
+            username=payload.user_id,
+            time_window_hours=payload.time_window_hours,
+            symptom_ids=set(payload.symptom_ids) or counts.symptom_ids,
+            food_logs=[],
+            symptom_logs=[],
+            stats_by_window={payload.time_window_hours: counts.stats},
+            ingredient_totals=counts.ingredient_totals,
+            total_food_events=counts.total_food_events,
+        )
+        return metrics_from_window_stats(counts.stats, counts.ingredient_totals, counts.total_food_events)
 
     def get_associations(
         self,
         db: Session,
         user_id: str,
         symptom_ids: Sequence[UUID] | None = None,
+        time_window_hours: float | None = None,
     ) -> list[AlgorithmAssociationResponse]:
+        if time_window_hours is not None:
+            return self._get_associations_from_stats(db, user_id, symptom_ids, time_window_hours)
+
         self.repo = MetricsRepository(db)
         metrics_rows: list[Metrics] = []
         if symptom_ids:
             for symptom_id in symptom_ids:
-                metrics_rows.extend(
-                    self.repo.get_by_symptom(username=user_id, symptom_id=symptom_id)
-                )
+                metrics_rows.extend(self.repo.get_by_symptom(username=user_id, symptom_id=symptom_id))
         else:
             metrics_rows = self.repo.get_by_user(username=user_id)
 
         return self._serialize_metrics_rows(metrics_rows)
 
-    def _get_food_logs_for_user(self, db: Session, user_id: str) -> list[FoodLog]:
-        query = (
-            select(FoodLog)
-            .options(joinedload(FoodLog.food))
-            .where(FoodLog.username == user_id)
-            .order_by(FoodLog.timestamp.asc())
+    def get_associations_json(
+        self,
+        db: Session,
+        user_id: str,
+        symptom_ids: Sequence[UUID] | None = None,
+        query: AssociationListQuery | None = None,
+    ) -> tuple[bytes, str | None]:
+        """
+        One page of the stored associations as response JSON, plus the cursor of the next page.
+
+        Filtering, ordering and keyset paging run in SQL; pages are served from the
+        association cache when warm. The cursor is None on the last page.
+        """
+        query = query or AssociationListQuery()
+        after = _decode_cursor(query.sort, query.cursor) if query.cursor else None
+
+        def load() -> bytes:
+            rows = MetricsRepository(db).list_by_user(
+                user_id,
+                symptom_ids,
+                sort=query.sort,
+                limit=query.limit + 1 if query.limit else None,  # one extra row tells whether a next page exists
+                after=after,
+                min_exposures=query.min_exposures,
+                max_p_value=query.max_p_value,
+            )
+            return self._page_value(rows, query)
+
+        next_cursor, _, body = association_cache.get_or_load(
+            user_id, symptom_ids, load, variant=query.model_dump_json(exclude_defaults=True)
+        ).partition(b"\n")
+        return body, next_cursor.decode() or None
+
+    async def get_associations_json_async(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        symptom_ids: Sequence[UUID] | None = None,
+        query: AssociationListQuery | None = None,
+    ) -> tuple[bytes, str | None]:
+        """get_associations_json on an AsyncSession; shares the same cache entries."""
+        query = query or AssociationListQuery()
+        after = _decode_cursor(query.sort, query.cursor) if query.cursor else None
+
+        async def load() -> bytes:
+            rows = await AsyncMetricsRepository(db).list_by_user(
+                user_id,
+                symptom_ids,
+                sort=query.sort,
+                limit=query.limit + 1 if query.limit else None,
+                after=after,
+                min_exposures=query.min_exposures,
+                max_p_value=query.max_p_value,
+            )
+            return self._page_value(rows, query)
+
+        value = await association_cache.get_or_load_async(
+            user_id, symptom_ids, load, variant=query.model_dump_json(exclude_defaults=True)
         )
-        result = db.execute(query)
-        return result.unique().scalars().all()
+        next_cursor, _, body = value.partition(b"\n")
+        return body, next_cursor.decode() or None
 
-    def _get_symptom_logs_for_user(
+    def _page_value(self, rows: list[Metrics], query: AssociationListQuery) -> bytes:
+        """The cached form of a page: its next cursor (empty on the last page), a newline, the response JSON."""
+        next_cursor = ""
+        if query.limit and len(rows) > query.limit:
+            rows = rows[: query.limit]
+            next_cursor = _encode_cursor(query.sort, rows[-1])
+        # The cursor rides along in the cached value; base64 never contains the separator.
+        return next_cursor.encode() + b"\n" + _ASSOCIATION_LIST.dump_json(self._serialize_metrics_rows(rows))
+
+    def _get_associations_from_stats(
         self,
         db: Session,
         user_id: str,
         symptom_ids: Sequence[UUID] | None,
-    ) -> list[SymptomLog]:
-        query = select(SymptomLog).where(SymptomLog.username == user_id).order_by(SymptomLog.timestamp.asc())
-        if symptom_ids:
-            query = query.where(SymptomLog.symptom_id.in_(symptom_ids))
+        time_window_hours: float,
+    ) -> list[AlgorithmAssociationResponse]:
+        """Derive associations for one window from the sufficient statistics, without reading any logs."""
+        stats_repo = MetricsStatsRepository(db)
+        tracked = stats_repo.get_tracked_windows(user_id).get(time_window_hours, set())
+        requested = set(symptom_ids) if symptom_ids else tracked
+        if not requested or not requested <= tracked:
+            raise ValueError(
+                f"No statistics for time_window_hours={time_window_hours}; run the algorithm with this window first"
+            )
 
-        result = db.execute(query)
-        return result.scalars().all()
+        rows = stats_repo.get_cell_counts(user_id, time_window_hours, requested)
+        metrics = metrics_from_cell_rows(rows, stats_repo.get_food_event_total(user_id))
+        return [
+            AlgorithmAssociationResponse(
+                id=row.id,
+                user_id=user_id,
+                symptom_id=row.symptom_id,
+                ingredient_name=row.ingredient,
+                key_metrics=KeyMetrics(**asdict(m)),
+                updated_at=row.updated_at,
+            )
+            for row, m in zip(rows, metrics)
+        ]
+
+    def _get_food_logs_for_user(self, db: Session, user_id: str) -> list[FoodLogEntry]:
+        return fetch_food_logs(db, user_id)
+
+    def _get_symptom_logs_for_user(
+        self,
+        db: Session,
+        user_id: str,
+        symptom_ids: Sequence[UUID] | None,
+    ) -> list[SymptomLogEntry]:
+        return fetch_symptom_logs(db, user_id, symptom_ids)
 
     def _build_metrics_by_symptom(
         self,
-        food_logs: list[FoodLog],
-        symptom_logs: list[SymptomLog],
+        food_logs: list[FoodLogEntry],
+        symptom_logs: list[SymptomLogEntry],
         time_window_hours: float,
+        engine: str = DEFAULT_ENGINE,
     ) -> dict:
         if not food_logs or not symptom_logs:
             return {}
@@ -94,24 +289,7 @@ class AlgorithmService:
         if time_window_hours < 0:
             raise ValueError("time_window_hours must be >= 0")
 
-        # Use actual ingredient strings from each food so the algorithm
-        # computes per-ingredient associations (not per-food).
-        analysis_food_logs = [
-            FoodLogEntry(
-                timestamp=log.timestamp,
-                ingredients=log.food.ingredients if log.food and log.food.ingredients else [],
-            )
-            for log in food_logs
-        ]
-        analysis_symptom_logs = [
-            SymptomLogEntry(timestamp=log.timestamp, symptom_name=str(log.symptom_id), intensity=log.intensity)
-            for log in symptom_logs
-        ]
-        return get_analysis(
-            food_logs=analysis_food_logs,
-            symptom_logs=analysis_symptom_logs,
-            time_window_hours=time_window_hours,
-        )
+        return get_engine(engine)(food_logs, symptom_logs, time_window_hours)
 
     def _serialize_metrics_rows(
         self,
@@ -0,0 +1,339 @@
+"""
+Read-through cache of serialized association listings (GET /algorithm/user/{user_id}).
+
+Entries are the response JSON for one (user, symptom filter, page and filters), so
+a hit skips both the metrics query and per-row response validation. Every key embeds the user's
+generation number; MetricsRepository marks the users it writes on the session and,
+once that session commits, their generation is bumped, so no listing read before
+the write can be served after it, even one stored by a request that raced the commit.
+
+The default backend is an in-process LRU with a TTL. Each API worker process has
+its own, and writes made by other processes (the batch pool, scripts, other
+workers) only show up once the TTL lapses. Setting ASSOCIATION_CACHE_BACKEND=redis
+shares one cache and its generations across processes (requires the ``redis``
+package); ``off`` disables caching.
+
+The cache is only an optimization: a backend error is logged and counted, a failed
+lookup is served as a miss, and a failed invalidation leaves entries to the TTL.
+The async path awaits the backend's async methods, so Redis round trips never block
+the event loop.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Sequence
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from repositories.metrics_repository import METRICS_WRITTEN_USERS
+
+ASSOCIATION_CACHE_BACKEND = os.getenv("ASSOCIATION_CACHE_BACKEND", "memory")
+ASSOCIATION_CACHE_SIZE = int(os.getenv("ASSOCIATION_CACHE_SIZE", "2048"))
+ASSOCIATION_CACHE_TTL_SECONDS = float(os.getenv("ASSOCIATION_CACHE_TTL_SECONDS", "300"))
+ASSOCIATION_CACHE_REDIS_URL = os.getenv("ASSOCIATION_CACHE_REDIS_URL", "redis://localhost:6379/0")
+ASSOCIATION_CACHE_REDIS_TIMEOUT_SECONDS = float(os.getenv("ASSOCIATION_CACHE_REDIS_TIMEOUT_SECONDS", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryCacheBackend:
+    """
+    Size-bounded LRU of byte values with per-entry expiry, plus per-user generation counters.
+
+    Nothing here blocks or fails, so the async methods are the sync ones.
+    """
+
+    exceptions: tuple[type[Exception], ...] = ()
+
+    def __init__(self, maxsize: int = ASSOCIATION_CACHE_SIZE, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._values: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def size(self) -> int | None:
+        return len(self._values)
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._values[key]
+                return None
+            self._values.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        with self._lock:
+            self._values[key] = (self._clock() + ttl_seconds, value)
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def generation(self, username: str) -> int:
+        with self._lock:
+            return self._generations.get(username, 0)
+
+    async def get_async(self, key: str) -> bytes | None:
+        return self.get(key)
+
+    async def set_async(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self.set(key, value, ttl_seconds)
+
+    async def generation_async(self, username: str) -> int:
+        return self.generation(username)
+
+    def bump_generation(self, username: str) -> None:
+        with self._lock:
+            self._generations[username] = self._generations.get(username, 0) + 1
+            # Entries of older generations are unreachable; drop them rather than wait for eviction.
+            prefix = f"{_user_prefix(username)}:"
+            for key in [key for key in self._values if key.startswith(prefix)]:
+                del self._values[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._generations.clear()
+
+
+class RedisCacheBackend:
+    """
+    The same interface on a Redis server, shared by every process; Redis applies the TTL and eviction.
+
+    The async methods use a ``redis.asyncio`` client. Every call gives up after
+    ASSOCIATION_CACHE_REDIS_TIMEOUT_SECONDS and raises a ``redis.RedisError``.
+    """
+
+    def __init__(
+        self, url: str = ASSOCIATION_CACHE_REDIS_URL, timeout: float = ASSOCIATION_CACHE_REDIS_TIMEOUT_SECONDS
+    ):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "ASSOCIATION_CACHE_BACKEND=redis needs the redis package (pip install 'backend[redis]')"
+            ) from e
+        self.maxsize = None
+        self.exceptions = (redis.RedisError,)
+        options = {"socket_timeout": timeout, "socket_connect_timeout": timeout}
+        self._client = redis.Redis.from_url(url, **options)
+        self._async_client = redis.asyncio.Redis.from_url(url, **options)
+
+    def size(self) -> int | None:
+        # Counting would scan the whole keyspace; the stats endpoint reports None instead.
+        return None
+
+    def get(self, key: str) -> bytes | None:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._client.set(key, value, px=_ttl_ms(ttl_seconds))
+
+    def generation(self, username: str) -> int:
+        return int(self._client.get(_generation_key(username)) or 0)
+
+    async def get_async(self, key: str) -> bytes | None:
+        return await self._async_client.get(key)
+
+    async def set_async(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        await self._async_client.set(key, value, px=_ttl_ms(ttl_seconds))
+
+    async def generation_async(self, username: str) -> int:
+        return int(await self._async_client.get(_generation_key(username)) or 0)
+
+    def bump_generation(self, username: str) -> None:
+        self._client.incr(_generation_key(username))
+
+    def clear(self) -> None:
+        """Delete every association key; scans the keyspace, so for tests and maintenance only."""
+        for key in self._client.scan_iter(match="associations:*", count=1000):
+            self._client.delete(key)
+
+
+def _user_prefix(username: str) -> str:
+    return f"associations:{username}"
+
+
+def _generation_key(username: str) -> str:
+    return f"{_user_prefix(username)}:generation"
+
+
+def _ttl_ms(ttl_seconds: float) -> int:
+    return max(1, int(ttl_seconds * 1000))
+
+
+def _filter_key(symptom_ids: Sequence[UUID] | None) -> str:
+    # Order matters: listings are grouped in the order the symptoms were requested.
+    return ",".join(str(symptom_id) for symptom_id in symptom_ids) if symptom_ids else "*"
+
+
+class AssociationCache:
+    """
+    Read-through cache in front of the association listing, with hit-rate counters.
+
+    ``hits`` and ``misses`` count lookups made by this process; a lookup the backend
+    failed counts as a miss. ``backend_errors`` counts failed backend calls.
+    """
+
+    def __init__(self, backend=None, ttl_seconds: float = ASSOCIATION_CACHE_TTL_SECONDS, enabled: bool = True):
+        self.backend = backend if backend is not None else InMemoryCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.backend_errors = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(
+        self,
+        username: str,
+        symptom_ids: Sequence[UUID] | None,
+        load: Callable[[], bytes],
+        variant: str = "",
+    ) -> bytes:
+        """
+        The cached listing for (username, symptom_ids, variant), or ``load()``'s result, stored for later requests.
+
+        ``variant`` distinguishes other shapes of the same listing, e.g. filters and pages.
+        """
+        if not self.enabled:
+            return load()
+
+        key = value = None
+        try:
+            # Read the generation before loading: if a write commits meanwhile, this entry is never looked up.
+            key = self._key(username, self.backend.generation(username), symptom_ids, variant)
+            value = self.backend.get(key)
+        except self.backend.exceptions as e:
+            self._backend_failed("lookup", e)
+        self._count(value)
+        if value is None:
+            value = load()
+            if key is not None:
+                try:
+                    self.backend.set(key, value, self.ttl_seconds)
+                except self.backend.exceptions as e:
+                    self._backend_failed("store", e)
+        return value
+
+    async def get_or_load_async(
+        self,
+        username: str,
+        symptom_ids: Sequence[UUID] | None,
+        load: Callable[[], Awaitable[bytes]],
+        variant: str = "",
+    ) -> bytes:
+        """get_or_load for a coroutine loader, e.g. a query on an AsyncSession; awaits the backend too."""
+        if not self.enabled:
+            return await load()
+
+        key = value = None
+        try:
+            key = self._key(username, await self.backend.generation_async(username), symptom_ids, variant)
+            value = await self.backend.get_async(key)
+        except self.backend.exceptions as e:
+            self._backend_failed("lookup", e)
+        self._count(value)
+        if value is None:
+            value = await load()
+            if key is not None:
+                try:
+                    await self.backend.set_async(key, value, self.ttl_seconds)
+                except self.backend.exceptions as e:
+                    self._backend_failed("store", e)
+        return value
+
+    @staticmethod
+    def _key(username: str, generation: int, symptom_ids: Sequence[UUID] | None, variant: str) -> str:
+        return f"{_user_prefix(username)}:g{generation}:{_filter_key(symptom_ids)}:{variant}"
+
+    def _count(self, value: bytes | None) -> None:
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _backend_failed(self, operation: str, error: Exception) -> None:
+        logger.warning("Association cache %s failed, serving uncached: %s", operation, error)
+        with self._lock:
+            self.backend_errors += 1
+
+    def invalidate(self, username: str) -> None:
+        """Forget every cached listing of ``username``."""
+        if not self.enabled:
+            return
+        try:
+            self.backend.bump_generation(username)
+        except self.backend.exceptions:
+            logger.error(
+                "Could not invalidate cached associations of %s; they may be served until the TTL lapses",
+                username,
+                exc_info=True,
+            )
+            with self._lock:
+                self.backend_errors += 1
+            return
+        with self._lock:
+            self.invalidations += 1
+
+    def info(self) -> dict:
+        with self._lock:
+            hits, misses, invalidations, errors = self.hits, self.misses, self.invalidations, self.backend_errors
+        lookups = hits + misses
+        return {
+            "backend": type(self.backend).__name__,
+            "enabled": self.enabled,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "invalidations": invalidations,
+            "backend_errors": errors,
+            "size": self.backend.size(),
+            "maxsize": self.backend.maxsize,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def clear(self) -> None:
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = self.invalidations = self.backend_errors = 0
+
+
+def _make_association_cache() -> AssociationCache:
+    if ASSOCIATION_CACHE_BACKEND == "off":
+        return AssociationCache(enabled=False)
+    if ASSOCIATION_CACHE_BACKEND == "redis":
+        return AssociationCache(RedisCacheBackend())
+    if ASSOCIATION_CACHE_BACKEND == "memory":
+        return AssociationCache(InMemoryCacheBackend())
+    raise ValueError(f"Unknown ASSOCIATION_CACHE_BACKEND {ASSOCIATION_CACHE_BACKEND!r}; use memory, redis or off")
+
+
+association_cache = _make_association_cache()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_users(session: Session) -> None:
+    for username in session.info.pop(METRICS_WRITTEN_USERS, ()):
+        association_cache.invalidate(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_writes(session: Session) -> None:
+    session.info.pop(METRICS_WRITTEN_USERS, None)
@@ -7,16 +7,24 @@ from typing import Optional
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from repositories.user_repository import UserRepository
+from repositories.user_repository import AsyncUserRepository, UserRepository
 from schemas.user import UserCreate, UserResponse, UserUpdate
+from services.principal_cache import principal_cache
 
 SECRET_KEY = os.getenv("SECRET_KEY", "Ch@ng31tN0W!")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# Comma-separated usernames allowed to call admin endpoints such as POST /algorithm/run-all
+ADMIN_USERNAMES = {u.strip() for u in os.getenv("ADMIN_USERNAMES", "").split(",") if u.strip()}
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor (log2 of the rounds, 4-31); each step doubles the time of a hash or check.
+# Changing it rehashes each user's password at the new cost on their next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -33,6 +41,21 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if its hash uses an outdated cost, hash it again at BCRYPT_ROUNDS.
+
+    Args:
+        plain_password: The plain text password to verify
+        hashed_password: The stored bcrypt hash
+
+    Returns:
+        tuple[bool, Optional[str]]: Whether the password matches, and the replacement hash
+                                    to store (None when the stored one is current)
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """
     Hash a password using bcrypt.
@@ -89,6 +112,7 @@ class AuthService:
 
     def __init__(self):
         self.user_repo = UserRepository()
+        self.async_user_repo = AsyncUserRepository()
 
     def register_user(self, db: Session, user_data: UserCreate) -> dict:
         """
@@ -126,6 +150,8 @@ class AuthService:
         """
         Authenticate a user and return access token.
 
+        A password hashed at a cost other than BCRYPT_ROUNDS is rehashed and stored.
+
         Args:
             db: Database session
             username: Username to authenticate
@@ -139,8 +165,11 @@ class AuthService:
         if not user:
             return None
 
-        if not verify_password(password, user.password_hash):
+        valid, new_hash = verify_and_update_password(password, user.password_hash)
+        if not valid:
             return None
+        if new_hash:
+            self.user_repo.update_password_hash(db, user, new_hash)
 
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(data={"sub": user.username}, expires_delta=access_token_expires)
@@ -164,6 +193,14 @@ class AuthService:
 
         return UserResponse.model_validate(user)
 
+    async def get_current_user_async(self, db: AsyncSession, username: str) -> Optional[UserResponse]:
+        """get_current_user on an AsyncSession."""
+        user = await self.async_user_repo.get_by_username(db, username)
+        if not user:
+            return None
+
+        return UserResponse.model_validate(user)
+
     def update_user(self, db: Session, username: str, user_update: UserUpdate) -> UserResponse:
         """
         Update user's profile.
@@ -180,4 +217,5 @@ class AuthService:
             HTTPException 404: If the user with the given username does not exist
         """
         updated_user = self.user_repo.update_user(db, username, user_update)
+        principal_cache.invalidate(username)
         return UserResponse.model_validate(updated_user)
@@ -0,0 +1,159 @@
+"""Service layer for running the association algorithm for many users at once."""
+
+import logging
+import multiprocessing
+import os
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from database import DATABASE_URL, apply_statement_timeout, engine_options
+from repositories.user_repository import UserRepository
+from schemas.algorithm import AlgorithmRunRequest
+from services.algorithm_service import AlgorithmService
+from services.association_cache import association_cache
+
+logger = logging.getLogger(__name__)
+
+BATCH_ALGORITHM_WORKERS = int(os.getenv("BATCH_ALGORITHM_WORKERS", str(os.cpu_count() or 1)))
+
+
+@dataclass
+class BatchUserResult:
+    """Outcome of the algorithm run for one user."""
+
+    username: str
+    associations: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class BatchRunSummary:
+    """Outcome of a batch run across users."""
+
+    results: list[BatchUserResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def succeeded(self) -> list[str]:
+        return [r.username for r in self.results if r.error is None]
+
+    @property
+    def failed(self) -> dict[str, str]:
+        return {r.username: r.error for r in self.results if r.error is not None}
+
+    @property
+    def associations(self) -> int:
+        return sum(r.associations for r in self.results)
+
+
+ProgressCallback = Callable[[int, int, BatchUserResult], None]
+
+
+def run_user(session_factory: Callable[[], Session], username: str, options: dict) -> BatchUserResult:
+    """
+    Run and persist the algorithm for one user in its own session.
+
+    Failures are captured in the result so one bad user does not abort the batch.
+    """
+    started = time.perf_counter()
+    db = session_factory()
+    try:
+        associations = AlgorithmService().run_algorithm(db, AlgorithmRunRequest(user_id=username, **options))
+        return BatchUserResult(username, len(associations), time.perf_counter() - started)
+    except Exception as e:
+        db.rollback()
+        logger.exception("Algorithm run failed for user %s", username)
+        return BatchUserResult(username, 0, time.perf_counter() - started, error=f"{type(e).__name__}: {e}")
+    finally:
+        db.close()
+
+
+# ── worker process state ──
+# Each worker opens its own engine: connections must never be shared across processes.
+
+_worker_session_factory: sessionmaker | None = None
+
+
+def _init_worker(database_url: str) -> None:
+    global _worker_session_factory
+    engine = create_engine(database_url, **engine_options(pool_size=1, max_overflow=0))
+    apply_statement_timeout(engine)
+    _worker_session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _run_user_in_worker(username: str, options: dict) -> BatchUserResult:
+    return run_user(_worker_session_factory, username, options)
+
+
+class BatchAlgorithmService:
+    """Runs the association algorithm for every (or selected) user across a process pool."""
+
+    def __init__(self, database_url: str | None = DATABASE_URL):
+        self.database_url = database_url
+        self.user_repo = UserRepository()
+
+    def run_all(
+        self,
+        db: Session,
+        usernames: Sequence[str] | None = None,
+        workers: int = BATCH_ALGORITHM_WORKERS,
+        time_window_hours: float = 4.0,
+        engine: str = "python",
+        progress: ProgressCallback | None = None,
+    ) -> BatchRunSummary:
+        """
+        Run the algorithm for ``usernames`` (default: every user) and persist the results.
+
+        Users are the unit of work: each runs read -> analyse -> upsert in its own
+        session, so the batch scales with ``workers`` processes. ``workers=1`` runs
+        in-process with ``db``'s engine, which is also what tests use.
+        """
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        if not self.database_url and workers > 1:
+            raise ValueError("DATABASE_URL is required to run the algorithm in worker processes")
+
+        usernames = list(usernames) if usernames else self.user_repo.list_usernames(db)
+        options = {"time_window_hours": time_window_hours, "engine": engine}
+        summary = BatchRunSummary()
+        started = time.perf_counter()
+
+        def record(result: BatchUserResult) -> None:
+            summary.results.append(result)
+            if progress:
+                progress(len(summary.results), len(usernames), result)
+
+        if workers == 1 or len(usernames) <= 1:
+            session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+            for username in usernames:
+                record(run_user(session_factory, username, options))
+        else:
+            # spawn rather than fork: the parent may hold open connections and threads.
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(usernames)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.database_url,),
+            ) as pool:
+                futures = [pool.submit(_run_user_in_worker, username, options) for username in usernames]
+                for future in as_completed(futures):
+                    record(future.result())
+            # Workers invalidated their own caches only; drop this process's listings of the rewritten users.
+            for username in summary.succeeded:
+                association_cache.invalidate(username)
+
+        summary.seconds = time.perf_counter() - started
+        logger.info(
+            "Batch algorithm run: %d users, %d failed, %d associations in %.1fs",
+            len(summary.results),
+            len(summary.failed),
+            summary.associations,
+            summary.seconds,
+        )
+        return summary
@@ -0,0 +1,167 @@
+"""
+Bounded worker pools for blocking work called from async routes.
+
+Algorithm runs, RAG suggestions (embedding + LLM call), PDF ingest and bcrypt
+hashing would otherwise run on the event loop and stall every other request.
+Routes hand that work to a named pool with ``await pool.run(fn, *args)``.
+
+Each pool admits at most ``workers`` running plus ``queue_depth`` waiting calls;
+past that, ``run`` raises PoolSaturatedError at once (the API answers 503) rather
+than letting a backlog build up behind slow work. The pools are threads: bcrypt,
+torch and numpy release the GIL while they compute.
+
+Work that needs the database runs through ``pool.run_in_session`` and gets a Session
+of its own on the worker. The request's Session must not be passed in: get_db closes
+it when the request ends, and a cancelled request ends while its work keeps running.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+
+ALGORITHM_POOL_WORKERS = int(os.getenv("ALGORITHM_POOL_WORKERS", "4"))
+ALGORITHM_POOL_QUEUE_DEPTH = int(os.getenv("ALGORITHM_POOL_QUEUE_DEPTH", "16"))
+RAG_POOL_WORKERS = int(os.getenv("RAG_POOL_WORKERS", "4"))
+RAG_POOL_QUEUE_DEPTH = int(os.getenv("RAG_POOL_QUEUE_DEPTH", "32"))
+INGEST_POOL_WORKERS = int(os.getenv("INGEST_POOL_WORKERS", "2"))
+INGEST_POOL_QUEUE_DEPTH = int(os.getenv("INGEST_POOL_QUEUE_DEPTH", "4"))
+AUTH_POOL_WORKERS = int(os.getenv("AUTH_POOL_WORKERS", str(os.cpu_count() or 1)))
+AUTH_POOL_QUEUE_DEPTH = int(os.getenv("AUTH_POOL_QUEUE_DEPTH", "64"))
+
+
+class PoolSaturatedError(RuntimeError):
+    """A pool's workers and queue are all taken; the caller should retry later."""
+
+    def __init__(self, pool: str):
+        super().__init__(f"The {pool} pool is at capacity; retry shortly")
+        self.pool = pool
+
+
+class WorkerPool:
+    """
+    A named thread pool with a bounded queue and counters.
+
+    ``running`` and ``queued`` describe the work admitted right now; the other
+    counters accumulate over the life of the process.
+    """
+
+    def __init__(self, name: str, workers: int, queue_depth: int):
+        if workers < 1:
+            raise ValueError(f"{name} pool needs at least one worker")
+        if queue_depth < 0:
+            raise ValueError(f"{name} pool queue depth must be >= 0")
+        self.name = name
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._started = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def run(self, fn: Callable, /, *args, **kwargs):
+        """
+        Run ``fn(*args, **kwargs)`` on a worker and return its result.
+
+        Context variables (e.g. a request id set by middleware) are visible to ``fn``.
+
+        Raises:
+            PoolSaturatedError: If ``workers + queue_depth`` calls are already admitted.
+        """
+        with self._lock:
+            if self._admitted >= self.workers + self.queue_depth:
+                self.rejected += 1
+                raise PoolSaturatedError(self.name)
+            self._admitted += 1
+            self.submitted += 1
+            self.max_queued = max(self.max_queued, self._admitted - self.workers)
+
+        context = contextvars.copy_context()
+        try:
+            future = self._executor.submit(context.run, self._call, time.perf_counter(), fn, args, kwargs)
+        except RuntimeError:  # shut down
+            with self._lock:
+                self._admitted -= 1
+            raise
+        # Released when the work ends, not when the awaiting request goes away.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def run_in_session(self, session_factory: Callable[[], Session], fn: Callable, /, *args, **kwargs):
+        """``run(fn, db, *args, **kwargs)`` with a ``db`` the worker opens from ``session_factory`` and then closes."""
+
+        def call():
+            with session_factory() as db:
+                return fn(db, *args, **kwargs)
+
+        return await self.run(call)
+
+    def _call(self, submitted_at: float, fn: Callable, args: tuple, kwargs: dict):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._started += 1
+            self.wait_seconds += started - submitted_at
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.run_seconds += time.perf_counter() - started
+
+    def _release(self, future: Future) -> None:
+        with self._lock:
+            self._admitted -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def info(self) -> dict:
+        with self._lock:
+            finished = self.completed + self.failed
+            started = self._started
+            return {
+                "name": self.name,
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "running": self._running,
+                "queued": self._admitted - self._running,
+                "max_queued": self.max_queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_seconds": self.wait_seconds / started if started else 0.0,
+                "avg_run_seconds": self.run_seconds / finished if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+algorithm_pool = WorkerPool("algorithm", ALGORITHM_POOL_WORKERS, ALGORITHM_POOL_QUEUE_DEPTH)
+rag_pool = WorkerPool("rag", RAG_POOL_WORKERS, RAG_POOL_QUEUE_DEPTH)
+ingest_pool = WorkerPool("ingest", INGEST_POOL_WORKERS, INGEST_POOL_QUEUE_DEPTH)
+auth_pool = WorkerPool("auth", AUTH_POOL_WORKERS, AUTH_POOL_QUEUE_DEPTH)
+
+POOLS = (algorithm_pool, rag_pool, ingest_pool, auth_pool)
+
+
+def shutdown_pools(wait: bool = True) -> None:
+    """Stop every pool; queued calls are cancelled, running ones finish when ``wait``."""
+    for pool in POOLS:
+        pool.shutdown(wait=wait)
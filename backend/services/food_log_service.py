@@ -4,22 +4,34 @@ import logging
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from repositories.food_log_repository import FoodLogRepository
+from repositories.food_log_repository import AsyncFoodLogRepository, FoodLogRepository
 from schemas.food_log import FoodLogCreate, FoodLogResponse, FoodLogUpdate
+from services.incremental_metrics_service import IncrementalMetricsService, food_log_entry
 
 
 class FoodLogService:
     """Service for handling food log business logic."""
 
-    def __init__(self):
+    def __init__(self, incremental_metrics: IncrementalMetricsService | None = None):
         self.food_log_repo = FoodLogRepository()
+        self.async_food_log_repo = AsyncFoodLogRepository()
+        self.incremental_metrics = incremental_metrics or IncrementalMetricsService()
 
     def create_food_log(self, db: Session, food_log_data: FoodLogCreate) -> FoodLogResponse:
         logging.info(f"Creating food log for user: {food_log_data.username}")
-        created = self.food_log_repo.create_food_log(db, food_log_data)
-        return FoodLogResponse.model_validate(created)
+        try:
+            created = self.food_log_repo.create_food_log(db, food_log_data, commit=False)
+            response = FoodLogResponse.model_validate(created)
+            if self.incremental_metrics.enabled:
+                self.incremental_metrics.food_log_changed(db, created.username, None, food_log_entry(created))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return response
 
     def get_food_log_by_id(self, db: Session, food_log_id: UUID) -> Optional[FoodLogResponse]:
         food_log = self.food_log_repo.get_food_log_by_id(db, food_log_id)
@@ -31,14 +43,49 @@ class FoodLogService:
         food_logs = self.food_log_repo.get_food_logs_by_username(db, username)
         return [FoodLogResponse.model_validate(log) for log in food_logs]
 
-    def update_food_log(self, db: Session, food_log_id: UUID, data: FoodLogUpdate) -> Optional[FoodLogResponse]:
-        updated = self.food_log_repo.update_food_log_by_id(db, food_log_id, data)
-        if not updated:
+    async def get_food_log_by_id_async(self, db: AsyncSession, food_log_id: UUID) -> Optional[FoodLogResponse]:
+        food_log = await self.async_food_log_repo.get_food_log_by_id(db, food_log_id)
+        if not food_log:
             return None
-        return FoodLogResponse.model_validate(updated)
+        return FoodLogResponse.model_validate(food_log)
+
+    async def get_food_logs_by_username_async(self, db: AsyncSession, username: str) -> list[FoodLogResponse]:
+        food_logs = await self.async_food_log_repo.get_food_logs_by_username(db, username)
+        return [FoodLogResponse.model_validate(log) for log in food_logs]
+
+    def update_food_log(self, db: Session, food_log_id: UUID, data: FoodLogUpdate) -> Optional[FoodLogResponse]:
+        before = self._snapshot(db, food_log_id)
+        try:
+            updated = self.food_log_repo.update_food_log_by_id(db, food_log_id, data, commit=False)
+            if not updated:
+                return None
+            response = FoodLogResponse.model_validate(updated)
+            if before is not None:
+                self.incremental_metrics.food_log_changed(db, updated.username, before, food_log_entry(updated))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return response
 
     def delete_food_log_by_id(self, db: Session, food_log_id: UUID) -> Optional[FoodLogResponse]:
-        deleted = self.food_log_repo.delete_food_log_by_id(db, food_log_id)
-        if not deleted:
+        before = self._snapshot(db, food_log_id)
+        try:
+            deleted = self.food_log_repo.delete_food_log_by_id(db, food_log_id, commit=False)
+            if not deleted:
+                return None
+            response = FoodLogResponse.model_validate(deleted)
+            if before is not None:
+                self.incremental_metrics.food_log_changed(db, deleted.username, before, None)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return response
+
+    def _snapshot(self, db: Session, food_log_id: UUID):
+        """Capture a food log's analysis view before it is modified, if incremental metrics are on."""
+        if not self.incremental_metrics.enabled:
             return None
-        return FoodLogResponse.model_validate(deleted)
+        food_log = self.food_log_repo.get_food_log_by_id(db, food_log_id)
+        return food_log_entry(food_log) if food_log else None
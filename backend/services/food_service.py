@@ -3,10 +3,14 @@
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from repositories.food_repository import FoodRepository
+from analysis.models import FoodLogEntry
+from repositories.food_log_repository import FoodLogRepository
+from repositories.food_repository import AsyncFoodRepository, FoodRepository
 from schemas.food import FoodCreate, FoodResponse
+from services.incremental_metrics_service import IncrementalMetricsService
 
 
 class FoodService:
@@ -17,8 +21,11 @@ class FoodService:
     business rules. Routes just call these methods and return the results.
     """
 
-    def __init__(self):
+    def __init__(self, incremental_metrics: IncrementalMetricsService | None = None):
         self.food_repo = FoodRepository()
+        self.async_food_repo = AsyncFoodRepository()
+        self.food_log_repo = FoodLogRepository()
+        self.incremental_metrics = incremental_metrics or IncrementalMetricsService()
 
     def create_food(self, db: Session, food_data: FoodCreate) -> FoodResponse:
         """
@@ -42,6 +49,9 @@ class FoodService:
         """
         Updates a food product in the database
 
+        Changing the ingredients changes every log of the food, so the logs' statistics
+        and metrics are updated in the same transaction.
+
         Args:
             food_id (int): the food ID to update
             food_data (dict): the new food_data
@@ -54,7 +64,16 @@ class FoodService:
         if not existing_food:
             return None
 
-        updated_food = self.food_repo.update_food_by_id(db, food_id, food_data.model_dump())
+        new_ingredients = food_data.ingredients or []
+        changes = self._log_changes(db, food_id, existing_food.ingredients or [], new_ingredients)
+        try:
+            updated_food = self.food_repo.update_food_by_id(db, food_id, food_data.model_dump(), commit=False)
+            for username, user_changes in changes.items():
+                self.incremental_metrics.food_logs_changed(db, username, user_changes)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
 
         return FoodResponse.model_validate(updated_food)
 
@@ -73,6 +92,13 @@ class FoodService:
             return None
         return FoodResponse.model_validate(food)
 
+    async def get_food_by_id_async(self, db: AsyncSession, food_id: UUID) -> Optional[FoodResponse]:
+        """get_food_by_id on an AsyncSession."""
+        food = await self.async_food_repo.get_food_by_id(db, food_id)
+        if not food:
+            return None
+        return FoodResponse.model_validate(food)
+
     def delete_food_by_id(self, db: Session, food_id: UUID) -> Optional[FoodResponse]:
         """
         Delete a food by its ID.
@@ -80,15 +106,43 @@ class FoodService:
         Args:
             food_id: The ID of the food to delete
 
+        Its logs are deleted with it, and their statistics and metrics in the same transaction.
+
         Returns:
             The Food that was deleted, or None if not found
         """
-        deleted_food = self.food_repo.delete_food_by_id(db, food_id)
-        if not deleted_food:
+        existing_food = self.food_repo.get_food_by_id(db, food_id)
+        if not existing_food:
             return None
 
+        changes = self._log_changes(db, food_id, existing_food.ingredients or [], None)
+        try:
+            deleted_food = self.food_repo.delete_food_by_id(db, food_id, commit=False)
+            for username, user_changes in changes.items():
+                self.incremental_metrics.food_logs_changed(db, username, user_changes)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
         return FoodResponse.model_validate(deleted_food)
 
+    def _log_changes(
+        self, db: Session, food_id: UUID, old_ingredients: list[str], new_ingredients: list[str] | None
+    ) -> dict[str, list[tuple[FoodLogEntry, FoodLogEntry | None]]]:
+        """
+        Per user, how each log of the food changes for analysis when its ingredients
+        become ``new_ingredients`` (None: the food and its logs are deleted).
+        """
+        if not self.incremental_metrics.enabled or old_ingredients == new_ingredients:
+            return {}
+        changes: dict[str, list[tuple[FoodLogEntry, FoodLogEntry | None]]] = {}
+        for log in self.food_log_repo.get_food_logs_by_food_id(db, food_id):
+            before = FoodLogEntry(timestamp=log.timestamp, ingredients=old_ingredients)
+            after = None if new_ingredients is None else FoodLogEntry(log.timestamp, new_ingredients)
+            changes.setdefault(log.username, []).append((before, after))
+        return changes
+
     def get_all_foods(self, db: Session, username: Optional[str] = None) -> list[FoodResponse]:
         """
         Retrieve all food items, optionally filtered by username.
@@ -102,3 +156,8 @@ class FoodService:
         for food in all_foods:
             new_list.append(FoodResponse.model_validate(food))
         return new_list
+
+    async def get_all_foods_async(self, db: AsyncSession, username: Optional[str] = None) -> list[FoodResponse]:
+        """get_all_foods on an AsyncSession."""
+        all_foods = await self.async_food_repo.get_all_foods(db, username=username)
+        return [FoodResponse.model_validate(food) for food in all_foods]
@@ -0,0 +1,260 @@
+"""Service layer for keeping association metrics current as logs are written."""
+
+import logging
+import os
+from datetime import timedelta
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from analysis.incremental import WindowStatsDelta, food_event_delta, symptom_event_delta
+from analysis.models import FoodLogEntry, IngredientSymptomMetrics, SymptomLogEntry
+from analysis.per_ingredient_counts import count_ingredient_occurrences
+from analysis.sweep import window_stats_sweep
+from analysis.vectorized import metrics_from_counts
+from models.food_log import FoodLog
+from models.symptom_log import SymptomLog
+from repositories.metrics_repository import MetricsRepository
+from repositories.metrics_stats_repository import MetricsStatsRepository
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_METRICS_ENABLED = os.getenv("INCREMENTAL_METRICS_ENABLED", "true").lower() == "true"
+
+
+def food_log_entry(log: FoodLog) -> FoodLogEntry:
+    """Analysis view of a food log: its timestamp and its food's ingredients."""
+    return FoodLogEntry(
+        timestamp=log.timestamp,
+        ingredients=log.food.ingredients if log.food and log.food.ingredients else [],
+    )
+
+
+def symptom_log_entry(log: SymptomLog) -> SymptomLogEntry:
+    """Analysis view of a symptom log, named by symptom id."""
+    return SymptomLogEntry(timestamp=log.timestamp, symptom_name=str(log.symptom_id), intensity=log.intensity)
+
+
+def metrics_from_cell_rows(rows: list, total_food_events: int) -> list[IngredientSymptomMetrics]:
+    """Derive metrics for MetricsStatsRepository.get_cell_counts rows in one batched pass."""
+    if not rows:
+        return []
+    return metrics_from_counts(
+        a=[row.exposures for row in rows],
+        ingredient_total=[row.ingredient_total for row in rows],
+        total_in_window=[row.foods_in_window for row in rows],
+        total_food_events=total_food_events,
+        intensity_sums=[row.intensity_sum for row in rows],
+        intensity_counts=[row.intensity_count for row in rows],
+    )
+
+
+class IncrementalMetricsService:
+    """
+    Folds single food/symptom log writes into the stored sufficient statistics
+    and refreshes the affected ingredient_symptom_metrics rows.
+
+    Statistics are seeded by AlgorithmService.run_algorithm; until a user has run
+    the algorithm nothing is tracked and log writes are a no-op here. Each write
+    only reads the logs within one window of the changed event, so the cost is
+    proportional to the changed windows rather than the user's history.
+
+    A delta is taken against the neighbouring logs, so two writers of one user must
+    not read past each other's uncommitted logs. Every hook, and a full run before it
+    reads the logs, first takes the user's statistics lock (lock_statistics); the lock
+    is held until commit, and at READ COMMITTED the next holder's reads then see
+    the previous holder's logs.
+
+    The change hooks do not commit: the calling service writes the log with
+    ``commit=False``, calls the hook and commits once, so the log, its statistics
+    delta and the refreshed metrics land (or roll back) together.
+    """
+
+    def __init__(self, enabled: bool = INCREMENTAL_METRICS_ENABLED):
+        self.enabled = enabled
+
+    def lock_statistics(self, db: Session, username: str) -> None:
+        """Serialize statistics writes for ``username`` until the transaction ends."""
+        MetricsStatsRepository(db).lock_user(username)
+
+    def seed(
+        self,
+        db: Session,
+        username: str,
+        time_window_hours: float,
+        symptom_ids: set[UUID],
+        food_logs: list[FoodLogEntry],
+        symptom_logs: list[SymptomLogEntry],
+        stats_by_window: dict[float, WindowStatsDelta] | None = None,
+        ingredient_totals: dict[str, int] | None = None,
+        total_food_events: int | None = None,
+        force: bool = False,
+    ) -> None:
+        """
+        Replace the user's statistics with full-history values. Does not commit: the
+        run that computed them commits them with its metrics.
+
+        ``stats_by_window`` holds statistics the caller already swept, possibly for
+        several windows; ``time_window_hours`` is the one the stored metrics reflect.
+        Callers that already have ``ingredient_totals`` and ``total_food_events`` (e.g.
+        counted in SQL) may pass empty log lists alongside them. ``force`` stores the
+        statistics even with incremental updates disabled, for runs whose extra windows
+        are read back from them; they then reflect this run until the next one.
+        """
+        if not self.enabled and not force:
+            return
+
+        if stats_by_window is None:
+            stats_by_window = window_stats_sweep(food_logs, symptom_logs, [time_window_hours])
+        if ingredient_totals is None or total_food_events is None:
+            ingredient_totals, total_food_events = count_ingredient_occurrences(food_logs)
+
+        stats_repo = MetricsStatsRepository(db)
+        for window, stats in stats_by_window.items():
+            stats_repo.replace_stats(
+                username,
+                window,
+                symptom_ids,
+                ingredient_totals,
+                stats,
+                total_food_events,
+                backs_metrics=window == time_window_hours,
+            )
+
+    def food_log_changed(
+        self,
+        db: Session,
+        username: str,
+        before: FoodLogEntry | None,
+        after: FoodLogEntry | None,
+    ) -> None:
+        """
+        Apply a food log create (before=None), delete (after=None) or update.
+
+        Any food write changes the user's food totals, so every tracked symptom is refreshed.
+        """
+        self.food_logs_changed(db, username, [(before, after)])
+
+    def food_logs_changed(
+        self,
+        db: Session,
+        username: str,
+        changes: list[tuple[FoodLogEntry | None, FoodLogEntry | None]],
+    ) -> None:
+        """
+        Apply several (before, after) food log changes of one user, then refresh the metrics once.
+
+        Used when a Food's ingredients change or it is deleted along with its logs.
+        A food event's delta depends only on the symptoms around it, so the changes
+        can be applied one after another in any order.
+        """
+        changes = [(before, after) for before, after in changes if before != after]
+        if not self.enabled or not changes:
+            return
+
+        stats_repo = MetricsStatsRepository(db)
+        stats_repo.lock_user(username)
+        tracked = stats_repo.get_tracked_windows(username)
+        if not tracked:
+            return
+
+        # Creates add a food event and deletes remove one; ingredient edits leave the total alone.
+        stats_repo.apply_food_events(
+            username, sum((after is not None) - (before is not None) for before, after in changes)
+        )
+        widest = timedelta(hours=max(tracked))
+        for before, after in changes:
+            for entry, sign in ((before, -1), (after, 1)):
+                if entry is None:
+                    continue
+
+                stats_repo.apply_ingredient_totals(
+                    username, {ingredient: sign for ingredient in set(entry.ingredients)}
+                )
+                nearby_symptoms = stats_repo.get_symptom_entries_between(
+                    username, entry.timestamp, entry.timestamp + widest
+                )
+                for window, symptom_ids in tracked.items():
+                    delta = food_event_delta(entry, nearby_symptoms, window)
+                    stats_repo.apply_window_delta(username, window, delta.scaled(sign), symptom_ids)
+
+        self._refresh_metrics(db, username)
+
+    def symptom_log_changed(
+        self,
+        db: Session,
+        username: str,
+        log_id: UUID,
+        before: SymptomLogEntry | None,
+        after: SymptomLogEntry | None,
+    ) -> None:
+        """Apply a symptom log create (before=None), delete (after=None) or update."""
+        if not self.enabled or before == after:
+            return
+
+        stats_repo = MetricsStatsRepository(db)
+        stats_repo.lock_user(username)
+        affected: set[UUID] = set()
+
+        for entry, sign in ((before, -1), (after, 1)):
+            if entry is None:
+                continue
+
+            symptom_id = UUID(entry.symptom_name)
+            tracked = stats_repo.get_tracked_windows(username, symptom_id=symptom_id)
+            if not tracked:
+                continue
+
+            widest = timedelta(hours=max(tracked))
+            nearby_foods = stats_repo.get_food_entries_between(username, entry.timestamp - widest, entry.timestamp)
+            # Exclude the log itself so the delta is taken against the state without it.
+            same_symptom = stats_repo.get_symptom_entries_between(
+                username,
+                entry.timestamp - widest,
+                entry.timestamp + widest,
+                symptom_id=symptom_id,
+                exclude_log_id=log_id,
+            )
+            for window, symptom_ids in tracked.items():
+                delta = symptom_event_delta(entry, nearby_foods, same_symptom, window)
+                stats_repo.apply_window_delta(username, window, delta.scaled(sign), symptom_ids)
+                affected.add(symptom_id)
+
+        if affected:
+            self._refresh_metrics(db, username, affected)
+
+    def _refresh_metrics(self, db: Session, username: str, symptom_ids: set[UUID] | None = None) -> None:
+        """
+        Recompute stored metrics rows from the statistics alone.
+
+        Only the window backing each symptom's metrics (its latest run) is published;
+        other tracked windows are kept current and read on demand. Does not commit.
+        """
+        stats_repo = MetricsStatsRepository(db)
+        metrics_repo = MetricsRepository(db)
+        total_food_events = stats_repo.get_food_event_total(username)
+
+        for window, window_symptom_ids in stats_repo.get_tracked_windows(username, backs_metrics_only=True).items():
+            if symptom_ids is not None:
+                window_symptom_ids = window_symptom_ids & symptom_ids
+            if not window_symptom_ids:
+                continue
+
+            rows = stats_repo.get_cell_counts(username, window, window_symptom_ids)
+            metrics_by_symptom: dict[UUID, dict[str, IngredientSymptomMetrics]] = {
+                symptom_id: {} for symptom_id in window_symptom_ids
+            }
+            for row, metrics in zip(rows, metrics_from_cell_rows(rows, total_food_events)):
+                metrics_by_symptom[row.symptom_id][row.ingredient] = metrics
+
+            for symptom_id, metrics_by_ingredient in metrics_by_symptom.items():
+                # Ingredients whose exposures dropped to zero no longer have a metric.
+                metrics_repo.delete_except(username, symptom_id, metrics_by_ingredient.keys())
+                metrics_repo.upsert_metrics(
+                    username=username,
+                    symptom_id=symptom_id,
+                    metrics_by_ingredient=metrics_by_ingredient,
+                    commit=False,
+                )
+
+        logger.info("Refreshed metrics incrementally for user %s", username)
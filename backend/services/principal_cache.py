@@ -0,0 +1,158 @@
+"""
+Short-lived cache of the users behind bearer tokens, in front of get_current_user.
+
+Every authenticated request decodes its token and then loads the user row; with the
+cache, a token seen in the last PRINCIPAL_CACHE_TTL_SECONDS skips that query. The
+token is still decoded and checked on every request, so an expired token is refused
+even while its user is cached.
+
+Entries are keyed by token and hold the UserResponse. AuthService.update_user
+invalidates the user once the change is committed, and a load that raced the update
+is not stored. The cache is per process: an update served by another worker shows
+up here once the TTL lapses. PRINCIPAL_CACHE_TTL_SECONDS=0 disables it.
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+from schemas.user import UserResponse
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+
+
+class PrincipalCache:
+    """
+    LRU of token -> UserResponse with a TTL, per-user invalidation and hit-rate counters.
+
+    ``hits`` and ``misses`` count lookups made by this process.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = PRINCIPAL_CACHE_SIZE,
+        ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, UserResponse]] = OrderedDict()
+        self._tokens: dict[str, set[str]] = {}
+        # Loads in flight per user; invalidate() discards them. Each load removes itself when it finishes.
+        self._loads: dict[str, set[int]] = {}
+        self._load_ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.maxsize > 0
+
+    def get_or_load(self, token: str, username: str, load: Callable[[], UserResponse | None]) -> UserResponse | None:
+        """The cached user for ``token``, or ``load()``'s result, stored unless it is None."""
+        if not self.enabled:
+            return load()
+        principal, load_id = self._lookup(token, username)
+        if principal is None:
+            try:
+                principal = load()
+            finally:
+                self._store(token, username, principal, load_id)
+        return principal
+
+    async def get_or_load_async(
+        self, token: str, username: str, load: Callable[[], Awaitable[UserResponse | None]]
+    ) -> UserResponse | None:
+        """get_or_load for a coroutine loader, e.g. a query on an AsyncSession."""
+        if not self.enabled:
+            return await load()
+        principal, load_id = self._lookup(token, username)
+        if principal is None:
+            try:
+                principal = await load()
+            finally:
+                self._store(token, username, principal, load_id)
+        return principal
+
+    def _lookup(self, token: str, username: str) -> tuple[UserResponse | None, int]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[1], 0
+            if entry is not None:
+                self._drop(token, entry[1].username)
+            self.misses += 1
+            # Register the load before it runs: an update committed meanwhile keeps the result out.
+            load_id = next(self._load_ids)
+            self._loads.setdefault(username, set()).add(load_id)
+            return None, load_id
+
+    def _store(self, token: str, username: str, principal: UserResponse | None, load_id: int) -> None:
+        with self._lock:
+            loads = self._loads.get(username)
+            if loads is None or load_id not in loads:
+                return
+            loads.discard(load_id)
+            if not loads:
+                del self._loads[username]
+            if principal is None or principal.username != username:
+                return
+            self._entries[token] = (self._clock() + self.ttl_seconds, principal)
+            self._entries.move_to_end(token)
+            self._tokens.setdefault(username, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                evicted, (_, evicted_principal) = self._entries.popitem(last=False)
+                self._forget_token(evicted, evicted_principal.username)
+
+    def _drop(self, token: str, username: str) -> None:
+        del self._entries[token]
+        self._forget_token(token, username)
+
+    def _forget_token(self, token: str, username: str) -> None:
+        tokens = self._tokens.get(username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens[username]
+
+    def invalidate(self, username: str) -> None:
+        """Forget every cached token of ``username``, and any load of it still in flight."""
+        with self._lock:
+            self._loads.pop(username, None)
+            for token in self._tokens.pop(username, ()):
+                del self._entries[token]
+            self.invalidations += 1
+
+    def info(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            lookups = hits + misses
+            return {
+                "enabled": self.enabled,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens.clear()
+            self._loads.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+
+principal_cache = PrincipalCache()
@@ -1,17 +1,21 @@
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from repositories.symptom_log_repository import SymptomLogRepository
+from repositories.symptom_log_repository import AsyncSymptomLogRepository, SymptomLogRepository
 from schemas.symptom_log import SymptomLogCreate, SymptomLogResponse, SymptomLogUpdate
+from services.incremental_metrics_service import IncrementalMetricsService, symptom_log_entry
 
 
 class SymptomLogService:
     """Business logic for symptom logs."""
 
-    def __init__(self):
+    def __init__(self, incremental_metrics: IncrementalMetricsService | None = None):
         self.repo = SymptomLogRepository()
+        self.async_repo = AsyncSymptomLogRepository()
+        self.incremental_metrics = incremental_metrics or IncrementalMetricsService()
 
     def get_symptom_log(self, db: Session, log_id: UUID) -> Optional[SymptomLogResponse]:
         log = self.repo.get_by_id(db, log_id)
@@ -20,18 +24,65 @@ class SymptomLogService:
         return SymptomLogResponse.model_validate(log)
 
     def create_symptom_log(self, db: Session, data: SymptomLogCreate) -> SymptomLogResponse:
-        log = self.repo.create(db, data)
-        return SymptomLogResponse.model_validate(log)
+        try:
+            log = self.repo.create(db, data, commit=False)
+            response = SymptomLogResponse.model_validate(log)
+            if self.incremental_metrics.enabled:
+                self.incremental_metrics.symptom_log_changed(db, log.username, log.id, None, symptom_log_entry(log))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return response
 
     def get_symptom_logs_by_username(self, db: Session, username: str) -> list[SymptomLogResponse]:
         logs = self.repo.get_by_username(db, username)
         return [SymptomLogResponse.model_validate(log) for log in logs]
 
-    def update_symptom_log(self, db: Session, log_id: UUID, data: SymptomLogUpdate) -> Optional[SymptomLogResponse]:
-        updated = self.repo.update(db, log_id, data)
-        if not updated:
+    async def get_symptom_log_async(self, db: AsyncSession, log_id: UUID) -> Optional[SymptomLogResponse]:
+        log = await self.async_repo.get_by_id(db, log_id)
+        if not log:
             return None
-        return SymptomLogResponse.model_validate(updated)
+        return SymptomLogResponse.model_validate(log)
+
+    async def get_symptom_logs_by_username_async(self, db: AsyncSession, username: str) -> list[SymptomLogResponse]:
+        logs = await self.async_repo.get_by_username(db, username)
+        return [SymptomLogResponse.model_validate(log) for log in logs]
+
+    def update_symptom_log(self, db: Session, log_id: UUID, data: SymptomLogUpdate) -> Optional[SymptomLogResponse]:
+        before = self._snapshot(db, log_id)
+        try:
+            updated = self.repo.update(db, log_id, data, commit=False)
+            if not updated:
+                return None
+            response = SymptomLogResponse.model_validate(updated)
+            if before is not None:
+                self.incremental_metrics.symptom_log_changed(
+                    db, updated.username, log_id, before, symptom_log_entry(updated)
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return response
 
     def delete_symptom_log(self, db: Session, log_id: UUID) -> bool:
-        return self.repo.delete(db, log_id)
+        existing = self.repo.get_by_id(db, log_id) if self.incremental_metrics.enabled else None
+        before = symptom_log_entry(existing) if existing else None
+        username = existing.username if existing else None
+        try:
+            deleted = self.repo.delete(db, log_id, commit=False)
+            if deleted and before is not None:
+                self.incremental_metrics.symptom_log_changed(db, username, log_id, before, None)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return deleted
+
+    def _snapshot(self, db: Session, log_id: UUID):
+        """Capture a symptom log's analysis view before it is modified, if incremental metrics are on."""
+        if not self.incremental_metrics.enabled:
+            return None
+        log = self.repo.get_by_id(db, log_id)
+        return symptom_log_entry(log) if log else None
@@ -3,10 +3,11 @@
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from models.symptom import Symptom
-from repositories.symptom_repository import SymptomRepository
+from repositories.symptom_repository import AsyncSymptomRepository, SymptomRepository
 from schemas.symptom import SymptomCreate, SymptomResponse
 
 
@@ -20,6 +21,7 @@ class SymptomService:
 
     def __init__(self):
         self.symptom_repo = SymptomRepository()
+        self.async_symptom_repo = AsyncSymptomRepository()
 
     def create_symptom(self, db: Session, symptom_data: SymptomCreate) -> SymptomResponse:
         """
@@ -87,6 +89,13 @@ class SymptomService:
             return None
         return SymptomResponse.model_validate(symptom)
 
+    async def get_symptom_by_id_async(self, db: AsyncSession, symptom_id: UUID) -> Optional[SymptomResponse]:
+        """get_symptom_by_id on an AsyncSession."""
+        symptom = await self.async_symptom_repo.get_symptom_by_id(db, symptom_id)
+        if not symptom:
+            return None
+        return SymptomResponse.model_validate(symptom)
+
     def delete_symptom_by_id(self, db: Session, symptom_id: UUID) -> Optional[SymptomResponse]:
         """
         Delete a symptom by its ID.
@@ -116,3 +125,8 @@ class SymptomService:
         for symptom in all_symptoms:
             new_list.append(SymptomResponse.model_validate(symptom))
         return new_list
+
+    async def get_all_symptoms_async(self, db: AsyncSession, username: Optional[str] = None) -> list[SymptomResponse]:
+        """get_all_symptoms on an AsyncSession."""
+        all_symptoms = await self.async_symptom_repo.get_all_symptoms(db, username=username)
+        return [SymptomResponse.model_validate(symptom) for symptom in all_symptoms]
@@ -0,0 +1,144 @@
+"""Integration tests: the Postgres window join and the cursor stream match the in-process analysis."""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from analysis.data import fetch_window_counts, stream_window_counts
+from analysis.per_ingredient_counts import count_ingredient_occurrences
+from analysis.sweep import window_stats_sweep
+from models.metrics import Metrics
+from repositories.symptom_repository import SymptomRepository
+from schemas.algorithm import AlgorithmRunRequest
+from schemas.food import FoodCreate
+from schemas.food_log import FoodLogCreate
+from schemas.symptom import SymptomCreate
+from schemas.symptom_log import SymptomLogCreate
+from services.algorithm_service import AlgorithmService
+from services.food_log_service import FoodLogService
+from services.food_service import FoodService
+from services.symptom_log_service import SymptomLogService
+
+START = datetime(2025, 1, 1)
+
+
+@pytest.fixture
+def history(db_session, authenticated_user, sample_symptom_data):
+    """A week of random logs for two symptoms, plus exact window-boundary cases."""
+    username = authenticated_user["username"]
+    symptoms = [
+        SymptomRepository().create_symptom(
+            db_session, SymptomCreate(**{**sample_symptom_data, "name": name, "location": location})
+        )
+        for name, location in (("headache", "jaw"), ("bloating", "stomach"))
+    ]
+    foods = [
+        FoodService().create_food(db_session, FoodCreate(name=name, ingredients=ingredients, username=username))
+        for name, ingredients in {
+            "toast": ["gluten", "butter"],
+            "latte": ["dairy", "coffee"],
+            "salad": ["lettuce", "dairy"],
+            "orange": [],
+        }.items()
+    ]
+
+    rng = random.Random(7)
+    food_service, symptom_service = FoodLogService(), SymptomLogService()
+    for _ in range(40):
+        ts = START + timedelta(minutes=rng.randrange(7 * 24 * 60))
+        food_service.create_food_log(
+            db_session, FoodLogCreate(username=username, food_id=rng.choice(foods).id, timestamp=ts)
+        )
+    for _ in range(15):
+        ts = START + timedelta(minutes=rng.randrange(7 * 24 * 60))
+        symptom_service.create_symptom_log(
+            db_session,
+            SymptomLogCreate(
+                username=username, symptom_id=rng.choice(symptoms).id, timestamp=ts, intensity=rng.randint(1, 10)
+            ),
+        )
+
+    # Window of the 10:00 symptom at 4h is [06:00, 10:00).
+    boundary = START + timedelta(days=10, hours=10)
+    for offset in (timedelta(hours=-4), timedelta(0)):
+        food_service.create_food_log(
+            db_session, FoodLogCreate(username=username, food_id=foods[0].id, timestamp=boundary + offset)
+        )
+    symptom_service.create_symptom_log(
+        db_session, SymptomLogCreate(username=username, symptom_id=symptoms[0].id, timestamp=boundary, intensity=4)
+    )
+    return username, [symptom.id for symptom in symptoms]
+
+
+def _small_batches(db, username, window, symptom_ids=None):
+    """Stream with a batch size well below the row count so several cursor fetches are needed."""
+    return stream_window_counts(db, username, window, symptom_ids, batch_size=7)
+
+
+def _in_process(db, username, window, symptom_ids=None):
+    service = AlgorithmService()
+    food_entries = service._get_food_logs_for_user(db, username)
+    symptom_entries = service._get_symptom_logs_for_user(db, username, symptom_ids)
+    return window_stats_sweep(food_entries, symptom_entries, [window])[window], count_ingredient_occurrences(
+        food_entries
+    )
+
+
+def _stored(db, username) -> dict:
+    return {
+        (row.symptom_id, row.ingredient): (row.exposures, row.trigger_rate, row.fishers_p_value, row.average_intensity)
+        for row in db.query(Metrics).filter_by(username=username).all()
+    }
+
+
+@pytest.mark.parametrize("fetch_counts", [fetch_window_counts, stream_window_counts, _small_batches])
+@pytest.mark.parametrize("window", [0.0, 2.0, 4.0, 24.0])
+def test_counts_match_the_in_process_sweep(db_session, history, window, fetch_counts):
+    username, symptom_ids = history
+
+    counts = fetch_counts(db_session, username, window)
+    stats, (ingredient_totals, total_food_events) = _in_process(db_session, username, window)
+
+    assert counts.stats == stats
+    assert counts.ingredient_totals == ingredient_totals
+    assert counts.total_food_events == total_food_events == 42
+    assert counts.symptom_ids == set(symptom_ids)
+
+
+@pytest.mark.parametrize("fetch_counts", [fetch_window_counts, stream_window_counts, _small_batches])
+def test_counts_are_scoped_to_symptom_ids(db_session, history, fetch_counts):
+    username, symptom_ids = history
+
+    counts = fetch_counts(db_session, username, 4.0, symptom_ids[:1])
+
+    assert counts.stats == _in_process(db_session, username, 4.0, symptom_ids[:1])[0]
+    assert counts.symptom_ids == {symptom_ids[0]}
+
+
+@pytest.mark.parametrize("engine", ["sql", "stream"])
+def test_engine_persists_the_same_metrics(db_session, history, engine):
+    username, _ = history
+    service = AlgorithmService()
+
+    service.run_algorithm(db_session, AlgorithmRunRequest(user_id=username, engine="python"))
+    expected = _stored(db_session, username)
+    service.run_algorithm(db_session, AlgorithmRunRequest(user_id=username, engine=engine))
+
+    assert expected
+    assert _stored(db_session, username) == expected
+    served = service.get_associations(db_session, username, time_window_hours=4.0)
+    assert {(a.symptom_id, a.ingredient_name): a.key_metrics.exposures for a in served} == {
+        key: value[0] for key, value in expected.items()
+    }
+
+
+def test_user_without_logs_gets_nothing(db_session, authenticated_user):
+    counts = fetch_window_counts(db_session, authenticated_user["username"], 4.0)
+    assert (counts.stats.exposures, counts.ingredient_totals, counts.total_food_events) == ({}, {}, 0)
+    assert (
+        AlgorithmService().run_algorithm(
+            db_session, AlgorithmRunRequest(user_id=authenticated_user["username"], engine="sql")
+        )
+        == []
+    )
@@ -0,0 +1,186 @@
+"""Integration tests for the asyncpg read path: async repositories, services and routes on an AsyncSession."""
+
+import json
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from database import async_database_url, get_read_db
+from models.food import Food
+from models.food_log import FoodLog
+from models.metrics import Metrics
+from models.symptom import Symptom
+from models.symptom_log import SymptomLog
+from models.tag import FoodTag, Tag
+from models.user import User
+from repositories.food_repository import AsyncFoodRepository
+from repositories.metrics_repository import AsyncMetricsRepository
+from repositories.user_repository import AsyncUserRepository
+from routers import algorithm_router, food_log_router, symptom_log_router, symptom_router
+from routers.auth import get_current_user
+from schemas.algorithm import AssociationListQuery
+from schemas.user import UserResponse
+from services.algorithm_service import AlgorithmService
+from services.association_cache import AssociationCache, InMemoryCacheBackend
+from services.food_log_service import FoodLogService
+from services.symptom_log_service import SymptomLogService
+from services.symptom_service import SymptomService
+
+pytest.importorskip("asyncpg")
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+async def async_db(db_engine):
+    """An AsyncSession inside a transaction that is rolled back after the test."""
+    engine = create_async_engine(async_database_url(db_engine.url))
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        yield session
+        await session.close()
+        await transaction.rollback()
+    await engine.dispose()
+
+
+@pytest.fixture
+async def seeded(async_db):
+    """One user with two foods (one tagged), a symptom, logs of each, and a few metrics rows."""
+    username = f"async_{uuid4().hex[:8]}"
+    async_db.add(User(username=username, email=f"{username}@example.com", password_hash="x"))
+    await async_db.flush()
+
+    tag = Tag(name=f"dairy_{username}")
+    toast = Food(name="toast", ingredients=["gluten", "butter"], username=username, created_at=START)
+    latte = Food(name="latte", ingredients=["dairy", "coffee"], username=username, created_at=START + timedelta(1))
+    symptom = Symptom(username=username, name="headache", location="head", sensation="throbbing")
+    async_db.add_all([tag, toast, latte, symptom])
+    await async_db.flush()
+
+    async_db.add(FoodTag(food_id=latte.id, tag_id=tag.id))
+    food_log = FoodLog(username=username, food_id=toast.id, timestamp=START)
+    symptom_log = SymptomLog(username=username, symptom_id=symptom.id, intensity=5, timestamp=START)
+    async_db.add_all([food_log, symptom_log])
+    async_db.add_all(
+        Metrics(
+            username=username,
+            symptom_id=symptom.id,
+            ingredient=f"ingredient_{i}",
+            exposures=i,
+            trigger_rate=0.5,
+            base_rate=0.25,
+            fishers_p_value=1.0 / (i + 1),
+            average_intensity=5.0,
+        )
+        for i in range(1, 6)
+    )
+    await async_db.flush()
+    return {
+        "username": username,
+        "toast": toast.id,
+        "latte": latte.id,
+        "symptom": symptom.id,
+        "food_log": food_log.id,
+        "symptom_log": symptom_log.id,
+    }
+
+
+async def test_user_lookup(async_db, seeded):
+    repo = AsyncUserRepository()
+
+    assert (await repo.get_by_username(async_db, seeded["username"])).email == f"{seeded['username']}@example.com"
+    assert await repo.get_by_username(async_db, "nobody") is None
+
+
+async def test_foods_come_with_their_tags(async_db, seeded):
+    async_db.expunge_all()  # force the tags to be loaded by the query, not found in the identity map
+
+    foods = await AsyncFoodRepository().get_all_foods(async_db, username=seeded["username"])
+
+    assert [food.name for food in foods] == ["latte", "toast"]
+    assert [tag.name for tag in foods[0].tags] == [f"dairy_{seeded['username']}"]
+    assert foods[1].tags == []
+
+
+async def test_service_reads(async_db, seeded):
+    username = seeded["username"]
+
+    assert [log.id for log in await FoodLogService().get_food_logs_by_username_async(async_db, username)] == [
+        seeded["food_log"]
+    ]
+    assert (await FoodLogService().get_food_log_by_id_async(async_db, seeded["food_log"])).food_id == seeded["toast"]
+    assert (await SymptomLogService().get_symptom_log_async(async_db, seeded["symptom_log"])).intensity == 5
+    assert await SymptomLogService().get_symptom_log_async(async_db, uuid4()) is None
+    assert [s.id for s in await SymptomService().get_all_symptoms_async(async_db, username)] == [seeded["symptom"]]
+    assert (await SymptomService().get_symptom_by_id_async(async_db, seeded["symptom"])).name == "headache"
+
+
+async def test_metrics_listing_pages_like_the_sync_repository(async_db, seeded):
+    repo = AsyncMetricsRepository(async_db)
+
+    by_exposures = await repo.list_by_user(seeded["username"])
+    top_p_values = await repo.list_by_user(seeded["username"], sort="p_value", limit=2)
+    after = await repo.list_by_user(seeded["username"], limit=2, after=(4, by_exposures[1].id))
+
+    assert [row.exposures for row in by_exposures] == [5, 4, 3, 2, 1]
+    assert [row.exposures for row in top_p_values] == [5, 4]
+    assert [row.exposures for row in after] == [3, 2]
+
+
+async def test_association_pages_through_the_cache(async_db, seeded, monkeypatch):
+    cache = AssociationCache(InMemoryCacheBackend())
+    monkeypatch.setattr("services.association_cache.association_cache", cache)
+    monkeypatch.setattr("services.algorithm_service.association_cache", cache)
+    service = AlgorithmService()
+
+    exposures, cursor = [], None
+    while True:
+        query = AssociationListQuery(limit=2, cursor=cursor)
+        body, cursor = await service.get_associations_json_async(async_db, seeded["username"], query=query)
+        exposures += [row["key_metrics"]["exposures"] for row in json.loads(body)]
+        if cursor is None:
+            break
+    first_page = AssociationListQuery(limit=2)
+    again, _ = await service.get_associations_json_async(async_db, seeded["username"], query=first_page)
+
+    assert exposures == [5, 4, 3, 2, 1]
+    assert [row["key_metrics"]["exposures"] for row in json.loads(again)] == [5, 4]
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+async def test_routes_serve_from_the_async_session(async_db, seeded, monkeypatch):
+    monkeypatch.setattr("services.algorithm_service.association_cache", AssociationCache(enabled=False))
+    app = FastAPI()
+    app.include_router(algorithm_router.router)
+    app.include_router(food_log_router.router)
+    app.include_router(symptom_log_router.router)
+    app.include_router(symptom_router.router)
+
+    async def override_get_read_db():
+        yield async_db
+
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    app.dependency_overrides[get_current_user] = lambda: UserResponse(
+        username=seeded["username"], email=f"{seeded['username']}@example.com", created_at=START
+    )
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        food_log = await client.get(f"/food-log/{seeded['food_log']}")
+        symptoms = await client.get("/symptom/")
+        logs = await client.get("/symptom-logs/user/me")
+        missing = await client.get(f"/symptom/{uuid4()}")
+        associations = await client.get(f"/algorithm/user/{seeded['username']}", params={"limit": 2})
+        untracked_window = await client.get(f"/algorithm/user/{seeded['username']}", params={"time_window_hours": 4.0})
+
+    assert food_log.json()["food_id"] == str(seeded["toast"])
+    assert [symptom["id"] for symptom in symptoms.json()] == [str(seeded["symptom"])]
+    assert [log["id"] for log in logs.json()] == [str(seeded["symptom_log"])]
+    assert missing.status_code == 404
+    assert [row["key_metrics"]["exposures"] for row in associations.json()] == [5, 4]
+    assert associations.headers[algorithm_router.NEXT_CURSOR_HEADER]
+    # Served through the session's sync facade: no statistics were stored for this user.
+    assert untracked_window.status_code == 404
@@ -2,10 +2,13 @@
 
 import pytest
 from fastapi import HTTPException
+from passlib.context import CryptContext
+from sqlalchemy import event
 
 from repositories.user_repository import UserRepository
 from schemas.user import UserCreate, UserUpdate
 from services.auth_service import AuthService, decode_access_token
+from services.principal_cache import PrincipalCache
 
 
 class TestAuthServiceIntegration:
@@ -91,6 +94,21 @@ class TestAuthServiceIntegration:
 
         assert token_data is None
 
+    def test_authenticate_user_rehashes_at_the_configured_cost(self, db_session, sample_user_data, monkeypatch):
+        """Test login stores a new hash once, after BCRYPT_ROUNDS changes."""
+        service = AuthService()
+        service.register_user(db_session, UserCreate(**sample_user_data))
+        user = UserRepository().get_by_username(db_session, sample_user_data["username"])
+        assert user.password_hash.startswith("$2b$04$")
+
+        monkeypatch.setattr("services.auth_service.pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=5))
+        assert service.authenticate_user(db_session, sample_user_data["username"], sample_user_data["password"])
+        rehashed = user.password_hash
+        assert service.authenticate_user(db_session, sample_user_data["username"], sample_user_data["password"])
+
+        assert rehashed.startswith("$2b$05$")
+        assert user.password_hash == rehashed
+
     def test_authenticate_user_not_found(self, db_session):
         """Test authentication fails when user doesn't exist."""
         service = AuthService()
@@ -258,3 +276,61 @@ class TestMeEndpoint:
         response = test_client.get("/auth/me")
 
         assert response.status_code == 401
+
+
+class TestPrincipalCacheIntegration:
+    """get_current_user served from the principal cache, and refreshed after a profile update."""
+
+    @pytest.fixture
+    def client(self, db_session, monkeypatch):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from database import get_db, get_read_db
+        from routers import auth
+
+        cache = PrincipalCache(ttl_seconds=60)
+        monkeypatch.setattr(auth, "principal_cache", cache)
+        monkeypatch.setattr("services.auth_service.principal_cache", cache)
+        app = FastAPI()
+        app.include_router(auth.router)
+
+        def override_get_db():
+            yield db_session
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+        with TestClient(app) as c:
+            yield c, cache
+
+    def test_repeat_requests_skip_the_user_query(self, client, db_session, sample_user_data):
+        client, cache = client
+        token = AuthService().register_user(db_session, UserCreate(**sample_user_data))["access_token"]
+        headers = {"authorization": f"Bearer {token}"}
+        queries = []
+
+        def record(conn, cursor, statement, *args):
+            queries.append(statement)
+
+        event.listen(db_session.bind, "before_cursor_execute", record)
+        try:
+            first = client.get("/auth/me", headers=headers)
+            second = client.get("/auth/me", headers=headers)
+        finally:
+            event.remove(db_session.bind, "before_cursor_execute", record)
+
+        assert first.json() == second.json()
+        assert len([sql for sql in queries if "FROM users" in sql]) == 1
+        stats = client.get("/auth/principal-cache").json()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    def test_profile_update_is_visible_on_the_next_request(self, client, db_session, sample_user_data):
+        client, cache = client
+        token = AuthService().register_user(db_session, UserCreate(**sample_user_data))["access_token"]
+        headers = {"authorization": f"Bearer {token}"}
+
+        assert client.get("/auth/me", headers=headers).json()["weight"] is None
+        client.put("/auth/me", headers=headers, json={"weight": 150.0})
+
+        assert client.get("/auth/me", headers=headers).json()["weight"] == 150.0
+        assert cache.info()["invalidations"] == 1
@@ -0,0 +1,109 @@
+"""Integration tests for the configurable connection pooling in database.py."""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+import database
+from database import MeteredQueuePool, apply_statement_timeout, async_database_url, engine_options, pool_status
+
+
+@pytest.fixture
+def make_engine(db_engine):
+    """Build engines on the test database and dispose of them afterwards."""
+    engines = []
+
+    def make(**options):
+        engine = create_engine(db_engine.url, **options)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+def test_defaults_use_the_metered_queue_pool(make_engine):
+    engine = make_engine(**engine_options())
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        status = pool_status(engine)
+        assert (status["checked_out"], status["overflow"]) == (1, 0)
+
+    status = pool_status(engine)
+    assert isinstance(engine.pool, MeteredQueuePool)
+    assert (status["size"], status["max_overflow"]) == (database.DATABASE_POOL_SIZE, database.DATABASE_MAX_OVERFLOW)
+    assert (status["checked_out"], status["checked_in"], status["checkouts"], status["timeouts"]) == (0, 1, 1, 0)
+    assert status["max_wait_ms"] >= status["avg_wait_ms"] > 0
+
+
+def test_exhausted_pool_counts_overflow_and_timeouts(make_engine, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_POOL_TIMEOUT", 0.05)
+    engine = make_engine(**engine_options(pool_size=1, max_overflow=1))
+
+    with engine.connect(), engine.connect():
+        assert pool_status(engine)["overflow"] == 1
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    status = pool_status(engine)
+    assert (status["checkouts"], status["timeouts"]) == (3, 1)
+    assert status["max_wait_ms"] >= 50
+
+
+def test_dispose_recreates_a_metered_pool_with_the_same_sizes(make_engine):
+    engine = make_engine(**engine_options(pool_size=2, max_overflow=3))
+    engine.dispose()
+
+    with engine.connect():
+        status = pool_status(engine)
+    assert isinstance(engine.pool, MeteredQueuePool)
+    assert (status["size"], status["max_overflow"], status["checkouts"]) == (2, 3, 1)
+
+
+def test_statement_timeout_is_set_on_connect(make_engine, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_STATEMENT_TIMEOUT_MS", 1234)
+    engine = make_engine(**engine_options())
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SHOW statement_timeout")).scalar() == "1234ms"
+
+
+def test_pgbouncer_mode_skips_local_pooling_and_sets_the_timeout_per_transaction(make_engine, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_PGBOUNCER", True)
+    monkeypatch.setattr(database, "DATABASE_STATEMENT_TIMEOUT_MS", 1234)
+    engine = make_engine(**engine_options(pool_size=1, max_overflow=0))
+    apply_statement_timeout(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SHOW statement_timeout")).scalar() == "1234ms"
+        conn.rollback()
+        # SET LOCAL ends with each transaction, so every new one sets it again.
+        assert conn.exec_driver_sql("SHOW statement_timeout").scalar() == "1234ms"
+
+    assert isinstance(engine.pool, NullPool)
+    assert pool_status(engine) == {"pool": "NullPool", "pgbouncer": True}
+
+
+async def test_async_engine_options(db_engine, monkeypatch):
+    pytest.importorskip("asyncpg")
+    monkeypatch.setattr(database, "DATABASE_STATEMENT_TIMEOUT_MS", 1234)
+    engine = create_async_engine(async_database_url(db_engine.url), **engine_options(asynchronous=True))
+    try:
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("SHOW statement_timeout"))).scalar() == "1234ms"
+        assert pool_status(engine)["checkouts"] == 1
+    finally:
+        await engine.dispose()
+
+
+async def test_read_dependency_reuses_the_request_session(monkeypatch):
+    monkeypatch.setattr(database, "AsyncSessionLocal", None)
+    request_session = object()
+
+    dependency = database.get_read_db(request_session)
+    assert await anext(dependency) is request_session
+    await dependency.aclose()
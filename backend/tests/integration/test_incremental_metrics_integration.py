@@ -0,0 +1,348 @@
+"""Integration tests: incremental metric maintenance matches a full recompute."""
+
+from datetime import datetime
+from uuid import UUID
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models.metrics import Metrics
+from models.metrics_stats import FoodEventTotal
+from repositories.metrics_repository import MetricsRepository
+from repositories.metrics_stats_repository import MetricsStatsRepository
+from repositories.symptom_repository import SymptomRepository
+from schemas.algorithm import AlgorithmRunRequest
+from schemas.food import FoodCreate
+from schemas.food_log import FoodLogCreate, FoodLogUpdate
+from schemas.symptom import SymptomCreate
+from schemas.symptom_log import SymptomLogCreate, SymptomLogUpdate
+from services.algorithm_service import AlgorithmService
+from services.food_log_service import FoodLogService
+from services.food_service import FoodService
+from services.incremental_metrics_service import IncrementalMetricsService
+from services.symptom_log_service import SymptomLogService
+
+WINDOW = 4.0
+
+
+@pytest.fixture
+def setup(db_session, authenticated_user, sample_symptom_data):
+    username = authenticated_user["username"]
+    symptom = SymptomRepository().create_symptom(db_session, SymptomCreate(**sample_symptom_data))
+    foods = {
+        name: FoodService().create_food(db_session, FoodCreate(name=name, ingredients=ingredients, username=username))
+        for name, ingredients in {
+            "toast": ["gluten", "butter"],
+            "latte": ["dairy", "coffee"],
+            "salad": ["lettuce", "dairy"],
+        }.items()
+    }
+    return username, symptom.id, foods
+
+
+def _log_food(db, username, food, ts):
+    return FoodLogService().create_food_log(db, FoodLogCreate(username=username, food_id=food.id, timestamp=ts))
+
+
+def _log_symptom(db, username, symptom_id, ts, intensity):
+    return SymptomLogService().create_symptom_log(
+        db, SymptomLogCreate(username=username, symptom_id=symptom_id, timestamp=ts, intensity=intensity)
+    )
+
+
+def _stored(db, username) -> dict:
+    return {
+        (row.symptom_id, row.ingredient): (
+            row.exposures,
+            row.trigger_rate,
+            row.base_rate,
+            row.fishers_p_value,
+            row.average_intensity,
+        )
+        for row in db.query(Metrics).filter_by(username=username).all()
+    }
+
+
+def _recomputed(db, username, time_window_hours=WINDOW) -> dict:
+    service = AlgorithmService()
+    result = service._build_metrics_by_symptom(
+        food_logs=service._get_food_logs_for_user(db, username),
+        symptom_logs=service._get_symptom_logs_for_user(db, username, None),
+        time_window_hours=time_window_hours,
+    )
+    return {
+        (UUID(symptom_id), ingredient): (
+            m.exposures,
+            m.trigger_rate,
+            m.base_rate,
+            m.fishers_p_value,
+            m.average_intensity,
+        )
+        for symptom_id, by_ingredient in result.items()
+        for ingredient, m in by_ingredient.items()
+    }
+
+
+class TestIncrementalMetrics:
+    def test_writes_before_first_run_are_untracked(self, db_session, setup):
+        username, symptom_id, foods = setup
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 8))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 5)
+
+        assert _stored(db_session, username) == {}
+
+    def test_log_writes_after_run_keep_metrics_current(self, db_session, setup):
+        username, symptom_id, foods = setup
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 8))
+        _log_food(db_session, username, foods["latte"], datetime(2025, 1, 1, 9))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 5)
+
+        AlgorithmService().run_algorithm(
+            db_session, AlgorithmRunRequest(user_id=username, symptom_ids=[symptom_id], time_window_hours=WINDOW)
+        )
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+        # New food inside an existing window, plus a food that is not covered at all.
+        _log_food(db_session, username, foods["salad"], datetime(2025, 1, 1, 9, 30))
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 2, 8))
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+        # Overlapping symptom: foods already covered only gain intensity.
+        second = _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 11), 9)
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+        # A symptom that newly covers the 2025-01-02 toast.
+        third = _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 2, 9), 3)
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+        SymptomLogService().update_symptom_log(db_session, second.id, SymptomLogUpdate(intensity=2))
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+        SymptomLogService().delete_symptom_log(db_session, third.id)
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+    def test_food_log_update_and_delete(self, db_session, setup):
+        username, symptom_id, foods = setup
+        early = _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 8))
+        _log_food(db_session, username, foods["latte"], datetime(2025, 1, 1, 9))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 6)
+
+        AlgorithmService().run_algorithm(
+            db_session, AlgorithmRunRequest(user_id=username, symptom_ids=[symptom_id], time_window_hours=WINDOW)
+        )
+
+        # Move the toast out of the window, then delete the latte.
+        FoodLogService().update_food_log(db_session, early.id, FoodLogUpdate(timestamp=datetime(2025, 1, 1, 1)))
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+        latte_log = next(
+            log
+            for log in FoodLogService().get_food_logs_by_username(db_session, username)
+            if log.food_id == foods["latte"].id
+        )
+        FoodLogService().delete_food_log_by_id(db_session, latte_log.id)
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+    def test_every_run_window_stays_readable_from_statistics(self, db_session, setup):
+        username, symptom_id, foods = setup
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 3))
+        _log_food(db_session, username, foods["latte"], datetime(2025, 1, 1, 8))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 5)
+
+        service = AlgorithmService()
+        for window in (8.0, WINDOW):
+            service.run_algorithm(
+                db_session, AlgorithmRunRequest(user_id=username, symptom_ids=[symptom_id], time_window_hours=window)
+            )
+
+        _log_food(db_session, username, foods["salad"], datetime(2025, 1, 1, 4))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 11), 7)
+
+        # The stored metrics follow the latest run's window...
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+        # ...while both windows are served from the statistics alone.
+        for window in (8.0, WINDOW):
+            served = {
+                (a.symptom_id, a.ingredient_name): tuple(a.key_metrics.model_dump().values())
+                for a in service.get_associations(db_session, username, time_window_hours=window)
+            }
+            assert served == _recomputed(db_session, username, window)
+
+    def test_unknown_window_is_rejected(self, db_session, setup):
+        username, symptom_id, foods = setup
+        with pytest.raises(ValueError, match="No statistics"):
+            AlgorithmService().get_associations(db_session, username, [symptom_id], time_window_hours=2.0)
+
+    def test_multi_window_run_persists_every_window(self, db_session, setup):
+        username, symptom_id, foods = setup
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 1))
+        _log_food(db_session, username, foods["latte"], datetime(2025, 1, 1, 7))
+        _log_food(db_session, username, foods["salad"], datetime(2025, 1, 1, 9))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 5)
+
+        service = AlgorithmService()
+        service.run_algorithm(
+            db_session,
+            AlgorithmRunRequest(
+                user_id=username,
+                symptom_ids=[symptom_id],
+                time_window_hours=WINDOW,
+                time_windows_hours=[2.0, 24.0],
+            ),
+        )
+
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+        for window in (2.0, WINDOW, 24.0):
+            served = {
+                (a.symptom_id, a.ingredient_name): tuple(a.key_metrics.model_dump().values())
+                for a in service.get_associations(db_session, username, time_window_hours=window)
+            }
+            assert served == _recomputed(db_session, username, window)
+
+    def test_multi_window_run_without_incremental_updates(self, db_session, setup):
+        username, symptom_id, foods = setup
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 1))
+        _log_food(db_session, username, foods["latte"], datetime(2025, 1, 1, 9))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 5)
+
+        service = AlgorithmService(incremental_metrics=IncrementalMetricsService(enabled=False))
+        service.run_algorithm(
+            db_session,
+            AlgorithmRunRequest(
+                user_id=username, symptom_ids=[symptom_id], time_window_hours=WINDOW, time_windows_hours=[24.0]
+            ),
+        )
+
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+        served = {
+            (a.symptom_id, a.ingredient_name): tuple(a.key_metrics.model_dump().values())
+            for a in service.get_associations(db_session, username, time_window_hours=24.0)
+        }
+        assert served == _recomputed(db_session, username, 24.0)
+
+    def test_failed_run_stores_no_statistics(self, db_session, setup, monkeypatch):
+        username, symptom_id, foods = setup
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 8))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 5)
+
+        def fail(*args, **kwargs):
+            raise RuntimeError("write failed")
+
+        monkeypatch.setattr(MetricsRepository, "sync_metrics", fail)
+        with Session(bind=db_session.connection(), join_transaction_mode="create_savepoint") as session:
+            with pytest.raises(RuntimeError, match="write failed"):
+                AlgorithmService().run_algorithm(
+                    session,
+                    AlgorithmRunRequest(user_id=username, symptom_ids=[symptom_id], time_window_hours=WINDOW),
+                )
+            session.rollback()
+        monkeypatch.undo()
+
+        # The seed went down with the run, so log writes stay untracked.
+        assert MetricsStatsRepository(db_session).get_tracked_windows(username) == {}
+
+    def test_failed_refresh_rolls_back_the_log_write(self, db_session, setup, monkeypatch):
+        username, symptom_id, foods = setup
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 8))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 5)
+        AlgorithmService().run_algorithm(
+            db_session, AlgorithmRunRequest(user_id=username, symptom_ids=[symptom_id], time_window_hours=WINDOW)
+        )
+        stored = _stored(db_session, username)
+
+        def fail(*args, **kwargs):
+            raise RuntimeError("refresh failed")
+
+        monkeypatch.setattr(IncrementalMetricsService, "_refresh_metrics", fail)
+        # a session joined through a savepoint, so its rollback stays inside the test transaction
+        with Session(bind=db_session.connection(), join_transaction_mode="create_savepoint") as session:
+            with pytest.raises(RuntimeError, match="refresh failed"):
+                _log_food(session, username, foods["latte"], datetime(2025, 1, 1, 9))
+            with pytest.raises(RuntimeError, match="refresh failed"):
+                _log_symptom(session, username, symptom_id, datetime(2025, 1, 1, 11), 7)
+        monkeypatch.undo()
+
+        assert len(FoodLogService().get_food_logs_by_username(db_session, username)) == 1
+        assert len(SymptomLogService().get_symptom_logs_by_username(db_session, username)) == 1
+        assert _stored(db_session, username) == stored
+        # The statistics still match the logs, so later writes stay exact.
+        _log_food(db_session, username, foods["latte"], datetime(2025, 1, 1, 9))
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+    def test_food_ingredient_edit_and_delete(self, db_session, setup):
+        username, symptom_id, foods = setup
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 8))
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 2, 8))
+        _log_food(db_session, username, foods["latte"], datetime(2025, 1, 1, 9))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 5)
+        AlgorithmService().run_algorithm(
+            db_session, AlgorithmRunRequest(user_id=username, symptom_ids=[symptom_id], time_window_hours=WINDOW)
+        )
+
+        FoodService().update_food_by_id(
+            db_session, foods["toast"].id, FoodCreate(name="toast", ingredients=["rye", "butter"], username=username)
+        )
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+        FoodService().delete_food_by_id(db_session, foods["latte"].id)
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+        assert {ingredient for _, ingredient in _stored(db_session, username)} == {"rye", "butter"}
+
+    @pytest.mark.parametrize("engine", ["python", "sql"])
+    def test_food_event_total_moves_with_the_statistics(self, db_session, setup, engine):
+        username, symptom_id, foods = setup
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 8))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 5)
+        AlgorithmService().run_algorithm(
+            db_session,
+            AlgorithmRunRequest(
+                user_id=username, symptom_ids=[symptom_id], time_window_hours=WINDOW, engine=engine
+            ),
+        )
+        stats_repo = MetricsStatsRepository(db_session)
+        assert stats_repo.get_food_event_total(username) == 1
+
+        latte = _log_food(db_session, username, foods["latte"], datetime(2025, 1, 1, 9))
+        _log_food(db_session, username, foods["salad"], datetime(2025, 1, 3, 9))
+        assert stats_repo.get_food_event_total(username) == 3
+        FoodLogService().delete_food_log_by_id(db_session, latte.id)
+        FoodService().delete_food_by_id(db_session, foods["salad"].id)
+        assert stats_repo.get_food_event_total(username) == 1
+        assert _stored(db_session, username) == _recomputed(db_session, username)
+
+    def test_inconsistent_statistics_fail_the_write(self, db_session, setup):
+        username, symptom_id, foods = setup
+        _log_food(db_session, username, foods["toast"], datetime(2025, 1, 1, 8))
+        _log_food(db_session, username, foods["latte"], datetime(2025, 1, 1, 9))
+        _log_symptom(db_session, username, symptom_id, datetime(2025, 1, 1, 10), 5)
+        AlgorithmService().run_algorithm(
+            db_session, AlgorithmRunRequest(user_id=username, symptom_ids=[symptom_id], time_window_hours=WINDOW)
+        )
+        stored = _stored(db_session, username)
+        # Fewer food events than foods in the window: the unexposed cell of every table goes negative.
+        db_session.query(FoodEventTotal).filter_by(username=username).update({"food_events": 0})
+
+        with Session(bind=db_session.connection(), join_transaction_mode="create_savepoint") as session:
+            with pytest.raises(ValueError, match="inconsistent counts"):
+                _log_symptom(session, username, symptom_id, datetime(2025, 1, 1, 11), 7)
+
+        assert len(SymptomLogService().get_symptom_logs_by_username(db_session, username)) == 1
+        assert _stored(db_session, username) == stored
+
+class TestStatisticsLock:
+    def test_user_lock_is_held_until_the_transaction_ends(self, db_engine):
+        with Session(db_engine) as holder, Session(db_engine) as waiter:
+            MetricsStatsRepository(holder).lock_user("alice")
+            waiter.execute(text("SET LOCAL lock_timeout = '50ms'"))
+            with pytest.raises(OperationalError, match="lock timeout"):
+                MetricsStatsRepository(waiter).lock_user("alice")
+            waiter.rollback()
+
+            # Other users are not held up, and the lock goes with the holder's transaction.
+            MetricsStatsRepository(waiter).lock_user("bob")
+            holder.rollback()
+            waiter.execute(text("SET LOCAL lock_timeout = '50ms'"))
+            MetricsStatsRepository(waiter).lock_user("alice")
+            waiter.rollback()
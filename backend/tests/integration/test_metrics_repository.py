@@ -0,0 +1,290 @@
+"""Integration tests for the metrics repository: bulk and diffed writes, cache invalidation and paged reads."""
+
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from analysis.models import IngredientSymptomMetrics
+from database import get_read_db
+from models.metrics import Metrics
+from repositories import metrics_repository
+from repositories.metrics_repository import MetricsRepository, MetricsWriteCounts
+from repositories.symptom_repository import SymptomRepository
+from routers import algorithm_router
+from schemas.algorithm import AssociationListQuery
+from schemas.symptom import SymptomCreate
+from services import association_cache as association_cache_module
+from services.algorithm_service import AlgorithmService
+from services.association_cache import AssociationCache, InMemoryCacheBackend
+
+
+def _metrics(exposures: int) -> IngredientSymptomMetrics:
+    return IngredientSymptomMetrics(
+        exposures=exposures, trigger_rate=0.5, base_rate=0.25, fishers_p_value=0.04, average_intensity=6.0
+    )
+
+
+@pytest.fixture
+def symptom_ids(db_session, authenticated_user, sample_symptom_data):
+    return [
+        SymptomRepository()
+        .create_symptom(db_session, SymptomCreate(**{**sample_symptom_data, "name": name, "location": location}))
+        .id
+        for name, location in (("headache", "jaw"), ("bloating", "stomach"))
+    ]
+
+
+def _stored(db_session, username) -> dict:
+    return {
+        (row.symptom_id, row.ingredient): row.exposures
+        for row in db_session.query(Metrics).filter_by(username=username)
+    }
+
+
+def _row_versions(db_session, username) -> dict:
+    rows = db_session.execute(
+        text("SELECT symptom_id, ingredient, ctid::text FROM ingredient_symptom_metrics WHERE username = :username"),
+        {"username": username},
+    )
+    return {(symptom_id, ingredient): ctid for symptom_id, ingredient, ctid in rows}
+
+
+def test_bulk_upsert_returns_every_row_across_chunks(db_session, authenticated_user, symptom_ids, monkeypatch):
+    username = authenticated_user["username"]
+    monkeypatch.setattr(metrics_repository, "UPSERT_CHUNK_ROWS", 3)
+    metrics_by_symptom = {
+        symptom_id: {f"ingredient-{i}": _metrics(i + 1) for i in range(4)} for symptom_id in symptom_ids
+    }
+
+    returned = MetricsRepository(db_session).bulk_upsert_metrics(username, metrics_by_symptom)
+
+    expected = {
+        (symptom_id, ingredient): m.exposures
+        for symptom_id, by_ingredient in metrics_by_symptom.items()
+        for ingredient, m in by_ingredient.items()
+    }
+    assert {(row.symptom_id, row.ingredient): row.exposures for row in returned} == expected
+    assert all(row.id is not None and row.updated_at is not None for row in returned)
+    assert _stored(db_session, username) == expected
+
+
+def test_bulk_upsert_returns_updated_values_on_conflict(db_session, authenticated_user, symptom_ids):
+    username = authenticated_user["username"]
+    repo = MetricsRepository(db_session)
+    (first,) = repo.bulk_upsert_metrics(username, {symptom_ids[0]: {"dairy": _metrics(2)}})
+    first_id = first.id
+
+    (updated,) = repo.bulk_upsert_metrics(username, {symptom_ids[0]: {"dairy": _metrics(7)}})
+
+    assert (updated.id, updated.exposures) == (first_id, 7)
+    assert _stored(db_session, username) == {(symptom_ids[0], "dairy"): 7}
+
+
+def test_bulk_upsert_of_nothing_issues_no_statement(db_session, authenticated_user):
+    assert MetricsRepository(db_session).bulk_upsert_metrics(authenticated_user["username"], {}) == []
+    assert MetricsRepository(db_session).bulk_upsert_metrics(authenticated_user["username"], {"x": {}}) == []
+
+
+def test_sync_writes_only_the_difference(db_session, authenticated_user, symptom_ids):
+    username = authenticated_user["username"]
+    repo = MetricsRepository(db_session)
+    headache, bloating = symptom_ids
+    repo.bulk_upsert_metrics(
+        username,
+        {headache: {"dairy": _metrics(2), "gluten": _metrics(3), "soy": _metrics(1)}, bloating: {"dairy": _metrics(5)}},
+    )
+    before = _row_versions(db_session, username)
+
+    rows, counts = repo.sync_metrics(
+        username, {headache: {"dairy": _metrics(2), "gluten": _metrics(4), "egg": _metrics(1)}}, [headache]
+    )
+
+    assert counts == MetricsWriteCounts(inserted=1, updated=1, deleted=1, unchanged=1)
+    assert {(row.symptom_id, row.ingredient): row.exposures for row in rows} == {
+        (headache, "dairy"): 2,
+        (headache, "gluten"): 4,
+        (headache, "egg"): 1,
+    }
+    # bloating was out of scope
+    assert _stored(db_session, username) == {
+        (headache, "dairy"): 2,
+        (headache, "gluten"): 4,
+        (headache, "egg"): 1,
+        (bloating, "dairy"): 5,
+    }
+    # an update writes a new row version; the unchanged rows are never rewritten
+    after = _row_versions(db_session, username)
+    assert after[(headache, "dairy")] == before[(headache, "dairy")]
+    assert after[(bloating, "dairy")] == before[(bloating, "dairy")]
+    assert after[(headache, "gluten")] != before[(headache, "gluten")]
+
+
+def test_sync_without_scope_prunes_every_stale_row(db_session, authenticated_user, symptom_ids):
+    username = authenticated_user["username"]
+    repo = MetricsRepository(db_session)
+    repo.bulk_upsert_metrics(username, {symptom_id: {"dairy": _metrics(1)} for symptom_id in symptom_ids})
+
+    rows, counts = repo.sync_metrics(username, {})
+
+    assert (rows, counts) == ([], MetricsWriteCounts(deleted=2))
+    assert _stored(db_session, username) == {}
+
+
+def test_repeated_sync_is_a_no_op(db_session, authenticated_user, symptom_ids):
+    username = authenticated_user["username"]
+    repo = MetricsRepository(db_session)
+    metrics_by_symptom = {symptom_ids[0]: {"dairy": _metrics(2), "gluten": _metrics(3)}}
+
+    repo.sync_metrics(username, metrics_by_symptom)
+    rows, counts = repo.sync_metrics(username, metrics_by_symptom)
+
+    assert counts == MetricsWriteCounts(unchanged=2)
+    assert len(rows) == 2
+
+
+def test_committed_writes_invalidate_cached_listings(db_session, authenticated_user, symptom_ids, monkeypatch):
+    username = authenticated_user["username"]
+    cache = AssociationCache(InMemoryCacheBackend())
+    monkeypatch.setattr(association_cache_module, "association_cache", cache)
+    repo = MetricsRepository(db_session)
+    cache.get_or_load(username, None, lambda: b"before")
+
+    repo.sync_metrics(username, {symptom_ids[0]: {"dairy": _metrics(2)}})
+    assert cache.get_or_load(username, None, lambda: b"uncommitted") == b"before"
+    db_session.commit()
+    assert cache.get_or_load(username, None, lambda: b"after") == b"after"
+
+    # identical results write nothing, so the listing stays cached
+    repo.sync_metrics(username, {symptom_ids[0]: {"dairy": _metrics(2)}})
+    db_session.commit()
+    assert cache.get_or_load(username, None, lambda: b"miss") == b"after"
+
+
+def test_rolled_back_writes_keep_cached_listings(db_session, authenticated_user, symptom_ids, monkeypatch):
+    username = authenticated_user["username"]
+    cache = AssociationCache(InMemoryCacheBackend())
+    monkeypatch.setattr(association_cache_module, "association_cache", cache)
+    cache.get_or_load(username, None, lambda: b"before")
+
+    # a session joined through a savepoint, so its rollback stays inside the test transaction
+    with Session(bind=db_session.connection(), join_transaction_mode="create_savepoint") as session:
+        MetricsRepository(session).bulk_upsert_metrics(username, {symptom_ids[0]: {"dairy": _metrics(2)}})
+        session.rollback()
+        session.commit()
+
+    assert cache.get_or_load(username, None, lambda: b"miss") == b"before"
+
+
+@pytest.fixture
+def many_metrics(db_session, authenticated_user, symptom_ids):
+    """30 cells with repeated exposures and p-values, so paging has to break ties by id."""
+    username = authenticated_user["username"]
+    metrics_by_symptom = {
+        symptom_id: {
+            f"ingredient-{i}": IngredientSymptomMetrics(
+                exposures=i % 4,
+                trigger_rate=0.5,
+                base_rate=0.25,
+                fishers_p_value=(i % 5) / 5,
+                average_intensity=6.0,
+            )
+            for i in range(15)
+        }
+        for symptom_id in symptom_ids
+    }
+    MetricsRepository(db_session).bulk_upsert_metrics(username, metrics_by_symptom)
+    return username
+
+
+def _walk(repo, username, sort, page_size, **filters) -> list:
+    rows, after = [], None
+    while True:
+        page = repo.list_by_user(username, sort=sort, limit=page_size, after=after, **filters)
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        last = page[-1]
+        after = (last.exposures if sort == "exposures" else last.fishers_p_value, last.id)
+
+
+@pytest.mark.parametrize("page_size", [1, 4, 7, 30])
+def test_keyset_pages_cover_every_row_in_order(db_session, many_metrics, page_size):
+    repo = MetricsRepository(db_session)
+    everything = repo.list_by_user(many_metrics)
+
+    by_exposures = _walk(repo, many_metrics, "exposures", page_size)
+    by_p_value = _walk(repo, many_metrics, "p_value", page_size)
+
+    assert len(everything) == 30
+    assert [row.id for row in by_exposures] == [row.id for row in everything]
+    assert [(row.exposures, row.id) for row in by_exposures] == sorted(
+        ((row.exposures, row.id) for row in everything), reverse=True
+    )
+    assert [(row.fishers_p_value, row.id) for row in by_p_value] == sorted(
+        (row.fishers_p_value, row.id) for row in everything
+    )
+
+
+def test_filters_and_symptom_scope_are_applied_in_sql(db_session, many_metrics, symptom_ids):
+    rows = MetricsRepository(db_session).list_by_user(
+        many_metrics, symptom_ids=symptom_ids[:1], min_exposures=2, max_p_value=0.4
+    )
+
+    assert rows
+    assert all(row.symptom_id == symptom_ids[0] for row in rows)
+    assert all(row.exposures >= 2 and row.fishers_p_value <= 0.4 for row in rows)
+    assert len(rows) == sum(1 for i in range(15) if i % 4 >= 2 and (i % 5) / 5 <= 0.4)
+
+
+def test_top_k_by_p_value(db_session, many_metrics):
+    rows = MetricsRepository(db_session).list_by_user(many_metrics, sort="p_value", limit=3)
+    assert [row.fishers_p_value for row in rows] == [0.0] * 3
+
+
+def test_service_pages_through_cursors(db_session, many_metrics, monkeypatch):
+    cache = AssociationCache(InMemoryCacheBackend())
+    monkeypatch.setattr(association_cache_module, "association_cache", cache)
+    monkeypatch.setattr("services.algorithm_service.association_cache", cache)
+    service = AlgorithmService()
+
+    ingredients, cursor = [], None
+    for _ in range(10):
+        body, cursor = service.get_associations_json(
+            db_session, many_metrics, query=AssociationListQuery(sort="p_value", limit=8, cursor=cursor)
+        )
+        ingredients.extend((item["symptom_id"], item["ingredient_name"]) for item in json.loads(body))
+        if cursor is None:
+            break
+
+    assert len(ingredients) == len(set(ingredients)) == 30
+    # a repeated request is a cache hit and returns the same page and cursor
+    first = service.get_associations_json(db_session, many_metrics, query=AssociationListQuery(limit=8))
+    assert service.get_associations_json(db_session, many_metrics, query=AssociationListQuery(limit=8)) == first
+    assert (cache.hits, cache.misses) == (1, 5)
+
+
+def test_route_pages_with_query_parameters(db_session, many_metrics, monkeypatch):
+    monkeypatch.setattr("services.algorithm_service.association_cache", AssociationCache(enabled=False))
+    app = FastAPI()
+    app.include_router(algorithm_router.router)
+    app.dependency_overrides[get_read_db] = lambda: db_session
+    client = TestClient(app)
+
+    first = client.get(f"/algorithm/user/{many_metrics}", params={"sort": "p_value", "limit": 8})
+    second = client.get(
+        f"/algorithm/user/{many_metrics}",
+        params={"sort": "p_value", "limit": 8, "cursor": first.headers[algorithm_router.NEXT_CURSOR_HEADER]},
+    )
+    everything = client.get(f"/algorithm/user/{many_metrics}")
+
+    assert first.status_code == second.status_code == 200
+    assert len(first.json()) == len(second.json()) == 8
+    assert {row["id"] for row in first.json()}.isdisjoint(row["id"] for row in second.json())
+    assert len(everything.json()) == 30
+    assert client.get(f"/algorithm/user/{many_metrics}", params={"limit": 0}).status_code == 422
+    assert client.get(f"/algorithm/user/{many_metrics}", params={"cursor": "junk"}).status_code == 400
+    assert client.get(f"/algorithm/user/{many_metrics}", params={"limit": 8, "time_window_hours": 4}).status_code == 400
@@ -0,0 +1,64 @@
+"""Integration tests for per-request database query counts from instrumented engines."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import ProgrammingError
+
+from middleware import metrics_middleware
+from middleware.metrics_middleware import MetricsMiddleware, instrument_engine
+from services.executors import WorkerPool
+
+
+@pytest.fixture
+def instrumented_engine(db_engine):
+    engine = create_engine(db_engine.url)
+    instrument_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_queries_are_charged_to_the_request_that_ran_them(instrumented_engine):
+    pool = WorkerPool("metrics-test", workers=1, queue_depth=0)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    def run_queries(count: int) -> None:
+        with instrumented_engine.connect() as conn:
+            for _ in range(count):
+                conn.execute(text("SELECT 1"))
+
+    @app.get("/metrics-test/queries")
+    def sync_route():
+        run_queries(3)
+
+    @app.get("/metrics-test/pooled-queries")
+    async def pooled_route():
+        await pool.run(run_queries, 2)
+
+    route_queries = metrics_middleware.request_db_queries
+    sync_before = route_queries.sum("GET", "/metrics-test/queries")
+    pooled_before = route_queries.sum("GET", "/metrics-test/pooled-queries")
+    total_before = metrics_middleware.db_queries_total.value()
+    try:
+        with TestClient(app) as client:
+            client.get("/metrics-test/queries")
+            client.get("/metrics-test/pooled-queries")
+        run_queries(1)  # outside any request
+    finally:
+        pool.shutdown()
+
+    assert route_queries.sum("GET", "/metrics-test/queries") == sync_before + 3
+    assert route_queries.sum("GET", "/metrics-test/pooled-queries") == pooled_before + 2
+    assert metrics_middleware.db_queries_total.value() == total_before + 6
+
+
+def test_failed_queries_do_not_skew_the_next_timing(instrumented_engine):
+    with instrumented_engine.connect() as conn:
+        with pytest.raises(ProgrammingError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        conn.rollback()
+        conn.execute(text("SELECT 1"))
+
+        assert conn.info["query_started"] == []
@@ -1,17 +1,23 @@
 """Unit tests for AlgorithmService."""
 
+import base64
 from datetime import datetime, timezone
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 from uuid import uuid4
 
 import pytest
+from pydantic import ValidationError
 
+from analysis.models import FoodLogEntry, SymptomLogEntry
 from models.food import Food
 from models.food_log import FoodLog
 from models.metrics import Metrics
 from models.symptom_log import SymptomLog
+from repositories.metrics_repository import MetricsWriteCounts
 from schemas.algorithm import AlgorithmAssociationResponse, AlgorithmRunRequest
-from services.algorithm_service import AlgorithmService
+from services.algorithm_service import AlgorithmService, _decode_cursor, _encode_cursor
+from services.incremental_metrics_service import IncrementalMetricsService
 
 
 def _dt(value: str) -> datetime:
@@ -43,6 +49,14 @@ def _symptom_log(username="alice", symptom_id=None, intensity=5, timestamp="2024
     return log
 
 
+def _food_entry(timestamp="2024-01-01T08:00:00", ingredients=None) -> FoodLogEntry:
+    return FoodLogEntry(timestamp=_dt(timestamp), ingredients=ingredients or [])
+
+
+def _symptom_entry(symptom_id=None, intensity=5, timestamp="2024-01-01T10:00:00") -> SymptomLogEntry:
+    return SymptomLogEntry(timestamp=_dt(timestamp), symptom_name=str(symptom_id or uuid4()), intensity=intensity)
+
+
 def _metrics_row(username="alice", symptom_id=None, ingredient="gluten", **overrides) -> Metrics:
     row = Metrics()
     row.id = uuid4()
@@ -66,13 +80,13 @@ def _metrics_row(username="alice", symptom_id=None, ingredient="gluten", **overr
 class TestBuildMetricsBySymptom:
     def test_returns_empty_dict_when_no_food_logs(self):
         service = AlgorithmService()
-        result = service._build_metrics_by_symptom(food_logs=[], symptom_logs=[_symptom_log()], time_window_hours=4.0)
+        result = service._build_metrics_by_symptom(food_logs=[], symptom_logs=[_symptom_entry()], time_window_hours=4.0)
         assert result == {}
 
     def test_returns_empty_dict_when_no_symptom_logs(self):
         service = AlgorithmService()
         result = service._build_metrics_by_symptom(
-            food_logs=[_food_log(ingredients=["gluten"])], symptom_logs=[], time_window_hours=4.0
+            food_logs=[_food_entry(ingredients=["gluten"])], symptom_logs=[], time_window_hours=4.0
         )
         assert result == {}
 
@@ -84,8 +98,8 @@ class TestBuildMetricsBySymptom:
         service = AlgorithmService()
         with pytest.raises(ValueError, match="time_window_hours must be >= 0"):
             service._build_metrics_by_symptom(
-                food_logs=[_food_log(ingredients=["gluten"])],
-                symptom_logs=[_symptom_log()],
+                food_logs=[_food_entry(ingredients=["gluten"])],
+                symptom_logs=[_symptom_entry()],
                 time_window_hours=-1.0,
             )
 
@@ -98,8 +112,8 @@ class TestBuildMetricsBySymptom:
         """Actual ingredient names (not food UUIDs) are used as keys in the result."""
         symptom_id = uuid4()
         result = AlgorithmService()._build_metrics_by_symptom(
-            food_logs=[_food_log(timestamp="2024-01-01T08:00:00", ingredients=["gluten", "dairy"])],
-            symptom_logs=[_symptom_log(symptom_id=symptom_id, timestamp="2024-01-01T10:00:00")],
+            food_logs=[_food_entry(timestamp="2024-01-01T08:00:00", ingredients=["gluten", "dairy"])],
+            symptom_logs=[_symptom_entry(symptom_id=symptom_id, timestamp="2024-01-01T10:00:00")],
             time_window_hours=4.0,
         )
         assert str(symptom_id) in result
@@ -109,8 +123,8 @@ class TestBuildMetricsBySymptom:
     def test_symptom_id_becomes_outer_key(self):
         symptom_id = uuid4()
         result = AlgorithmService()._build_metrics_by_symptom(
-            food_logs=[_food_log(timestamp="2024-01-01T08:00:00", ingredients=["gluten"])],
-            symptom_logs=[_symptom_log(symptom_id=symptom_id, timestamp="2024-01-01T10:00:00")],
+            food_logs=[_food_entry(timestamp="2024-01-01T08:00:00", ingredients=["gluten"])],
+            symptom_logs=[_symptom_entry(symptom_id=symptom_id, timestamp="2024-01-01T10:00:00")],
             time_window_hours=4.0,
         )
         assert str(symptom_id) in result
@@ -119,8 +133,8 @@ class TestBuildMetricsBySymptom:
         service = AlgorithmService()
         symptom_id = uuid4()
         result = service._build_metrics_by_symptom(
-            food_logs=[_food_log(timestamp="2024-01-01T01:00:00", ingredients=["gluten"])],
-            symptom_logs=[_symptom_log(symptom_id=symptom_id, timestamp="2024-01-01T10:00:00")],
+            food_logs=[_food_entry(timestamp="2024-01-01T01:00:00", ingredients=["gluten"])],
+            symptom_logs=[_symptom_entry(symptom_id=symptom_id, timestamp="2024-01-01T10:00:00")],
             time_window_hours=2.0,
         )
         assert result == {}
@@ -128,8 +142,8 @@ class TestBuildMetricsBySymptom:
     def test_metrics_shape_for_ingredient_in_window(self):
         symptom_id = uuid4()
         result = AlgorithmService()._build_metrics_by_symptom(
-            food_logs=[_food_log(timestamp="2024-01-01T08:00:00", ingredients=["gluten"])],
-            symptom_logs=[_symptom_log(symptom_id=symptom_id, intensity=7, timestamp="2024-01-01T10:00:00")],
+            food_logs=[_food_entry(timestamp="2024-01-01T08:00:00", ingredients=["gluten"])],
+            symptom_logs=[_symptom_entry(symptom_id=symptom_id, intensity=7, timestamp="2024-01-01T10:00:00")],
             time_window_hours=4.0,
         )
         m = result[str(symptom_id)]["gluten"]
@@ -143,10 +157,10 @@ class TestBuildMetricsBySymptom:
         symptom_a = uuid4()
         symptom_b = uuid4()
         result = AlgorithmService()._build_metrics_by_symptom(
-            food_logs=[_food_log(timestamp="2024-01-01T08:00:00", ingredients=["gluten"])],
+            food_logs=[_food_entry(timestamp="2024-01-01T08:00:00", ingredients=["gluten"])],
             symptom_logs=[
-                _symptom_log(symptom_id=symptom_a, timestamp="2024-01-01T10:00:00"),
-                _symptom_log(symptom_id=symptom_b, timestamp="2024-01-01T11:00:00"),
+                _symptom_entry(symptom_id=symptom_a, timestamp="2024-01-01T10:00:00"),
+                _symptom_entry(symptom_id=symptom_b, timestamp="2024-01-01T11:00:00"),
             ],
             time_window_hours=4.0,
         )
@@ -157,8 +171,8 @@ class TestBuildMetricsBySymptom:
         """Food logs with empty ingredients produce no associations."""
         symptom_id = uuid4()
         result = AlgorithmService()._build_metrics_by_symptom(
-            food_logs=[_food_log(timestamp="2024-01-01T08:00:00", ingredients=[])],
-            symptom_logs=[_symptom_log(symptom_id=symptom_id, timestamp="2024-01-01T10:00:00")],
+            food_logs=[_food_entry(timestamp="2024-01-01T08:00:00", ingredients=[])],
+            symptom_logs=[_symptom_entry(symptom_id=symptom_id, timestamp="2024-01-01T10:00:00")],
             time_window_hours=4.0,
         )
         assert result == {}
@@ -168,10 +182,10 @@ class TestBuildMetricsBySymptom:
         symptom_id = uuid4()
         result = AlgorithmService()._build_metrics_by_symptom(
             food_logs=[
-                _food_log(timestamp="2024-01-01T08:00:00", ingredients=["gluten", "salt"]),
-                _food_log(timestamp="2024-01-01T09:00:00", ingredients=["dairy", "salt"]),
+                _food_entry(timestamp="2024-01-01T08:00:00", ingredients=["gluten", "salt"]),
+                _food_entry(timestamp="2024-01-01T09:00:00", ingredients=["dairy", "salt"]),
             ],
-            symptom_logs=[_symptom_log(symptom_id=symptom_id, timestamp="2024-01-01T11:00:00")],
+            symptom_logs=[_symptom_entry(symptom_id=symptom_id, timestamp="2024-01-01T11:00:00")],
             time_window_hours=4.0,
         )
         symptom_metrics = result[str(symptom_id)]
@@ -181,6 +195,31 @@ class TestBuildMetricsBySymptom:
         # salt appeared in 2 food events
         assert symptom_metrics["salt"].exposures == 2
 
+    def test_numpy_engine_matches_python_engine(self):
+        symptom_id = uuid4()
+        kwargs = dict(
+            food_logs=[
+                _food_entry(timestamp="2024-01-01T08:00:00", ingredients=["gluten", "salt"]),
+                _food_entry(timestamp="2024-01-01T09:00:00", ingredients=["dairy", "salt"]),
+                _food_entry(timestamp="2024-01-02T09:00:00", ingredients=["rice"]),
+            ],
+            symptom_logs=[_symptom_entry(symptom_id=symptom_id, timestamp="2024-01-01T11:00:00")],
+            time_window_hours=4.0,
+        )
+        service = AlgorithmService()
+        assert service._build_metrics_by_symptom(**kwargs, engine="numpy") == service._build_metrics_by_symptom(
+            **kwargs, engine="python"
+        )
+
+    def test_raises_for_unknown_engine(self):
+        with pytest.raises(ValueError, match="Unknown analysis engine"):
+            AlgorithmService()._build_metrics_by_symptom(
+                food_logs=[_food_entry(ingredients=["gluten"])],
+                symptom_logs=[_symptom_entry()],
+                time_window_hours=4.0,
+                engine="fortran",
+            )
+
 
 # ---------------------------------------------------------------------------
 # _serialize_metrics_rows
@@ -268,6 +307,42 @@ class TestGetAssociations:
         assert isinstance(result[0], AlgorithmAssociationResponse)
         assert result[0].ingredient_name == "gluten"
 
+    def test_time_window_reads_from_statistics_not_metrics(self):
+        symptom_id = uuid4()
+        row = SimpleNamespace(
+            id=uuid4(),
+            symptom_id=symptom_id,
+            ingredient="gluten",
+            exposures=2,
+            ingredient_total=4,
+            foods_in_window=3,
+            intensity_sum=12,
+            intensity_count=2,
+            updated_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        )
+        with (
+            patch("services.algorithm_service.MetricsStatsRepository") as MockStats,
+            patch("services.algorithm_service.MetricsRepository") as MockRepo,
+        ):
+            MockStats.return_value.get_tracked_windows.return_value = {8.0: {symptom_id}}
+            MockStats.return_value.get_cell_counts.return_value = [row]
+            MockStats.return_value.get_food_event_total.return_value = 10
+            result = AlgorithmService().get_associations(MagicMock(), "alice", None, time_window_hours=8.0)
+
+        MockRepo.assert_not_called()
+        MockStats.return_value.get_cell_counts.assert_called_once_with("alice", 8.0, {symptom_id})
+        assert result[0].id == row.id
+        assert result[0].key_metrics.exposures == 2
+        assert result[0].key_metrics.trigger_rate == pytest.approx(0.5)
+        assert result[0].key_metrics.base_rate == pytest.approx(1 / 6, abs=1e-4)
+        assert result[0].key_metrics.average_intensity == pytest.approx(6.0)
+
+    def test_untracked_time_window_raises(self):
+        with patch("services.algorithm_service.MetricsStatsRepository") as MockStats:
+            MockStats.return_value.get_tracked_windows.return_value = {4.0: {uuid4()}}
+            with pytest.raises(ValueError, match="No statistics"):
+                AlgorithmService().get_associations(MagicMock(), "alice", [uuid4()], time_window_hours=4.0)
+
 
 # ---------------------------------------------------------------------------
 # run_algorithm
@@ -280,10 +355,10 @@ class TestRunAlgorithm:
         service = AlgorithmService()
         with (
             patch.object(service, "_get_food_logs_for_user", return_value=[]),
-            patch.object(service, "_get_symptom_logs_for_user", return_value=[_symptom_log()]),
+            patch.object(service, "_get_symptom_logs_for_user", return_value=[_symptom_entry()]),
             patch("services.algorithm_service.MetricsRepository") as MockRepo,
         ):
-            MockRepo.return_value.get_by_symptom.return_value = []
+            MockRepo.return_value.sync_metrics.return_value = ([], MetricsWriteCounts())
             result = service.run_algorithm(db=MagicMock(), payload=payload)
         assert result == []
 
@@ -291,63 +366,96 @@ class TestRunAlgorithm:
         payload = AlgorithmRunRequest(user_id="alice", symptom_ids=[uuid4()])
         service = AlgorithmService()
         with (
-            patch.object(service, "_get_food_logs_for_user", return_value=[_food_log(ingredients=["gluten"])]),
+            patch.object(service, "_get_food_logs_for_user", return_value=[_food_entry(ingredients=["gluten"])]),
             patch.object(service, "_get_symptom_logs_for_user", return_value=[]),
             patch("services.algorithm_service.MetricsRepository") as MockRepo,
         ):
-            MockRepo.return_value.get_by_symptom.return_value = []
+            MockRepo.return_value.sync_metrics.return_value = ([], MetricsWriteCounts())
             result = service.run_algorithm(db=MagicMock(), payload=payload)
         assert result == []
 
     def test_upsert_not_called_when_no_metrics_produced(self):
-        payload = AlgorithmRunRequest(user_id="alice", symptom_ids=[uuid4()])
+        payload = AlgorithmRunRequest(user_id="alice", symptom_ids=[uuid4()], write_mode="upsert")
         service = AlgorithmService()
         with (
             patch.object(service, "_get_food_logs_for_user", return_value=[]),
             patch.object(service, "_get_symptom_logs_for_user", return_value=[]),
             patch("services.algorithm_service.MetricsRepository") as MockRepo,
         ):
-            MockRepo.return_value.get_by_user.return_value = []
+            MockRepo.return_value.bulk_upsert_metrics.return_value = []
             service.run_algorithm(db=MagicMock(), payload=payload)
-            MockRepo.return_value.upsert_metrics.assert_not_called()
+            MockRepo.return_value.bulk_upsert_metrics.assert_called_once_with("alice", {})
 
-    def test_upsert_called_once_per_symptom_with_associations(self):
+    def test_all_symptoms_upserted_in_one_call_and_committed_once(self):
         symptom_a, symptom_b = uuid4(), uuid4()
-        payload = AlgorithmRunRequest(user_id="alice", symptom_ids=[symptom_a, symptom_b])
-        service = AlgorithmService()
+        payload = AlgorithmRunRequest(user_id="alice", symptom_ids=[symptom_a, symptom_b], write_mode="upsert")
+        # The real seed, so a commit of its own would show up below.
+        service = AlgorithmService(incremental_metrics=IncrementalMetricsService(enabled=True))
         with (
+            patch("services.incremental_metrics_service.MetricsStatsRepository") as MockStats,
             patch.object(
                 service,
                 "_get_food_logs_for_user",
-                return_value=[_food_log(timestamp="2024-01-01T08:00:00", ingredients=["gluten"])],
+                return_value=[_food_entry(timestamp="2024-01-01T08:00:00", ingredients=["gluten"])],
             ),
             patch.object(
                 service,
                 "_get_symptom_logs_for_user",
                 return_value=[
-                    _symptom_log(symptom_id=symptom_a, timestamp="2024-01-01T10:00:00"),
-                    _symptom_log(symptom_id=symptom_b, timestamp="2024-01-01T11:00:00"),
+                    _symptom_entry(symptom_id=symptom_a, timestamp="2024-01-01T10:00:00"),
+                    _symptom_entry(symptom_id=symptom_b, timestamp="2024-01-01T11:00:00"),
                 ],
             ),
             patch("services.algorithm_service.MetricsRepository") as MockRepo,
         ):
-            MockRepo.return_value.get_by_symptom.return_value = []
-            service.run_algorithm(db=MagicMock(), payload=payload)
-        assert MockRepo.return_value.upsert_metrics.call_count == 2
+            MockRepo.return_value.bulk_upsert_metrics.return_value = []
+            db = MagicMock()
+            service.run_algorithm(db=db, payload=payload)
+        MockRepo.return_value.bulk_upsert_metrics.assert_called_once()
+        username, metrics_by_symptom = MockRepo.return_value.bulk_upsert_metrics.call_args.args
+        assert username == "alice"
+        assert set(metrics_by_symptom) == {symptom_a, symptom_b}
+        MockRepo.return_value.upsert_metrics.assert_not_called()
+        MockStats.return_value.replace_stats.assert_called_once()
+        db.commit.assert_called_once()
+
+    def test_returns_upserted_rows_in_listing_order_without_rereading(self):
+        symptom_a, symptom_b = uuid4(), uuid4()
+        payload = AlgorithmRunRequest(user_id="alice", symptom_ids=[symptom_a, symptom_b], write_mode="upsert")
+        service = AlgorithmService()
+        stored = [
+            _metrics_row(symptom_id=symptom_b, ingredient="dairy", exposures=9),
+            _metrics_row(symptom_id=symptom_a, ingredient="gluten", exposures=1),
+            _metrics_row(symptom_id=symptom_a, ingredient="soy", exposures=3),
+        ]
+        with (
+            patch.object(service, "_get_food_logs_for_user", return_value=[]),
+            patch.object(service, "_get_symptom_logs_for_user", return_value=[]),
+            patch.object(service, "get_associations") as mock_get,
+            patch("services.algorithm_service.MetricsRepository") as MockRepo,
+        ):
+            MockRepo.return_value.bulk_upsert_metrics.return_value = stored
+            result = service.run_algorithm(db=MagicMock(), payload=payload)
+        mock_get.assert_not_called()
+        assert [a.ingredient_name for a in result] == ["soy", "gluten", "dairy"]
 
-    def test_get_associations_called_with_payload_symptom_ids(self):
+    def test_diff_mode_scopes_pruning_to_requested_symptoms(self):
         symptom_id = uuid4()
-        payload = AlgorithmRunRequest(user_id="alice", symptom_ids=[symptom_id])
-        service = AlgorithmService()
+        counts = MetricsWriteCounts(inserted=1, updated=2, deleted=3, unchanged=4)
+        service = AlgorithmService(incremental_metrics=MagicMock())
         with (
             patch.object(service, "_get_food_logs_for_user", return_value=[]),
             patch.object(service, "_get_symptom_logs_for_user", return_value=[]),
-            patch.object(service, "get_associations", return_value=[]) as mock_get,
-            patch("services.algorithm_service.MetricsRepository"),
+            patch("services.algorithm_service.MetricsRepository") as MockRepo,
         ):
-            service.run_algorithm(db=MagicMock(), payload=payload)
-        assert mock_get.call_args.kwargs["user_id"] == "alice"
-        assert mock_get.call_args.kwargs["symptom_ids"] == [symptom_id]
+            MockRepo.return_value.sync_metrics.return_value = ([], counts)
+            service.run_algorithm(MagicMock(), AlgorithmRunRequest(user_id="alice", symptom_ids=[symptom_id]))
+            assert MockRepo.return_value.sync_metrics.call_args.args == ("alice", {}, [symptom_id])
+            assert service.last_write_counts is counts
+
+            service.run_algorithm(MagicMock(), AlgorithmRunRequest(user_id="alice"))
+            assert MockRepo.return_value.sync_metrics.call_args.args == ("alice", {}, None)
+        MockRepo.return_value.bulk_upsert_metrics.assert_not_called()
 
     def test_empty_symptom_ids_fetches_all_symptom_logs(self):
         payload = AlgorithmRunRequest(user_id="alice")
@@ -356,11 +464,66 @@ class TestRunAlgorithm:
             patch.object(service, "_get_food_logs_for_user", return_value=[]),
             patch.object(service, "_get_symptom_logs_for_user", return_value=[]) as mock_symp,
             patch.object(service, "get_associations", return_value=[]),
-            patch("services.algorithm_service.MetricsRepository"),
+            patch("services.algorithm_service.MetricsRepository") as MockRepo,
         ):
+            MockRepo.return_value.sync_metrics.return_value = ([], MetricsWriteCounts())
             service.run_algorithm(db=MagicMock(), payload=payload)
         assert mock_symp.call_args.args[2] == []
 
+    def test_multi_window_run_seeds_every_window_from_one_sweep(self):
+        symptom_id = uuid4()
+        payload = AlgorithmRunRequest(
+            user_id="alice", symptom_ids=[symptom_id], time_window_hours=4.0, time_windows_hours=[1.0, 8.0]
+        )
+        incremental = MagicMock(enabled=True)
+        service = AlgorithmService(incremental_metrics=incremental)
+        with (
+            patch.object(
+                service,
+                "_get_food_logs_for_user",
+                return_value=[
+                    _food_entry(timestamp="2024-01-01T03:00:00", ingredients=["gluten"]),
+                    _food_entry(timestamp="2024-01-01T07:00:00", ingredients=["dairy"]),
+                ],
+            ),
+            patch.object(
+                service,
+                "_get_symptom_logs_for_user",
+                return_value=[_symptom_entry(symptom_id=symptom_id, timestamp="2024-01-01T10:00:00")],
+            ),
+            patch.object(service, "get_associations", return_value=[]),
+            patch("services.algorithm_service.MetricsRepository") as MockRepo,
+        ):
+            MockRepo.return_value.sync_metrics.return_value = ([], MetricsWriteCounts())
+            service.run_algorithm(db=MagicMock(), payload=payload)
+
+        # The stored metrics reflect time_window_hours: only dairy (07:00) is within 4h of 10:00.
+        assert set(MockRepo.return_value.sync_metrics.call_args.args[1][symptom_id]) == {"dairy"}
+        stats_by_window = incremental.seed.call_args.kwargs["stats_by_window"]
+        assert list(stats_by_window) == [1.0, 4.0, 8.0]
+        assert stats_by_window[8.0].foods_in_window == {str(symptom_id): 2}
+
+    def test_multi_window_run_stores_statistics_without_incremental_updates(self):
+        payload = AlgorithmRunRequest(user_id="alice", time_windows_hours=[8.0])
+        incremental = MagicMock(enabled=False)
+        service = AlgorithmService(incremental_metrics=incremental)
+        with (
+            patch.object(service, "_get_food_logs_for_user", return_value=[]),
+            patch.object(service, "_get_symptom_logs_for_user", return_value=[]),
+            patch("services.algorithm_service.MetricsRepository") as MockRepo,
+        ):
+            MockRepo.return_value.sync_metrics.return_value = ([], MetricsWriteCounts())
+            service.run_algorithm(db=MagicMock(), payload=payload)
+
+        assert incremental.seed.call_args.kwargs["force"] is True
+        assert list(incremental.seed.call_args.kwargs["stats_by_window"]) == [4.0, 8.0]
+
+    @pytest.mark.parametrize("engine", ["numpy", "sparse", "sql", "stream"])
+    def test_multi_window_run_rejects_other_engines(self, engine):
+        with pytest.raises(ValidationError, match="cannot be combined"):
+            AlgorithmRunRequest(user_id="alice", time_windows_hours=[8.0], engine=engine)
+        assert AlgorithmRunRequest(user_id="alice", time_windows_hours=[8.0], engine="sweep").engine == "sweep"
+
 
 # ---------------------------------------------------------------------------
 # _get_food_logs_for_user / _get_symptom_logs_for_user
@@ -368,43 +531,69 @@ class TestRunAlgorithm:
 
 
 class TestGetLogsForUser:
-    def _mock_db(self, rows):
-        """Return a db mock whose execute().unique().scalars().all() yields rows."""
+    def test_food_rows_become_entries(self):
         db = MagicMock()
-        db.execute.return_value.unique.return_value.scalars.return_value.all.return_value = rows
-        # Also support non-unique path for symptom logs
-        db.execute.return_value.scalars.return_value.all.return_value = rows
-        return db
-
-    def test_get_food_logs_returns_db_results(self):
-        expected = [_food_log(ingredients=["gluten"]), _food_log(ingredients=["dairy"])]
-        db = self._mock_db(expected)
+        db.execute.return_value = [(_dt("2024-01-01T08:00:00"), ["gluten"]), (_dt("2024-01-01T09:00:00"), None)]
+
         result = AlgorithmService()._get_food_logs_for_user(db, "alice")
-        assert result == expected
+
+        assert result == [
+            FoodLogEntry(timestamp=_dt("2024-01-01T08:00:00"), ingredients=["gluten"]),
+            FoodLogEntry(timestamp=_dt("2024-01-01T09:00:00"), ingredients=[]),
+        ]
         db.execute.assert_called_once()
 
-    def test_get_food_logs_returns_empty_list(self):
-        db = self._mock_db([])
-        result = AlgorithmService()._get_food_logs_for_user(db, "alice")
-        assert result == []
+    def test_food_rows_are_streamed(self):
+        db = MagicMock()
+        db.execute.return_value = []
+        AlgorithmService()._get_food_logs_for_user(db, "alice")
+        assert db.execute.call_args.args[0].get_execution_options()["yield_per"] > 0
+
+    def test_symptom_rows_become_entries_named_by_symptom_id(self):
+        symptom_id = uuid4()
+        db = MagicMock()
+        db.execute.return_value = [(_dt("2024-01-01T10:00:00"), symptom_id, 7)]
 
-    def test_get_symptom_logs_without_filter_returns_db_results(self):
-        expected = [_symptom_log(), _symptom_log()]
-        db = self._mock_db(expected)
         result = AlgorithmService()._get_symptom_logs_for_user(db, "alice", symptom_ids=None)
-        assert result == expected
-        db.execute.assert_called_once()
 
-    def test_get_symptom_logs_with_symptom_ids_filter(self):
+        assert result == [
+            SymptomLogEntry(timestamp=_dt("2024-01-01T10:00:00"), symptom_name=str(symptom_id), intensity=7)
+        ]
+
+    def test_symptom_ids_filter_is_applied(self):
         symptom_id = uuid4()
-        expected = [_symptom_log(symptom_id=symptom_id)]
-        db = self._mock_db(expected)
-        result = AlgorithmService()._get_symptom_logs_for_user(db, "alice", symptom_ids=[symptom_id])
-        assert result == expected
-        db.execute.assert_called_once()
+        db = MagicMock()
+        db.execute.return_value = []
+        AlgorithmService()._get_symptom_logs_for_user(db, "alice", symptom_ids=[symptom_id])
+        assert "symptom_logs.symptom_id IN" in str(db.execute.call_args.args[0])
+
+    def test_empty_symptom_ids_skips_filter(self):
+        db = MagicMock()
+        db.execute.return_value = []
+        AlgorithmService()._get_symptom_logs_for_user(db, "alice", symptom_ids=[])
+        assert "symptom_logs.symptom_id IN" not in str(db.execute.call_args.args[0])
+
+
+# ---------------------------------------------------------------------------
+# keyset cursors
+# ---------------------------------------------------------------------------
+
 
-    def test_get_symptom_logs_with_empty_symptom_ids_skips_filter(self):
-        expected = [_symptom_log(), _symptom_log()]
-        db = self._mock_db(expected)
-        result = AlgorithmService()._get_symptom_logs_for_user(db, "alice", symptom_ids=[])
-        assert result == expected
+class TestCursors:
+    def test_round_trips_the_keyset_of_the_sort(self):
+        row = _metrics_row(exposures=7, fishers_p_value=0.0123)
+        assert _decode_cursor("exposures", _encode_cursor("exposures", row)) == (7, row.id)
+        assert _decode_cursor("p_value", _encode_cursor("p_value", row)) == (0.0123, row.id)
+
+    def test_rejects_a_cursor_from_another_sort(self):
+        cursor = _encode_cursor("exposures", _metrics_row())
+        with pytest.raises(ValueError, match="sort=p_value"):
+            _decode_cursor("p_value", cursor)
+
+    @pytest.mark.parametrize(
+        "cursor",
+        ["not base64!", "bm90IGpzb24", base64.urlsafe_b64encode(b'["exposures", 1]').decode()],
+    )
+    def test_rejects_malformed_cursors(self, cursor):
+        with pytest.raises(ValueError):
+            _decode_cursor("exposures", cursor)
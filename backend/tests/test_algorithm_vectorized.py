@@ -0,0 +1,205 @@
+"""Equivalence tests: the NumPy engine must reproduce get_analysis exactly."""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from scipy.stats import fisher_exact
+
+from analysis.algorithm import compute_metrics, get_analysis
+from analysis.engines import ANALYSIS_ENGINES, get_engine
+from analysis.fisher import FisherCache
+from analysis.models import FoodLogEntry
+from analysis.vectorized import get_analysis_vectorized, metrics_from_counts
+from tests.test_algorithm import food, symptom
+
+# ---------------------------------------------------------------------------
+# Scenarios mirrored from tests/test_algorithm.py
+# ---------------------------------------------------------------------------
+
+SCENARIOS = {
+    "trigger_and_base_rate": (
+        [
+            food("2024-01-01T08:00", ["gluten"]),
+            food("2024-01-02T08:00", ["gluten"]),
+            food("2024-01-03T08:00", ["gluten"]),
+            food("2024-01-04T08:00", ["rice"]),
+        ],
+        [
+            symptom("2024-01-01T10:00", "bloating", 7),
+            symptom("2024-01-02T10:00", "bloating", 5),
+            symptom("2024-01-04T10:00", "bloating", 3),
+        ],
+        4,
+    ),
+    "no_association": (
+        [food(f"2024-01-0{day}T08:00", ["wheat"]) for day in range(1, 5)],
+        [symptom("2024-01-01T10:00", "nausea", 3)],
+        4,
+    ),
+    "multiple_symptoms_independent": (
+        [food("2024-01-01T08:00", ["gluten"]), food("2024-01-02T08:00", ["dairy"])],
+        [symptom("2024-01-01T10:00", "bloating", 6), symptom("2024-01-02T10:00", "cramps", 4)],
+        4,
+    ),
+    "shared_ingredient_in_window": (
+        [
+            food("2024-01-01T08:00", ["wheat flour", "yeast", "salt"]),
+            food("2024-01-01T10:00", ["eggs", "butter", "salt"]),
+            food("2024-01-02T08:00", ["rice", "chicken"]),
+        ],
+        [symptom("2024-01-01T13:00", "bloating", 6)],
+        6,
+    ),
+    "overlapping_symptom_windows": (
+        [
+            food("2024-01-01T08:00", ["garlic"]),
+            food("2024-01-01T09:00", ["garlic"]),
+            food("2024-01-02T08:00", ["rice"]),
+        ],
+        [symptom("2024-01-01T10:00", "nausea", 5), symptom("2024-01-01T11:00", "nausea", 7)],
+        6,
+    ),
+    "food_with_no_ingredients": (
+        [
+            FoodLogEntry(timestamp=datetime.fromisoformat("2024-01-01T08:00"), ingredients=[]),
+            FoodLogEntry(timestamp=datetime.fromisoformat("2024-01-02T08:00"), ingredients=["gluten"]),
+        ],
+        [symptom("2024-01-01T12:00", "bloating", 5), symptom("2024-01-02T12:00", "bloating", 7)],
+        6,
+    ),
+    "only_empty_foods_in_window": (
+        [FoodLogEntry(timestamp=datetime.fromisoformat("2024-01-01T08:00"), ingredients=[])],
+        [symptom("2024-01-01T10:00", "bloating", 5)],
+        4,
+    ),
+    "window_boundary": (
+        [food("2024-01-01T05:59", ["soy", "rice"]), food("2024-01-01T06:00", ["gluten", "dairy"])],
+        [symptom("2024-01-01T12:00", "bloating", 5)],
+        6,
+    ),
+    "duplicate_ingredient_in_one_food": (
+        [food("2024-01-01T08:00", ["salt", "salt", "pepper"]), food("2024-01-02T08:00", ["salt"])],
+        [symptom("2024-01-01T09:00", "bloating", 4)],
+        2,
+    ),
+    "same_timestamp_dishes": (
+        [
+            food("2024-01-01T18:00", ["gluten", "water", "salt"]),
+            food("2024-01-01T18:00", ["tomato", "garlic", "olive oil", "salt"]),
+            food("2024-01-01T18:00", ["lettuce", "olive oil", "salt"]),
+            food("2024-01-02T12:00", ["rice", "chicken", "broccoli"]),
+            food("2024-01-03T18:00", ["gluten", "water", "salt"]),
+        ],
+        [symptom("2024-01-01T22:00", "bloating", 7), symptom("2024-01-03T22:00", "bloating", 6)],
+        6,
+    ),
+    "zero_window": (
+        [food("2024-01-01T08:00", ["gluten"])],
+        [symptom("2024-01-01T08:00", "bloating", 5)],
+        0,
+    ),
+}
+
+
+def _random_history(seed: int, days: int = 60) -> tuple[list, list]:
+    rng = random.Random(seed)
+    ingredients = [f"ingredient_{i}" for i in range(25)]
+    start = datetime(2024, 1, 1)
+
+    food_logs = []
+    for _ in range(days * 4):
+        ts = start + timedelta(minutes=rng.randrange(days * 24 * 60))
+        food_logs.append(FoodLogEntry(timestamp=ts, ingredients=rng.sample(ingredients, rng.randint(0, 5))))
+    food_logs.sort(key=lambda log: log.timestamp)
+
+    symptom_logs = [
+        symptom(
+            (start + timedelta(minutes=rng.randrange(days * 24 * 60))).isoformat(),
+            rng.choice(["bloating", "cramps", "headache"]),
+            rng.randint(1, 10),
+        )
+        for _ in range(days)
+    ]
+    symptom_logs.sort(key=lambda log: log.timestamp)
+    return food_logs, symptom_logs
+
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_matches_reference_on_fixture_scenarios(name):
+    food_logs, symptom_logs, window = SCENARIOS[name]
+    assert get_analysis_vectorized(food_logs, symptom_logs, window) == get_analysis(food_logs, symptom_logs, window)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("window", [0.5, 4, 24])
+def test_matches_reference_on_random_histories(seed, window):
+    food_logs, symptom_logs = _random_history(seed)
+    assert get_analysis_vectorized(food_logs, symptom_logs, window) == get_analysis(food_logs, symptom_logs, window)
+
+
+def test_empty_inputs_return_empty():
+    assert get_analysis_vectorized([], [symptom("2024-01-01T10:00", "pain", 3)], 4) == {}
+    assert get_analysis_vectorized([food("2024-01-01T08:00", ["gluten"])], [], 4) == {}
+
+
+def test_raises_for_negative_time_window():
+    with pytest.raises(ValueError, match="time_window_hours must be >= 0"):
+        get_analysis_vectorized([], [], -1)
+
+
+# ---------------------------------------------------------------------------
+# Batched Fisher p-values (SciPy only as the oracle)
+# ---------------------------------------------------------------------------
+
+
+def test_fisher_cache_matches_scipy_per_cell():
+    rng = random.Random(0)
+    tables = [[rng.randint(0, 30) for _ in range(4)] for _ in range(300)]
+    tables += [[0, 0, 3, 4], [3, 4, 0, 0], [0, 2, 0, 5], [1, 0, 4, 0], [0, 0, 0, 0]]
+    a, b, c, d = zip(*tables)
+    cache = FisherCache()
+
+    batched = cache.p_values(a, b, c, d)
+
+    for i, table in enumerate(tables):
+        expected = fisher_exact([table[:2], table[2:]], alternative="greater").pvalue
+        assert batched[i] == pytest.approx(expected, rel=1e-9, abs=1e-300)
+        assert cache.p_value(*table) == batched[i]
+
+
+def test_metrics_from_counts_matches_compute_metrics():
+    rng = random.Random(1)
+    cells = []
+    for _ in range(200):
+        total_food_events = rng.randint(1, 60)
+        ingredient_total = rng.randint(1, total_food_events)
+        a = rng.randint(0, ingredient_total)
+        total_in_window = rng.randint(a, a + total_food_events - ingredient_total)
+        intensity_count = rng.randint(0, 3 * a)
+        cells.append((a, ingredient_total, total_in_window, total_food_events, 7 * intensity_count, intensity_count))
+
+    batched = metrics_from_counts(*(list(column) for column in zip(*cells)))
+
+    assert batched == [compute_metrics(*cell) for cell in cells]
+
+
+def test_metrics_from_counts_rejects_inconsistent_counts():
+    # More foods in the window than the user has outside the ingredient: d would be -2.
+    with pytest.raises(ValueError, match="1 contingency table"):
+        metrics_from_counts([1, 1], [2, 2], [2, 5], [4, 4], [6, 6], [1, 1])
+
+
+# ---------------------------------------------------------------------------
+# Engine registry
+# ---------------------------------------------------------------------------
+
+
+def test_engine_registry_exposes_both_implementations():
+    assert ANALYSIS_ENGINES["python"] is get_analysis
+    assert get_engine("numpy") is get_analysis_vectorized
+
+
+def test_unknown_engine_raises():
+    with pytest.raises(ValueError, match="Unknown analysis engine"):
+        get_engine("fortran")
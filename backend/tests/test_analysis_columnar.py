@@ -0,0 +1,109 @@
+"""Unit tests for the interned, integer-coded log representation."""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from analysis.algorithm import get_analysis
+from analysis.columnar import FoodColumns, IngredientVocabulary, SymptomColumns, to_epoch_microseconds
+from analysis.models import FoodLogEntry
+from analysis.per_ingredient_counts import count_ingredient_occurrences
+from analysis.sweep import get_analysis_multi_window
+from analysis.vectorized import get_analysis_vectorized
+from tests.test_algorithm import food, symptom
+from tests.test_algorithm_vectorized import _random_history
+
+
+class TestIngredientVocabulary:
+    def test_interns_in_first_seen_order(self):
+        vocabulary = IngredientVocabulary(["salt", "gluten", "salt"])
+        assert vocabulary.names == ["salt", "gluten"]
+        assert vocabulary.intern("dairy") == 2
+        assert vocabulary.id_of("gluten") == 1
+        assert vocabulary.id_of("egg") is None
+        assert "salt" in vocabulary and len(vocabulary) == 3
+
+
+class TestFoodColumns:
+    def test_csr_layout_deduplicates_ingredients_per_food(self):
+        columns = FoodColumns.from_entries(
+            [
+                food("2024-01-01T08:00", ["gluten", "salt", "gluten"]),
+                food("2024-01-01T09:00", []),
+                food("2024-01-01T10:00", ["salt"]),
+            ]
+        )
+
+        assert columns.offsets.tolist() == [0, 2, 2, 3]
+        assert columns.ingredient_ids.tolist() == [0, 1, 1]
+        assert columns.food_index_of().tolist() == [0, 0, 2]
+        assert columns.ingredients_of(0) == ["gluten", "salt"]
+        assert columns.ingredient_totals().tolist() == [1, 2]
+
+    def test_shared_vocabulary_keeps_ids_stable(self):
+        vocabulary = IngredientVocabulary()
+        first = FoodColumns.from_entries([food("2024-01-01T08:00", ["rice", "egg"])], vocabulary)
+        second = FoodColumns.from_entries([food("2024-01-02T08:00", ["egg", "soy"])], vocabulary)
+
+        assert first.ingredient_ids.tolist() == [0, 1]
+        assert second.ingredient_ids.tolist() == [1, 2]
+
+    def test_of_passes_columns_through(self):
+        columns = FoodColumns.from_entries([food("2024-01-01T08:00", ["rice"])])
+        assert FoodColumns.of(columns) is columns
+
+    def test_counts_match_list_representation(self):
+        food_logs, _ = _random_history(3)
+        assert count_ingredient_occurrences(FoodColumns.from_entries(food_logs)) == count_ingredient_occurrences(
+            food_logs
+        )
+
+
+class TestSymptomColumns:
+    def test_groups_are_sorted_by_time_per_symptom(self):
+        columns = SymptomColumns.from_entries(
+            [
+                symptom("2024-01-01T12:00", "bloating", 3),
+                symptom("2024-01-01T09:00", "cramps", 5),
+                symptom("2024-01-01T10:00", "bloating", 7),
+            ]
+        )
+
+        groups = {name: (times, intensities.tolist()) for name, times, intensities in columns.groups()}
+
+        assert list(groups) == ["bloating", "cramps"]
+        assert groups["bloating"][1] == [7, 3]
+        assert np.all(np.diff(groups["bloating"][0]) > 0)
+
+
+class TestEpochMicroseconds:
+    def test_naive_and_aware_timestamps_keep_their_differences(self):
+        naive = [datetime(2024, 3, 10, 1, 30), datetime(2024, 3, 10, 3, 30)]
+        aware = [ts.replace(tzinfo=timezone(timedelta(hours=-5))) for ts in naive]
+
+        for timestamps in (naive, aware):
+            assert np.diff(to_epoch_microseconds(timestamps)).tolist() == [2 * 3600 * 10**6]
+
+    def test_aware_offsets_map_to_the_same_instant(self):
+        utc = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+        est = utc.astimezone(timezone(timedelta(hours=-5)))
+        assert to_epoch_microseconds([utc]).tolist() == to_epoch_microseconds([est]).tolist()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_engines_accept_columns(seed):
+    food_logs, symptom_logs = _random_history(seed)
+    foods, symptoms = FoodColumns.from_entries(food_logs), SymptomColumns.from_entries(symptom_logs)
+
+    assert get_analysis_vectorized(foods, symptoms, 4) == get_analysis(food_logs, symptom_logs, 4)
+    assert get_analysis_multi_window(foods, symptoms, [2, 8]) == {
+        2: get_analysis(food_logs, symptom_logs, 2),
+        8: get_analysis(food_logs, symptom_logs, 8),
+    }
+
+
+def test_empty_columns_return_empty():
+    empty_foods = FoodColumns.from_entries([])
+    assert get_analysis_vectorized(empty_foods, [symptom("2024-01-01T10:00", "pain", 3)], 4) == {}
+    assert get_analysis_vectorized([FoodLogEntry(datetime(2024, 1, 1), [])], SymptomColumns.from_entries([]), 4) == {}
@@ -0,0 +1,67 @@
+"""Accuracy tests for the log-factorial Fisher tails against SciPy."""
+
+import math
+import random
+
+import pytest
+from scipy.stats import fisher_exact
+
+from analysis.hypergeometric import LogFactorialTable, fisher_greater_p_values
+
+
+def _random_table(rng: random.Random, max_food_events: int) -> tuple[int, int, int, int]:
+    """A consistent (a, b, c, d) table as built by the analysis for one cell."""
+    total_food_events = rng.randint(1, max_food_events)
+    ingredient_total = rng.randint(0, total_food_events)
+    total_in_window = rng.randint(0, total_food_events)
+    a = rng.randint(
+        max(0, ingredient_total + total_in_window - total_food_events), min(ingredient_total, total_in_window)
+    )
+    b = ingredient_total - a
+    c = total_in_window - a
+    return a, b, c, total_food_events - ingredient_total - c
+
+
+# data_generator users log ~250-300 food events; the larger ranges cover long-lived tenants.
+@pytest.mark.parametrize("max_food_events", [10, 300, 3000])
+def test_matches_scipy_across_generator_ranges(max_food_events):
+    rng = random.Random(max_food_events)
+    tables = [_random_table(rng, max_food_events) for _ in range(500)]
+    # rare ingredients: a=0 or a=1 against a user-sized history
+    tables += [(0, 1, 40, 250), (1, 0, 40, 250), (1, 2, 60, 230), (0, 0, 30, 270), (5, 0, 0, 295)]
+
+    p_values = fisher_greater_p_values(*zip(*tables))
+
+    for table, p_value in zip(tables, p_values):
+        a, b, c, d = table
+        expected = fisher_exact([[a, b], [c, d]], alternative="greater").pvalue
+        assert p_value == pytest.approx(expected, rel=1e-9, abs=1e-300)
+        assert round(float(p_value), 6) == round(float(expected), 6)
+
+
+def test_degenerate_tables_have_p_value_one():
+    assert (
+        fisher_greater_p_values([0, 3, 0, 1, 0], [0, 4, 2, 0, 0], [3, 0, 0, 4, 0], [4, 0, 5, 0, 0]).tolist()
+        == [1.0] * 5
+    )
+
+
+def test_broadcasts_and_accepts_scalars():
+    assert fisher_greater_p_values(2, [1, 3], 1, 10).shape == (2,)
+    assert fisher_greater_p_values([], [], [], []).shape == (0,)
+
+
+def test_negative_cells_are_rejected():
+    with pytest.raises(ValueError, match="non-negative"):
+        fisher_greater_p_values([2, 1], [0, 1], [3, 1], [-1, 4])
+
+
+def test_log_factorial_table_grows_geometrically():
+    table = LogFactorialTable(initial_size=8)
+    assert len(table) == 9
+
+    values = table.up_to(12)
+
+    assert len(table) == 18
+    assert values[12] == pytest.approx(math.lgamma(13))
+    assert table.up_to(5) is values
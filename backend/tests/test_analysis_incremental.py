@@ -0,0 +1,150 @@
+"""Unit tests for incremental sufficient-statistics deltas."""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from analysis.incremental import (
+    ExposureCounts,
+    WindowStatsDelta,
+    food_event_delta,
+    symptom_event_delta,
+    window_stats_from_history,
+)
+from analysis.models import FoodLogEntry
+from tests.test_algorithm import food, symptom
+
+
+def _fold(total: WindowStatsDelta, delta: WindowStatsDelta) -> None:
+    for name, change in delta.foods_in_window.items():
+        total.foods_in_window[name] = total.foods_in_window.get(name, 0) + change
+    for key, counts in delta.exposures.items():
+        cell = total.exposures.setdefault(key, ExposureCounts())
+        cell.exposures += counts.exposures
+        cell.intensity_sum += counts.intensity_sum
+        cell.intensity_count += counts.intensity_count
+
+
+def _normalized(stats: WindowStatsDelta) -> tuple[dict, dict]:
+    """Drop zero entries so states reached by different paths compare equal."""
+    foods = {name: count for name, count in stats.foods_in_window.items() if count}
+    cells = {key: c for key, c in stats.exposures.items() if c != ExposureCounts()}
+    return foods, cells
+
+
+def _replay(events, window):
+    """Fold (kind, entry) events in order, computing each delta against the state so far."""
+    foods, symptoms = [], []
+    stats = WindowStatsDelta()
+    for kind, entry in events:
+        if kind == "food":
+            _fold(stats, food_event_delta(entry, symptoms, window))
+            foods.append(entry)
+        else:
+            _fold(stats, symptom_event_delta(entry, foods, symptoms, window))
+            symptoms.append(entry)
+    return foods, symptoms, stats
+
+
+def _random_events(seed: int) -> list:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    events = []
+    for _ in range(80):
+        ts = start + timedelta(minutes=rng.randrange(10 * 24 * 60))
+        events.append(("food", FoodLogEntry(timestamp=ts, ingredients=rng.sample(["a", "b", "c", "d"], 2))))
+    for _ in range(25):
+        ts = start + timedelta(minutes=rng.randrange(10 * 24 * 60))
+        events.append(("symptom", symptom(ts.isoformat(), rng.choice(["bloating", "cramps"]), rng.randint(1, 10))))
+    rng.shuffle(events)
+    return events
+
+
+class TestFoodEventDelta:
+    def test_food_covered_by_symptom_counts_once_per_symptom(self):
+        delta = food_event_delta(
+            food("2024-01-01T08:00", ["gluten", "salt"]),
+            [symptom("2024-01-01T10:00", "bloating", 4), symptom("2024-01-01T11:00", "bloating", 6)],
+            time_window_hours=4,
+        )
+        assert delta.foods_in_window == {"bloating": 1}
+        assert delta.exposures[("bloating", "gluten")] == ExposureCounts(1, 10, 2)
+
+    def test_symptom_outside_window_is_ignored(self):
+        delta = food_event_delta(
+            food("2024-01-01T08:00", ["gluten"]),
+            [symptom("2024-01-01T08:00", "bloating", 4), symptom("2024-01-01T12:01", "bloating", 6)],
+            time_window_hours=4,
+        )
+        assert delta == WindowStatsDelta()
+
+
+class TestSymptomEventDelta:
+    def test_new_symptom_covers_uncovered_food(self):
+        delta = symptom_event_delta(
+            symptom("2024-01-01T10:00", "nausea", 5),
+            [food("2024-01-01T08:00", ["garlic"])],
+            [],
+            time_window_hours=4,
+        )
+        assert delta.foods_in_window == {"nausea": 1}
+        assert delta.exposures[("nausea", "garlic")] == ExposureCounts(1, 5, 1)
+
+    def test_already_covered_food_only_gains_intensity(self):
+        delta = symptom_event_delta(
+            symptom("2024-01-01T11:00", "nausea", 7),
+            [food("2024-01-01T08:00", ["garlic"])],
+            [symptom("2024-01-01T10:00", "nausea", 5)],
+            time_window_hours=6,
+        )
+        assert delta.foods_in_window == {}
+        assert delta.exposures[("nausea", "garlic")] == ExposureCounts(0, 7, 1)
+
+    def test_other_symptom_types_do_not_count_as_coverage(self):
+        delta = symptom_event_delta(
+            symptom("2024-01-01T11:00", "nausea", 7),
+            [food("2024-01-01T08:00", ["garlic"])],
+            [symptom("2024-01-01T10:00", "bloating", 5)],
+            time_window_hours=6,
+        )
+        assert delta.foods_in_window == {"nausea": 1}
+
+
+class TestScaled:
+    def test_negation_cancels(self):
+        delta = food_event_delta(food("2024-01-01T08:00", ["gluten"]), [symptom("2024-01-01T10:00", "bloating", 4)], 4)
+        total = WindowStatsDelta()
+        _fold(total, delta)
+        _fold(total, delta.scaled(-1))
+        assert _normalized(total) == ({}, {})
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("window", [1, 6, 24])
+def test_replayed_deltas_match_full_history(seed, window):
+    foods, symptoms, stats = _replay(_random_events(seed), window)
+    foods.sort(key=lambda f: f.timestamp)
+    symptoms.sort(key=lambda s: s.timestamp)
+
+    assert _normalized(stats) == _normalized(window_stats_from_history(foods, symptoms, window))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_removing_events_matches_full_history(seed):
+    window = 6
+    events = _random_events(seed)
+    foods, symptoms, stats = _replay(events, window)
+
+    # Remove every third event, each delta taken against the state without it.
+    for kind, entry in events[::3]:
+        if kind == "food":
+            foods.remove(entry)
+            _fold(stats, food_event_delta(entry, symptoms, window).scaled(-1))
+        else:
+            symptoms.remove(entry)
+            _fold(stats, symptom_event_delta(entry, foods, symptoms, window).scaled(-1))
+
+    foods.sort(key=lambda f: f.timestamp)
+    symptoms.sort(key=lambda s: s.timestamp)
+    assert _normalized(stats) == _normalized(window_stats_from_history(foods, symptoms, window))
@@ -1,11 +1,13 @@
 """Unit tests for backend analysis binary-search helpers."""
 
-from datetime import datetime
+import random
+from bisect import bisect_left
+from datetime import datetime, timedelta
 
 import pytest
 
 from analysis.models import FoodLogEntry, SymptomLogEntry
-from analysis.search import get_food_logs_within_time_window_before_symptoms
+from analysis.search import get_food_logs_within_time_window_before_symptoms, iter_symptom_window_spans
 
 
 def food_at(name: str, iso_time: str) -> FoodLogEntry:
@@ -57,3 +59,41 @@ class TestBinarySearchWindow:
 
         with pytest.raises(ValueError, match="time_window_hours must be >= 0"):
             get_food_logs_within_time_window_before_symptoms(foods, symptoms, -1)
+
+
+class TestWindowSpans:
+    def _bisect_spans(self, foods, symptoms, hours):
+        timestamps = [f.timestamp for f in foods]
+        return [
+            (
+                bisect_left(timestamps, s.timestamp - timedelta(hours=hours)),
+                bisect_left(timestamps, s.timestamp),
+            )
+            for s in symptoms
+        ]
+
+    @pytest.mark.parametrize("seed", range(5))
+    @pytest.mark.parametrize("sort_symptoms", [True, False])
+    def test_spans_match_binary_search(self, seed, sort_symptoms):
+        rng = random.Random(seed)
+        start = datetime(2026, 3, 1)
+        foods = sorted(
+            (food_at("x", (start + timedelta(minutes=rng.randrange(5000))).isoformat()) for _ in range(120)),
+            key=lambda f: f.timestamp,
+        )
+        symptoms = [symptom_at("pain", (start + timedelta(minutes=rng.randrange(5000))).isoformat()) for _ in range(40)]
+        if sort_symptoms:
+            symptoms.sort(key=lambda s: s.timestamp)
+
+        spans = [(begin, end) for _, begin, end in iter_symptom_window_spans(foods, symptoms, 3)]
+
+        assert spans == self._bisect_spans(foods, symptoms, 3)
+
+    def test_spans_index_into_original_food_list(self):
+        foods = [food_at("toast", "2026-03-16T08:00:00+00:00"), food_at("eggs", "2026-03-16T10:30:00+00:00")]
+        symptoms = [symptom_at("headache", "2026-03-16T11:00:00+00:00")]
+
+        [(symptom, begin, end)] = iter_symptom_window_spans(foods, symptoms, 1)
+
+        assert symptom is symptoms[0]
+        assert foods[begin:end] == [foods[1]]
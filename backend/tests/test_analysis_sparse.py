@@ -0,0 +1,54 @@
+"""Equivalence tests: sparse-matrix counting must match the accumulator-based counts."""
+
+import pytest
+
+from analysis.algorithm import get_analysis, get_food_symptom_counts
+from analysis.engines import get_engine
+from analysis.sparse import get_analysis_sparse, get_food_symptom_counts_sparse
+from tests.test_algorithm import food, symptom
+from tests.test_algorithm_vectorized import SCENARIOS, _random_history
+
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_matches_reference_on_fixture_scenarios(name):
+    food_logs, symptom_logs, window = SCENARIOS[name]
+    assert get_analysis_sparse(food_logs, symptom_logs, window) == get_analysis(food_logs, symptom_logs, window)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("window", [0, 0.5, 4, 24])
+def test_counts_match_accumulators_on_random_histories(seed, window):
+    food_logs, symptom_logs = _random_history(seed)
+
+    assert get_food_symptom_counts_sparse(food_logs, symptom_logs, window) == get_food_symptom_counts(
+        food_logs, symptom_logs, window
+    )
+    assert get_analysis_sparse(food_logs, symptom_logs, window) == get_analysis(food_logs, symptom_logs, window)
+
+
+def test_overlapping_windows_count_food_once_but_sum_every_intensity():
+    counts, foods_in_windows = get_food_symptom_counts_sparse(
+        [food("2024-01-01T08:00", ["garlic"])],
+        [symptom("2024-01-01T09:00", "nausea", 3), symptom("2024-01-01T10:00", "nausea", 5)],
+        time_window_hours=4,
+    )
+
+    assert foods_in_windows == {"nausea": 1}
+    assert counts == {"nausea": {"garlic": [1, 8, 2]}}
+
+
+def test_covered_foods_without_ingredients_still_count_in_window():
+    counts, foods_in_windows = get_food_symptom_counts_sparse(
+        [food("2024-01-01T08:00", [])], [symptom("2024-01-01T09:00", "nausea", 3)], 4
+    )
+    assert (counts, foods_in_windows) == ({}, {"nausea": 1})
+
+
+def test_empty_inputs_and_negative_window():
+    assert get_analysis_sparse([], [symptom("2024-01-01T10:00", "pain", 3)], 4) == {}
+    with pytest.raises(ValueError, match="time_window_hours must be >= 0"):
+        get_food_symptom_counts_sparse([], [], -1)
+
+
+def test_registered_as_engine():
+    assert get_engine("sparse") is get_analysis_sparse
@@ -0,0 +1,117 @@
+"""Equivalence tests: the single-pass streaming accumulator must match the in-memory engines."""
+
+import weakref
+from datetime import datetime, timedelta
+
+import pytest
+
+from analysis.algorithm import get_analysis
+from analysis.engines import get_engine
+from analysis.incremental import ExposureCounts
+from analysis.models import FoodLogEntry, SymptomLogEntry
+from analysis.per_ingredient_counts import count_ingredient_occurrences
+from analysis.streaming import get_analysis_stream, window_stats_stream
+from analysis.sweep import window_stats_sweep
+from tests.test_algorithm import food, symptom
+from tests.test_algorithm_vectorized import SCENARIOS, _random_history
+
+WINDOWS = [0, 0.5, 2, 4, 24]
+
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_stream_engine_matches_reference_on_fixture_scenarios(name):
+    food_logs, symptom_logs, window = SCENARIOS[name]
+    assert get_analysis_stream(food_logs, symptom_logs, window) == get_analysis(food_logs, symptom_logs, window)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_stream_engine_matches_reference_on_random_histories(seed):
+    food_logs, symptom_logs = _random_history(seed)
+    for window in WINDOWS:
+        assert get_engine("stream")(food_logs, symptom_logs, window) == get_analysis(food_logs, symptom_logs, window)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_window_stats_match_the_sweep(seed):
+    food_logs, symptom_logs = _random_history(seed)
+    food_logs.sort(key=lambda log: log.timestamp)
+    symptom_logs.sort(key=lambda log: log.timestamp)
+    swept = window_stats_sweep(food_logs, symptom_logs, WINDOWS)
+
+    for window in WINDOWS:
+        # one-shot generators, as produced by a server-side cursor
+        streamed = window_stats_stream(iter(food_logs), iter(symptom_logs), window)
+
+        assert streamed.stats == swept[window]
+        assert (streamed.ingredient_totals, streamed.total_food_events) == count_ingredient_occurrences(food_logs)
+        assert streamed.symptom_names == {log.symptom_name for log in symptom_logs}
+
+
+def test_window_boundaries_are_half_open():
+    # Window for the 10:00 symptom at 2h is [08:00, 10:00): 08:00 is in, 10:00 is not.
+    food_logs = [food("2024-01-01T08:00", ["edge"]), food("2024-01-01T10:00", ["same_time"])]
+    symptom_logs = [symptom("2024-01-01T10:00", "bloating", 4)]
+
+    assert window_stats_stream(food_logs, symptom_logs, 1.99).stats.foods_in_window == {}
+    streamed = window_stats_stream(food_logs, symptom_logs, 2)
+    assert streamed.stats.foods_in_window == {"bloating": 1}
+    assert ("bloating", "same_time") not in streamed.stats.exposures
+
+
+def test_food_counts_once_per_symptom_type():
+    food_logs = [food("2024-01-01T08:00", ["dairy"])]
+    symptom_logs = [symptom("2024-01-01T09:00", "pain", 3), symptom("2024-01-01T09:30", "pain", 5)]
+
+    streamed = window_stats_stream(food_logs, symptom_logs, 4)
+
+    assert streamed.stats.foods_in_window == {"pain": 1}
+    assert streamed.stats.exposures[("pain", "dairy")] == ExposureCounts(
+        exposures=1, intensity_sum=8, intensity_count=2
+    )
+
+
+def test_unsorted_streams_are_rejected():
+    food_logs = [food("2024-01-01T10:00", ["a"]), food("2024-01-01T08:00", ["b"])]
+    with pytest.raises(ValueError, match="food_logs"):
+        window_stats_stream(iter(food_logs), [], 4)
+
+
+def test_engine_sorts_in_memory_lists():
+    food_logs = [food("2024-01-01T10:00", ["a"]), food("2024-01-01T08:00", ["b"])]
+    symptom_logs = [symptom("2024-01-01T11:00", "pain", 2)]
+    assert get_analysis_stream(food_logs, symptom_logs, 4) == get_analysis(food_logs, symptom_logs, 4)
+
+
+def test_negative_window_is_rejected():
+    with pytest.raises(ValueError):
+        window_stats_stream([], [], -1)
+
+
+class _Ingredients(list):
+    """A list that can be weakly referenced, to see which foods the accumulator still holds."""
+
+    __hash__ = object.__hash__
+
+
+def test_foods_before_the_first_symptom_are_not_held():
+    held = weakref.WeakSet()
+    most_held = 0
+
+    start = datetime(2024, 1, 1)
+
+    def foods():
+        nonlocal most_held
+        for hour in range(5000):
+            ingredients = _Ingredients(["rice"])
+            held.add(ingredients)
+            yield FoodLogEntry(timestamp=start + timedelta(hours=hour), ingredients=ingredients)
+            most_held = max(most_held, len(held))
+
+    symptom_logs = [SymptomLogEntry(start + timedelta(hours=4000), "bloating", 4)]
+    streamed = window_stats_stream(foods(), iter(symptom_logs), 2)
+
+    # Hourly foods and a 2h window: the three foods of one window are pending, plus the
+    # one merge reads ahead and the one the generator is yielding.
+    assert most_held <= 5
+    assert streamed.total_food_events == 5000
+    assert streamed.stats.foods_in_window == {"bloating": 2}
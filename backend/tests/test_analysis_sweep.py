@@ -0,0 +1,71 @@
+"""Equivalence tests: one multi-window sweep must match a separate run per window."""
+
+import pytest
+
+from analysis.algorithm import get_analysis
+from analysis.engines import get_engine
+from analysis.incremental import window_stats_from_history
+from analysis.sweep import get_analysis_multi_window, get_analysis_sweep, window_stats_sweep
+from tests.test_algorithm import food, symptom
+from tests.test_algorithm_vectorized import SCENARIOS, _random_history
+
+WINDOWS = [0.5, 2, 4, 8, 24]
+
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_sweep_engine_matches_reference_on_fixture_scenarios(name):
+    food_logs, symptom_logs, window = SCENARIOS[name]
+    assert get_analysis_sweep(food_logs, symptom_logs, window) == get_analysis(food_logs, symptom_logs, window)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_every_window_matches_a_separate_run(seed):
+    food_logs, symptom_logs = _random_history(seed)
+
+    swept = get_analysis_multi_window(food_logs, symptom_logs, WINDOWS)
+
+    assert list(swept) == WINDOWS
+    for window in WINDOWS:
+        assert swept[window] == get_analysis(food_logs, symptom_logs, window)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_window_stats_match_full_history(seed):
+    food_logs, symptom_logs = _random_history(seed)
+
+    swept = window_stats_sweep(food_logs, symptom_logs, WINDOWS)
+
+    for window in WINDOWS:
+        assert swept[window] == window_stats_from_history(food_logs, symptom_logs, window)
+
+
+def test_window_boundaries_are_half_open():
+    # Window for the 10:00 symptom at 2h is [08:00, 10:00): 08:00 is in, 10:00 is not.
+    food_logs = [food("2024-01-01T08:00", ["edge"]), food("2024-01-01T10:00", ["same_time"])]
+    symptom_logs = [symptom("2024-01-01T10:00", "bloating", 4)]
+
+    swept = window_stats_sweep(food_logs, symptom_logs, [1.99, 2])
+
+    assert swept[1.99].foods_in_window == {}
+    assert swept[2].foods_in_window == {"bloating": 1}
+    assert ("bloating", "same_time") not in swept[2].exposures
+
+
+def test_duplicate_and_unsorted_windows_are_normalized():
+    food_logs, symptom_logs = _random_history(0, days=5)
+    assert list(window_stats_sweep(food_logs, symptom_logs, [8, 2, 8])) == [2, 8]
+
+
+def test_empty_inputs_return_empty_windows():
+    stats = window_stats_sweep([], [symptom("2024-01-01T10:00", "pain", 3)], [2, 4])
+    assert all(not s.foods_in_window and not s.exposures for s in stats.values())
+    assert get_analysis_sweep([food("2024-01-01T08:00", ["gluten"])], [], 4) == {}
+
+
+def test_raises_for_negative_time_window():
+    with pytest.raises(ValueError, match="time_window_hours must be >= 0"):
+        window_stats_sweep([], [], [4, -1])
+
+
+def test_registered_as_engine():
+    assert get_engine("sweep") is get_analysis_sweep
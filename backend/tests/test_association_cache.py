@@ -0,0 +1,176 @@
+"""Unit tests for the association listing cache."""
+
+from uuid import uuid4
+
+import pytest
+
+from services.association_cache import AssociationCache, InMemoryCacheBackend, RedisCacheBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _loader(value: bytes):
+    calls = []
+
+    def load() -> bytes:
+        calls.append(value)
+        return value
+
+    return load, calls
+
+
+def test_read_through_counts_hits_and_misses():
+    cache = AssociationCache(InMemoryCacheBackend(maxsize=8), ttl_seconds=60)
+    load, calls = _loader(b"[]")
+
+    assert cache.get_or_load("alice", None, load) == b"[]"
+    assert cache.get_or_load("alice", None, load) == b"[]"
+
+    assert len(calls) == 1
+    info = cache.info()
+    assert (info["hits"], info["misses"], info["hit_rate"], info["size"]) == (1, 1, 0.5, 1)
+
+
+def test_symptom_filter_is_part_of_the_key():
+    cache = AssociationCache(InMemoryCacheBackend())
+    symptom_a, symptom_b = uuid4(), uuid4()
+
+    cache.get_or_load("alice", None, lambda: b"all")
+    cache.get_or_load("alice", [symptom_a], lambda: b"a")
+    cache.get_or_load("alice", [symptom_b, symptom_a], lambda: b"ba")
+
+    assert cache.get_or_load("alice", [symptom_a], lambda: b"miss") == b"a"
+    assert cache.get_or_load("alice", [], lambda: b"miss") == b"all"
+    assert cache.get_or_load("alice", [symptom_a, symptom_b], lambda: b"ab") == b"ab"
+
+
+def test_invalidate_drops_only_that_users_listings():
+    cache = AssociationCache(InMemoryCacheBackend())
+    cache.get_or_load("alice", None, lambda: b"old")
+    cache.get_or_load("bob", None, lambda: b"bob")
+
+    cache.invalidate("alice")
+
+    assert cache.get_or_load("alice", None, lambda: b"new") == b"new"
+    assert cache.get_or_load("bob", None, lambda: b"miss") == b"bob"
+    assert cache.info()["invalidations"] == 1
+
+
+def test_listing_loaded_across_an_invalidation_is_never_served():
+    cache = AssociationCache(InMemoryCacheBackend())
+
+    def load_while_a_write_commits() -> bytes:
+        cache.invalidate("alice")
+        return b"read before the write"
+
+    cache.get_or_load("alice", None, load_while_a_write_commits)
+
+    assert cache.get_or_load("alice", None, lambda: b"fresh") == b"fresh"
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = AssociationCache(InMemoryCacheBackend(clock=clock), ttl_seconds=10)
+    cache.get_or_load("alice", None, lambda: b"old")
+
+    clock.now = 9.9
+    assert cache.get_or_load("alice", None, lambda: b"miss") == b"old"
+    clock.now = 10.0
+    assert cache.get_or_load("alice", None, lambda: b"new") == b"new"
+
+
+def test_least_recently_used_listing_is_evicted():
+    cache = AssociationCache(InMemoryCacheBackend(maxsize=2))
+    cache.get_or_load("alice", None, lambda: b"alice")
+    cache.get_or_load("bob", None, lambda: b"bob")
+    cache.get_or_load("alice", None, lambda: b"miss")  # alice is now most recent
+
+    cache.get_or_load("carol", None, lambda: b"carol")
+
+    assert len(cache.backend) == 2
+    assert cache.get_or_load("alice", None, lambda: b"miss") == b"alice"
+    assert cache.get_or_load("bob", None, lambda: b"reloaded") == b"reloaded"
+
+
+def test_disabled_cache_always_loads():
+    cache = AssociationCache(enabled=False)
+    load, calls = _loader(b"[]")
+
+    cache.get_or_load("alice", None, load)
+    cache.get_or_load("alice", None, load)
+    cache.invalidate("alice")
+
+    assert len(calls) == 2
+    assert (cache.hits, cache.misses, cache.invalidations) == (0, 0, 0)
+
+
+def test_redis_backend_requires_the_redis_package():
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        with pytest.raises(RuntimeError, match=r"backend\[redis\]"):
+            RedisCacheBackend()
+    else:
+        pytest.skip("redis is installed")
+
+
+class UnreachableBackend(InMemoryCacheBackend):
+    """A backend whose server is down: every call raises one of its declared exceptions."""
+
+    exceptions = (ConnectionError,)
+
+    def _fail(self, *args, **kwargs):
+        raise ConnectionError("cache server unreachable")
+
+    get = set = generation = bump_generation = _fail
+
+    async def get_async(self, key):
+        self._fail()
+
+    async def set_async(self, key, value, ttl_seconds):
+        self._fail()
+
+    async def generation_async(self, username):
+        self._fail()
+
+
+def test_backend_errors_are_served_as_misses():
+    cache = AssociationCache(UnreachableBackend())
+    load, calls = _loader(b"[]")
+
+    assert cache.get_or_load("alice", None, load) == b"[]"
+    cache.invalidate("alice")
+
+    assert len(calls) == 1
+    info = cache.info()
+    assert (info["hits"], info["misses"], info["invalidations"], info["backend_errors"]) == (0, 1, 0, 2)
+
+
+async def test_backend_errors_are_served_as_misses_on_the_async_path():
+    cache = AssociationCache(UnreachableBackend())
+
+    async def load() -> bytes:
+        return b"[]"
+
+    assert await cache.get_or_load_async("alice", None, load) == b"[]"
+    assert (cache.misses, cache.backend_errors) == (1, 1)
+
+
+async def test_unreachable_redis_falls_back_to_the_loader_without_the_sync_client():
+    pytest.importorskip("redis")
+    backend = RedisCacheBackend("redis://127.0.0.1:1/0", timeout=0.1)
+    backend._client = None  # the async path must not make blocking calls
+    cache = AssociationCache(backend)
+
+    async def load() -> bytes:
+        return b"[]"
+
+    assert await cache.get_or_load_async("alice", None, load) == b"[]"
+    info = cache.info()
+    assert (info["misses"], info["backend_errors"], info["size"]) == (1, 1, None)
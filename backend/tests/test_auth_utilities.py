@@ -2,7 +2,15 @@
 
 from datetime import timedelta
 
-from services.auth_service import create_access_token, decode_access_token, get_password_hash, verify_password
+from passlib.context import CryptContext
+
+from services.auth_service import (
+    create_access_token,
+    decode_access_token,
+    get_password_hash,
+    verify_and_update_password,
+    verify_password,
+)
 
 
 class TestPasswordUtilities:
@@ -28,6 +36,23 @@ class TestPasswordUtilities:
         assert verify_password(password, hash1)
         assert verify_password(password, hash2)
 
+    def test_current_cost_hash_needs_no_update(self):
+        """Test a hash made at BCRYPT_ROUNDS verifies without a replacement."""
+        hashed = get_password_hash("password123")
+
+        assert verify_and_update_password("password123", hashed) == (True, None)
+        assert verify_and_update_password("wrongpassword", hashed) == (False, None)
+
+    def test_other_cost_hash_is_replaced(self):
+        """Test a hash made at another cost verifies and comes back rehashed at BCRYPT_ROUNDS."""
+        old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("password123")
+
+        valid, new_hash = verify_and_update_password("password123", old_hash)
+
+        assert valid
+        assert new_hash.startswith("$2b$04$")
+        assert verify_password("password123", new_hash)
+
 
 class TestJWTUtilities:
     """Test JWT token creation and decoding."""
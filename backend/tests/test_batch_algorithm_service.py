@@ -0,0 +1,78 @@
+"""Unit tests for BatchAlgorithmService."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.batch_algorithm_service import BatchAlgorithmService, BatchUserResult, run_user
+
+
+@pytest.fixture
+def db():
+    return MagicMock()
+
+
+def _run_algorithm(db, payload):
+    if payload.user_id == "broken":
+        raise RuntimeError("boom")
+    return [object()] * len(payload.user_id)
+
+
+class TestRunUser:
+    @patch("services.batch_algorithm_service.AlgorithmService")
+    def test_counts_associations_and_closes_session(self, service_cls):
+        service_cls.return_value.run_algorithm.side_effect = _run_algorithm
+        session = MagicMock()
+
+        result = run_user(lambda: session, "alice", {"time_window_hours": 6.0, "engine": "numpy"})
+
+        assert (result.username, result.associations, result.error) == ("alice", 5, None)
+        payload = service_cls.return_value.run_algorithm.call_args.args[1]
+        assert (payload.user_id, payload.time_window_hours, payload.engine) == ("alice", 6.0, "numpy")
+        session.close.assert_called_once()
+
+    @patch("services.batch_algorithm_service.AlgorithmService")
+    def test_failure_is_captured_and_rolled_back(self, service_cls):
+        service_cls.return_value.run_algorithm.side_effect = _run_algorithm
+        session = MagicMock()
+
+        result = run_user(lambda: session, "broken", {})
+
+        assert result.error == "RuntimeError: boom"
+        session.rollback.assert_called_once()
+        session.close.assert_called_once()
+
+
+class TestRunAll:
+    @patch("services.batch_algorithm_service.AlgorithmService")
+    def test_runs_every_user_in_process_and_reports_progress(self, service_cls, db):
+        service_cls.return_value.run_algorithm.side_effect = _run_algorithm
+        service = BatchAlgorithmService(database_url=None)
+        service.user_repo = MagicMock()
+        service.user_repo.list_usernames.return_value = ["alice", "bob", "broken"]
+        progress = []
+
+        summary = service.run_all(db, workers=1, progress=lambda done, total, r: progress.append((done, total, r)))
+
+        assert summary.succeeded == ["alice", "bob"]
+        assert summary.failed == {"broken": "RuntimeError: boom"}
+        assert summary.associations == 8
+        assert [(done, total) for done, total, _ in progress] == [(1, 3), (2, 3), (3, 3)]
+        assert all(isinstance(r, BatchUserResult) for _, _, r in progress)
+
+    @patch("services.batch_algorithm_service.AlgorithmService")
+    def test_explicit_usernames_skip_listing(self, service_cls, db):
+        service_cls.return_value.run_algorithm.side_effect = _run_algorithm
+        service = BatchAlgorithmService(database_url=None)
+        service.user_repo = MagicMock()
+
+        summary = service.run_all(db, usernames=["carol"], workers=1)
+
+        assert summary.succeeded == ["carol"]
+        service.user_repo.list_usernames.assert_not_called()
+
+    def test_rejects_invalid_worker_counts(self, db):
+        with pytest.raises(ValueError, match="workers must be >= 1"):
+            BatchAlgorithmService(database_url="postgresql://x").run_all(db, workers=0)
+        with pytest.raises(ValueError, match="DATABASE_URL is required"):
+            BatchAlgorithmService(database_url=None).run_all(db, workers=2)
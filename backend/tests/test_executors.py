@@ -0,0 +1,127 @@
+"""Unit tests for the bounded worker pools that keep blocking work off the event loop."""
+
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from services.executors import PoolSaturatedError, WorkerPool
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool("test", workers=1, queue_depth=1)
+    yield pool
+    pool.shutdown()
+
+
+async def _wait_until(predicate, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+async def test_returns_results_on_a_worker_thread(pool):
+    thread_name = await pool.run(lambda: threading.current_thread().name)
+
+    assert thread_name.startswith("test-pool")
+    assert await pool.run(pow, 2, exp=10) == 1024
+    assert pool.info()["completed"] == 2
+
+
+async def test_exceptions_propagate_and_count_as_failed(pool):
+    with pytest.raises(ZeroDivisionError):
+        await pool.run(lambda: 1 / 0)
+
+    info = pool.info()
+    assert (info["completed"], info["failed"], info["running"], info["queued"]) == (0, 1, 0, 0)
+
+
+async def test_rejects_beyond_workers_plus_queue_depth(pool):
+    release = threading.Event()
+    running = asyncio.ensure_future(pool.run(release.wait))
+    queued = asyncio.ensure_future(pool.run(lambda: "queued"))
+    await _wait_until(lambda: pool.info()["running"] == 1 and pool.info()["queued"] == 1)
+
+    with pytest.raises(PoolSaturatedError, match="test pool"):
+        await pool.run(lambda: "rejected")
+    release.set()
+
+    assert await asyncio.gather(running, queued) == [True, "queued"]
+    info = pool.info()
+    assert (info["submitted"], info["completed"], info["rejected"], info["max_queued"]) == (2, 2, 1, 1)
+    assert await pool.run(lambda: "admitted again") == "admitted again"
+
+
+async def test_capacity_is_held_until_abandoned_work_finishes(pool):
+    release = threading.Event()
+    abandoned = asyncio.ensure_future(pool.run(release.wait))
+    await _wait_until(lambda: pool.info()["running"] == 1)
+
+    abandoned.cancel()
+    await asyncio.sleep(0)
+    queued = asyncio.ensure_future(pool.run(lambda: "queued"))
+    await _wait_until(lambda: pool.info()["queued"] == 1)
+    with pytest.raises(PoolSaturatedError):
+        await pool.run(lambda: "rejected")
+
+    release.set()
+    assert await queued == "queued"
+
+
+async def test_context_variables_reach_the_worker(pool):
+    request_id.set("req-42")
+    assert await pool.run(request_id.get) == "req-42"
+
+
+class _Session:
+    """Stands in for a SQLAlchemy Session: records where it was opened and whether it was closed."""
+
+    def __init__(self):
+        self.thread = threading.current_thread().name
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+
+async def test_session_work_gets_its_own_session_on_the_worker(pool):
+    release = threading.Event()
+    sessions = []
+
+    def opened() -> _Session:
+        sessions.append(_Session())
+        return sessions[-1]
+
+    def work(db, suffix):
+        release.wait()
+        assert not db.closed
+        return db.thread + suffix
+
+    abandoned = asyncio.ensure_future(pool.run_in_session(opened, work, "!"))
+    await _wait_until(lambda: pool.info()["running"] == 1)
+    # A cancelled request stops waiting; its work keeps the session until it is done with it.
+    abandoned.cancel()
+    await asyncio.sleep(0)
+    assert not sessions[0].closed
+    release.set()
+    await _wait_until(lambda: sessions[0].closed)
+
+    assert sessions[0].thread.startswith("test-pool")
+    assert await pool.run_in_session(opened, work, "?") == sessions[1].thread + "?"
+    assert sessions[1].closed
+    assert pool.info()["completed"] == 2
+
+
+def test_rejects_invalid_sizes():
+    with pytest.raises(ValueError):
+        WorkerPool("bad", workers=0, queue_depth=1)
+    with pytest.raises(ValueError):
+        WorkerPool("bad", workers=1, queue_depth=-1)
@@ -0,0 +1,80 @@
+"""Unit tests for the Fisher p-value memo cache."""
+
+import random
+
+import pytest
+from scipy.stats import fisher_exact
+
+from analysis.algorithm import get_analysis
+from analysis.fisher import FisherCache, fisher_cache
+from analysis.vectorized import get_analysis_vectorized
+from tests.test_algorithm_vectorized import _random_history
+
+
+def _scipy(a, b, c, d):
+    return pytest.approx(fisher_exact([[a, b], [c, d]], alternative="greater").pvalue, rel=1e-9)
+
+
+def test_scalar_lookups_match_scipy_and_count_hits():
+    cache = FisherCache(maxsize=16)
+
+    assert cache.p_value(1, 3, 2, 10) == _scipy(1, 3, 2, 10)
+    assert cache.p_value(1, 3, 2, 10) == _scipy(1, 3, 2, 10)
+
+    assert cache.info() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "size": 1, "maxsize": 16}
+
+
+def test_batched_lookups_deduplicate_tables():
+    rng = random.Random(0)
+    tables = [[rng.randint(0, 3) for _ in range(4)] for _ in range(200)]
+    a, b, c, d = zip(*tables)
+    cache = FisherCache()
+
+    p_values = cache.p_values(a, b, c, d)
+
+    assert list(p_values) == [_scipy(*t) for t in tables]
+    distinct = len({tuple(t) for t in tables})
+    assert (cache.misses, cache.hits) == (distinct, len(tables) - distinct)
+
+    cache.p_values(a, b, c, d)
+    assert cache.misses == distinct
+
+
+def test_batched_lookups_broadcast_scalars():
+    cache = FisherCache()
+    p_values = cache.p_values([0, 1, 2], 3, [4, 3, 2], 10)
+    assert list(p_values) == [_scipy(0, 3, 4, 10), _scipy(1, 3, 3, 10), _scipy(2, 3, 2, 10)]
+    assert cache.p_values([], [], [], []).shape == (0,)
+
+
+def test_evicts_least_recently_used():
+    cache = FisherCache(maxsize=2)
+    cache.p_value(0, 1, 1, 1)
+    cache.p_value(1, 1, 1, 1)
+    cache.p_value(0, 1, 1, 1)
+    cache.p_value(2, 1, 1, 1)
+
+    assert cache.info()["size"] == 2
+    cache.p_value(0, 1, 1, 1)
+    assert cache.hits == 2
+    cache.p_values([1], [1], [1], [1])
+    assert cache.misses == 4
+
+
+def test_zero_maxsize_disables_caching():
+    cache = FisherCache(maxsize=0)
+    cache.p_value(0, 1, 1, 1)
+    cache.p_value(0, 1, 1, 1)
+    assert (cache.hits, cache.misses, cache.info()["size"]) == (0, 2, 0)
+
+
+def test_engines_share_the_process_cache():
+    fisher_cache.clear()
+    food_logs, symptom_logs = _random_history(0)
+
+    expected = get_analysis(food_logs, symptom_logs, 4)
+    misses = fisher_cache.misses
+
+    assert get_analysis_vectorized(food_logs, symptom_logs, 4) == expected
+    assert fisher_cache.misses == misses
+    assert fisher_cache.hits >= sum(len(cells) for cells in expected.values())
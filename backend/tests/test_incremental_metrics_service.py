@@ -0,0 +1,250 @@
+"""Unit tests for IncrementalMetricsService and its hooks in the log services."""
+
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, call, patch
+from uuid import uuid4
+
+import pytest
+
+from analysis.models import FoodLogEntry, SymptomLogEntry
+from services.food_log_service import FoodLogService
+from services.incremental_metrics_service import IncrementalMetricsService, food_log_entry, symptom_log_entry
+from services.symptom_log_service import SymptomLogService
+from tests.test_algorithm_service import _food_log, _symptom_log
+
+
+def _dt(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+@pytest.fixture
+def stats_repo():
+    with patch("services.incremental_metrics_service.MetricsStatsRepository") as MockRepo:
+        yield MockRepo.return_value
+
+
+@pytest.fixture
+def metrics_repo():
+    with patch("services.incremental_metrics_service.MetricsRepository") as MockRepo:
+        yield MockRepo.return_value
+
+
+# ---------------------------------------------------------------------------
+# entry helpers
+# ---------------------------------------------------------------------------
+
+
+class TestEntryHelpers:
+    def test_food_log_entry_uses_food_ingredients(self):
+        log = _food_log(ingredients=["gluten", "dairy"])
+        assert food_log_entry(log) == FoodLogEntry(timestamp=log.timestamp, ingredients=["gluten", "dairy"])
+
+    def test_food_log_entry_without_food_has_no_ingredients(self):
+        log = _food_log()
+        log.food = None
+        assert food_log_entry(log).ingredients == []
+
+    def test_symptom_log_entry_is_named_by_symptom_id(self):
+        log = _symptom_log(intensity=7)
+        entry = symptom_log_entry(log)
+        assert entry.symptom_name == str(log.symptom_id)
+        assert entry.intensity == 7
+
+
+# ---------------------------------------------------------------------------
+# IncrementalMetricsService
+# ---------------------------------------------------------------------------
+
+
+class TestSeed:
+    def test_replaces_stats_for_run_scope(self, stats_repo):
+        symptom_id = uuid4()
+        db = MagicMock()
+        IncrementalMetricsService(enabled=True).seed(
+            db,
+            username="alice",
+            time_window_hours=4.0,
+            symptom_ids={symptom_id},
+            food_logs=[FoodLogEntry(timestamp=_dt("2024-01-01T08:00"), ingredients=["gluten"])],
+            symptom_logs=[SymptomLogEntry(_dt("2024-01-01T10:00"), str(symptom_id), 5)],
+        )
+        args = stats_repo.replace_stats.call_args.args
+        assert args[:4] == ("alice", 4.0, {symptom_id}, {"gluten": 1})
+        assert args[4].foods_in_window == {str(symptom_id): 1}
+        assert args[5] == 1
+        db.commit.assert_not_called()
+
+    def test_disabled_does_nothing(self, stats_repo):
+        IncrementalMetricsService(enabled=False).seed(MagicMock(), "alice", 4.0, set(), [], [])
+        stats_repo.replace_stats.assert_not_called()
+
+
+class TestFoodLogChanged:
+    def test_untracked_user_is_a_no_op(self, stats_repo, metrics_repo):
+        stats_repo.get_tracked_windows.return_value = {}
+        entry = FoodLogEntry(timestamp=_dt("2024-01-01T08:00"), ingredients=["gluten"])
+
+        IncrementalMetricsService(enabled=True).food_log_changed(MagicMock(), "alice", None, entry)
+
+        stats_repo.apply_ingredient_totals.assert_not_called()
+        metrics_repo.upsert_metrics.assert_not_called()
+
+    def test_user_lock_is_taken_before_anything_is_read(self, stats_repo, metrics_repo):
+        stats_repo.get_tracked_windows.return_value = {}
+        entry = FoodLogEntry(timestamp=_dt("2024-01-01T08:00"), ingredients=["gluten"])
+
+        IncrementalMetricsService(enabled=True).food_log_changed(MagicMock(), "alice", None, entry)
+
+        assert stats_repo.mock_calls[0] == call.lock_user("alice")
+
+    def test_unchanged_entry_is_a_no_op(self, stats_repo):
+        entry = FoodLogEntry(timestamp=_dt("2024-01-01T08:00"), ingredients=["gluten"])
+        IncrementalMetricsService(enabled=True).food_log_changed(MagicMock(), "alice", entry, entry)
+        stats_repo.get_tracked_windows.assert_not_called()
+
+    def test_create_applies_positive_delta_and_refreshes(self, stats_repo, metrics_repo):
+        symptom_id = uuid4()
+        stats_repo.get_tracked_windows.return_value = {4.0: {symptom_id}}
+        stats_repo.get_symptom_entries_between.return_value = [
+            SymptomLogEntry(_dt("2024-01-01T10:00"), str(symptom_id), 6)
+        ]
+        stats_repo.get_food_event_total.return_value = 3
+        stats_repo.get_cell_counts.return_value = [
+            SimpleNamespace(
+                symptom_id=symptom_id,
+                ingredient="gluten",
+                exposures=1,
+                ingredient_total=2,
+                foods_in_window=1,
+                intensity_sum=6,
+                intensity_count=1,
+            )
+        ]
+        entry = FoodLogEntry(timestamp=_dt("2024-01-01T08:00"), ingredients=["gluten"])
+
+        IncrementalMetricsService(enabled=True).food_log_changed(MagicMock(), "alice", None, entry)
+
+        stats_repo.apply_food_events.assert_called_once_with("alice", 1)
+        stats_repo.apply_ingredient_totals.assert_called_once_with("alice", {"gluten": 1})
+        _, window, delta, tracked = stats_repo.apply_window_delta.call_args.args
+        assert window == 4.0
+        assert tracked == {symptom_id}
+        assert delta.foods_in_window == {str(symptom_id): 1}
+        metrics = metrics_repo.upsert_metrics.call_args.kwargs["metrics_by_ingredient"]
+        assert metrics["gluten"].exposures == 1
+        assert metrics["gluten"].trigger_rate == pytest.approx(0.5)
+        assert metrics["gluten"].average_intensity == pytest.approx(6.0)
+
+    def test_delete_applies_negative_delta(self, stats_repo, metrics_repo):
+        symptom_id = uuid4()
+        stats_repo.get_tracked_windows.return_value = {4.0: {symptom_id}}
+        stats_repo.get_symptom_entries_between.return_value = [
+            SymptomLogEntry(_dt("2024-01-01T10:00"), str(symptom_id), 6)
+        ]
+        stats_repo.get_cell_counts.return_value = []
+        entry = FoodLogEntry(timestamp=_dt("2024-01-01T08:00"), ingredients=["gluten"])
+
+        IncrementalMetricsService(enabled=True).food_log_changed(MagicMock(), "alice", entry, None)
+
+        stats_repo.apply_ingredient_totals.assert_called_once_with("alice", {"gluten": -1})
+        delta = stats_repo.apply_window_delta.call_args.args[2]
+        assert delta.foods_in_window == {str(symptom_id): -1}
+
+
+class TestSymptomLogChanged:
+    def test_untracked_symptom_is_a_no_op(self, stats_repo, metrics_repo):
+        stats_repo.get_tracked_windows.return_value = {}
+        entry = SymptomLogEntry(_dt("2024-01-01T10:00"), str(uuid4()), 5)
+
+        IncrementalMetricsService(enabled=True).symptom_log_changed(MagicMock(), "alice", uuid4(), None, entry)
+
+        stats_repo.apply_window_delta.assert_not_called()
+        metrics_repo.upsert_metrics.assert_not_called()
+
+    def test_user_lock_is_taken_before_anything_is_read(self, stats_repo, metrics_repo):
+        stats_repo.get_tracked_windows.return_value = {}
+        entry = SymptomLogEntry(_dt("2024-01-01T10:00"), str(uuid4()), 5)
+
+        IncrementalMetricsService(enabled=True).symptom_log_changed(MagicMock(), "alice", uuid4(), None, entry)
+
+        assert stats_repo.mock_calls[0] == call.lock_user("alice")
+
+    def test_create_excludes_itself_from_neighbours(self, stats_repo, metrics_repo):
+        symptom_id, log_id = uuid4(), uuid4()
+        stats_repo.get_tracked_windows.return_value = {4.0: {symptom_id}}
+        stats_repo.get_food_entries_between.return_value = [
+            FoodLogEntry(timestamp=_dt("2024-01-01T08:00"), ingredients=["gluten"])
+        ]
+        stats_repo.get_symptom_entries_between.return_value = []
+        stats_repo.get_cell_counts.return_value = []
+        entry = SymptomLogEntry(_dt("2024-01-01T10:00"), str(symptom_id), 5)
+
+        IncrementalMetricsService(enabled=True).symptom_log_changed(MagicMock(), "alice", log_id, None, entry)
+
+        assert stats_repo.get_symptom_entries_between.call_args.kwargs["exclude_log_id"] == log_id
+        delta = stats_repo.apply_window_delta.call_args.args[2]
+        assert delta.foods_in_window == {str(symptom_id): 1}
+        metrics_repo.upsert_metrics.assert_called_once()
+
+    def test_update_applies_removal_then_insertion(self, stats_repo, metrics_repo):
+        symptom_id = uuid4()
+        stats_repo.get_tracked_windows.return_value = {4.0: {symptom_id}}
+        stats_repo.get_food_entries_between.return_value = [
+            FoodLogEntry(timestamp=_dt("2024-01-01T08:00"), ingredients=["gluten"])
+        ]
+        stats_repo.get_symptom_entries_between.return_value = []
+        stats_repo.get_cell_counts.return_value = []
+        before = SymptomLogEntry(_dt("2024-01-01T10:00"), str(symptom_id), 5)
+        after = SymptomLogEntry(_dt("2024-01-01T10:00"), str(symptom_id), 8)
+
+        IncrementalMetricsService(enabled=True).symptom_log_changed(MagicMock(), "alice", uuid4(), before, after)
+
+        removal, insertion = (call.args[2] for call in stats_repo.apply_window_delta.call_args_list)
+        assert removal.exposures[(str(symptom_id), "gluten")].intensity_sum == -5
+        assert insertion.exposures[(str(symptom_id), "gluten")].intensity_sum == 8
+
+
+# ---------------------------------------------------------------------------
+# Hooks in the log services
+# ---------------------------------------------------------------------------
+
+
+class TestLogServiceHooks:
+    def test_create_food_log_notifies_incremental_metrics(self):
+        incremental = MagicMock(enabled=True)
+        service = FoodLogService(incremental_metrics=incremental)
+        created = _food_log(ingredients=["gluten"])
+        created.quantity = None
+        created.notes = None
+        created.created_at = datetime(2024, 1, 1)
+        service.food_log_repo = MagicMock()
+        service.food_log_repo.create_food_log.return_value = created
+
+        service.create_food_log(MagicMock(), MagicMock())
+
+        incremental.food_log_changed.assert_called_once()
+        _, username, before, after = incremental.food_log_changed.call_args.args
+        assert (username, before, after.ingredients) == ("alice", None, ["gluten"])
+
+    def test_disabled_incremental_metrics_skip_snapshot(self):
+        incremental = MagicMock(enabled=False)
+        service = FoodLogService(incremental_metrics=incremental)
+        service.food_log_repo = MagicMock()
+        service.food_log_repo.delete_food_log_by_id.return_value = None
+
+        assert service.delete_food_log_by_id(MagicMock(), uuid4()) is None
+        service.food_log_repo.get_food_log_by_id.assert_not_called()
+
+    def test_delete_symptom_log_notifies_with_snapshot(self):
+        incremental = MagicMock(enabled=True)
+        service = SymptomLogService(incremental_metrics=incremental)
+        existing = _symptom_log(intensity=4)
+        service.repo = MagicMock()
+        service.repo.get_by_id.return_value = existing
+        service.repo.delete.return_value = True
+
+        assert service.delete_symptom_log(MagicMock(), existing.id) is True
+
+        _, username, log_id, before, after = incremental.symptom_log_changed.call_args.args
+        assert (username, log_id, before.intensity, after) == ("alice", existing.id, 4, None)
@@ -0,0 +1,109 @@
+"""Unit tests for the access logging middleware and its queue-backed handler."""
+
+import json
+import logging
+from logging.handlers import QueueHandler
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from middleware.logging_middleware import LoggingMiddleware, configure_logging, queue_logging, stop_logging
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(LoggingMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="No such item")
+        return {"item_id": item_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def _access_lines(caplog) -> list[dict]:
+    return [json.loads(r.getMessage()) for r in caplog.records if r.name == "middleware.logging_middleware"]
+
+
+def test_one_line_per_request_with_route_template(client, caplog):
+    with caplog.at_level(logging.INFO):
+        response = client.get("/items/42")
+
+    [line] = _access_lines(caplog)
+    assert (line["method"], line["route"], line["path"]) == ("GET", "/items/{item_id}", "/items/42")
+    assert line["status"] == 200
+    assert line["response_bytes"] == len(response.content)
+    assert line["duration_ms"] >= 0
+    assert line["client"] == "testclient"
+
+
+def test_error_statuses_and_unmatched_paths(client, caplog):
+    with caplog.at_level(logging.INFO):
+        client.get("/items/0")
+        client.get("/nowhere")
+        client.get("/boom")
+
+    statuses = [(line["route"], line["status"]) for line in _access_lines(caplog)]
+    assert statuses == [("/items/{item_id}", 404), (None, 404), ("/boom", 500)]
+
+
+def test_queue_listener_writes_records_off_the_calling_thread(tmp_path):
+    file_handler = logging.FileHandler(tmp_path / "app.log")
+    queue_handler, listener = queue_logging(file_handler)
+    test_logger = logging.getLogger("tests.queue_logging")
+    test_logger.propagate = False
+    test_logger.addHandler(queue_handler)
+    try:
+        test_logger.warning("queued")
+        assert (tmp_path / "app.log").read_text() == ""  # nothing written until the listener drains the queue
+
+        listener.start()
+        listener.stop()
+    finally:
+        test_logger.removeHandler(queue_handler)
+        file_handler.close()
+
+    assert (tmp_path / "app.log").read_text() == "queued\n"
+
+
+def test_full_queue_drops_and_counts_records(tmp_path):
+    file_handler = logging.FileHandler(tmp_path / "app.log")
+    queue_handler, listener = queue_logging(file_handler, maxsize=2)
+    test_logger = logging.getLogger("tests.dropping_queue")
+    test_logger.propagate = False
+    test_logger.addHandler(queue_handler)
+    try:
+        for i in range(5):
+            test_logger.warning("record %d", i)  # returns at once even with the writer stopped
+        listener.start()
+        listener.stop()
+    finally:
+        test_logger.removeHandler(queue_handler)
+        file_handler.close()
+
+    assert queue_handler.dropped == 3
+    assert (tmp_path / "app.log").read_text() == "record 0\nrecord 1\n"
+
+
+def test_stop_logging_flushes_and_detaches_from_the_root_logger(tmp_path):
+    root = logging.getLogger()
+    level = root.level
+    configure_logging(tmp_path / "app.log")
+    try:
+        [queue_handler] = [h for h in root.handlers if isinstance(h, QueueHandler)]
+        logging.getLogger("tests.lifespan").warning("before shutdown")
+    finally:
+        stop_logging()
+        root.setLevel(level)
+
+    assert queue_handler not in root.handlers
+    assert "before shutdown" in (tmp_path / "app.log").read_text()
+    stop_logging()  # a second shutdown is a no-op
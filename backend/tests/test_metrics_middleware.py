@@ -0,0 +1,180 @@
+"""Unit tests for the request metrics and their Prometheus exposition."""
+
+import asyncio
+import math
+import re
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from middleware import metrics_middleware
+from middleware.metrics_middleware import Counter, Gauge, Histogram, MetricsMiddleware, render_metrics
+
+_NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\\n]|\\[\\"n])*)"')
+_SAMPLE = re.compile(rf"({_NAME})(?:\{{(.*)\}})? (\S+)")
+_HELP_OR_TYPE = re.compile(rf"# (HELP|TYPE) ({_NAME}) ?(.*)")
+_UNESCAPE = {"\\\\": "\\", '\\"': '"', "\\n": "\n"}
+
+
+def _unescape(value: str, escapes: str = r'\\[\\"n]') -> str:
+    return re.sub(escapes, lambda match: _UNESCAPE[match.group()], value)
+
+
+def _parse_labels(text: str) -> dict[str, str]:
+    labels, position = {}, 0
+    while position < len(text):
+        match = _LABEL.match(text, position)
+        assert match, f"bad label set {text!r} at {position}"
+        assert match.group(1) not in labels, f"repeated label {match.group(1)}"
+        labels[match.group(1)] = _unescape(match.group(2))
+        position = match.end()
+        if position < len(text):
+            assert text[position] == ",", f"bad label set {text!r} at {position}"
+            position += 1
+    return labels
+
+
+def parse_exposition(text: str) -> dict[str, dict]:
+    """
+    Parse Prometheus text format 0.0.4 strictly, failing on anything a scraper would reject.
+
+    Returns ``{family: {"help", "type", "samples": [(name, labels, value)]}}``.
+    """
+    assert text.endswith("\n")
+    families: dict[str, dict] = {}
+    current = None
+    for line in text[:-1].split("\n"):
+        if line.startswith("#"):
+            match = _HELP_OR_TYPE.fullmatch(line)
+            assert match, f"bad comment line {line!r}"
+            keyword, name, rest = match.groups()
+            family = families.setdefault(name, {"help": None, "type": None, "samples": []})
+            if keyword == "HELP":
+                assert family["help"] is None, f"second HELP for {name}"
+                family["help"] = _unescape(rest, r"\\[\\n]")  # HELP text leaves quotes unescaped
+            else:
+                assert family["type"] is None and not family["samples"], f"TYPE after samples for {name}"
+                assert rest in ("counter", "gauge", "histogram", "summary", "untyped")
+                family["type"] = rest
+            current = name
+            continue
+        match = _SAMPLE.fullmatch(line)
+        assert match, f"bad sample line {line!r}"
+        name, labels, value = match.groups()
+        suffixes = ("_bucket", "_sum", "_count") if families[current]["type"] == "histogram" else ()
+        assert name in (current, *(current + suffix for suffix in suffixes)), f"{name} outside its family"
+        assert value in ("+Inf", "-Inf", "NaN") or not math.isinf(float(value))
+        families[current]["samples"].append((name, _parse_labels(labels or ""), float(value)))
+    return families
+
+
+def assert_histograms_are_consistent(families: dict[str, dict]) -> None:
+    for name, family in families.items():
+        if family["type"] != "histogram":
+            continue
+        series: dict[tuple, list[tuple[float, float]]] = {}
+        counts = {}
+        for sample, labels, value in family["samples"]:
+            key = tuple(sorted((k, v) for k, v in labels.items() if k != "le"))
+            if sample == name + "_bucket":
+                series.setdefault(key, []).append((float(labels["le"]), value))
+            elif sample == name + "_count":
+                counts[key] = value
+        for key, buckets in series.items():
+            assert buckets == sorted(buckets), f"{name}{key} buckets are not cumulative"
+            assert buckets[-1][0] == math.inf and buckets[-1][1] == counts[key]
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, '/a"b')
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a\\"b",le="1"} 3',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a\\"b"} 3.65',
+        'latency_seconds_count{route="/a\\"b"} 4',
+    ]
+
+
+def test_unlabelled_counter_starts_at_zero():
+    counter = Counter("things_total", "Things.")
+
+    assert counter.render()[-1] == "things_total 0"
+    counter.inc(amount=2.5)
+    assert counter.render()[-1] == "things_total 2.5"
+
+
+def test_exposition_parses_back_with_awkward_labels_and_help():
+    route = 'C:\\dir\\"quoted"\nnext line'
+    counter = Counter("odd_total", 'Help with a \\ backslash,\na line feed and "quotes".', ("route",))
+    counter.inc(route)
+    gauge = Gauge("odd_gauge", "A gauge that went negative.", ("route",))
+    gauge.dec(route)
+    histogram = Histogram("odd_seconds", "Odd latency.", ("route",), buckets=(0.5, 1.0))
+    for value in (0.1, 0.7, math.inf):
+        histogram.observe(value, route)
+    text = "\n".join(counter.render() + gauge.render() + histogram.render()) + "\n"
+
+    families = parse_exposition(text)
+
+    assert families["odd_total"]["help"] == 'Help with a \\ backslash,\na line feed and "quotes".'
+    assert families["odd_total"]["samples"] == [("odd_total", {"route": route}, 1.0)]
+    assert families["odd_gauge"]["samples"] == [("odd_gauge", {"route": route}, -1.0)]
+    assert families["odd_seconds"]["samples"][-2:] == [
+        ("odd_seconds_sum", {"route": route}, math.inf),
+        ("odd_seconds_count", {"route": route}, 3.0),
+    ]
+    assert_histograms_are_consistent(families)
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics-test/{item_id}")
+    async def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="No such item")
+        in_flight = metrics_middleware.requests_in_flight.value("GET")
+        return {"item_id": item_id, "in_flight": in_flight}
+
+    @app.get("/metrics-test-boom")
+    async def boom():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_requests_are_counted_by_route_template_and_status(client):
+    route = "/metrics-test/{item_id}"
+    before = metrics_middleware.request_duration.count("GET", route)
+
+    in_flight = client.get("/metrics-test/1").json()["in_flight"]
+    client.get("/metrics-test/2")
+    client.get("/metrics-test/0")
+    client.get("/metrics-test-boom")
+    client.get("/no-such-route")
+
+    assert in_flight >= 1
+    assert metrics_middleware.requests_in_flight.value("GET") == 0
+    assert metrics_middleware.request_duration.count("GET", route) == before + 3
+    assert metrics_middleware.requests_total.value("GET", route, "404") >= 1
+    assert metrics_middleware.requests_total.value("GET", "/metrics-test-boom", "500") >= 1
+    assert metrics_middleware.requests_total.value("GET", "unmatched", "404") >= 1
+    exposition = render_metrics()
+    assert 'http_request_duration_seconds_count{method="GET",route="/metrics-test/{item_id}"}' in exposition
+    assert "/no-such-route" not in exposition
+    families = parse_exposition(exposition)
+    assert_histograms_are_consistent(families)
+    assert {"method": "GET", "route": route, "status": "404"} in [
+        labels for _, labels, _ in families["http_requests_total"]["samples"]
+    ]
@@ -0,0 +1,132 @@
+"""Unit tests for the token principal cache in front of get_current_user."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from schemas.user import UserResponse
+from services.principal_cache import PrincipalCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _user(username: str, weight: float | None = None) -> UserResponse:
+    return UserResponse(
+        username=username, email=f"{username}@example.com", weight=weight, created_at=datetime.now(timezone.utc)
+    )
+
+
+def test_read_through_counts_hits_and_misses():
+    cache = PrincipalCache(ttl_seconds=60)
+    calls = []
+
+    def load():
+        calls.append("alice")
+        return _user("alice")
+
+    assert cache.get_or_load("token-a", "alice", load).username == "alice"
+    assert cache.get_or_load("token-a", "alice", load).username == "alice"
+
+    assert len(calls) == 1
+    info = cache.info()
+    assert (info["hits"], info["misses"], info["hit_rate"], info["size"]) == (1, 1, 0.5, 1)
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = PrincipalCache(ttl_seconds=30, clock=clock)
+    cache.get_or_load("token-a", "alice", lambda: _user("alice", 1.0))
+
+    clock.now = 30.0
+
+    assert cache.get_or_load("token-a", "alice", lambda: _user("alice", 2.0)).weight == 2.0
+
+
+def test_missing_users_are_not_cached():
+    cache = PrincipalCache(ttl_seconds=60)
+
+    assert cache.get_or_load("token-a", "ghost", lambda: None) is None
+    assert cache.get_or_load("token-a", "ghost", lambda: _user("ghost")).username == "ghost"
+
+
+def test_invalidate_drops_every_token_of_that_user_only():
+    cache = PrincipalCache(ttl_seconds=60)
+    cache.get_or_load("token-a1", "alice", lambda: _user("alice", 1.0))
+    cache.get_or_load("token-a2", "alice", lambda: _user("alice", 1.0))
+    cache.get_or_load("token-b", "bob", lambda: _user("bob", 1.0))
+
+    cache.invalidate("alice")
+
+    assert cache.get_or_load("token-a1", "alice", lambda: _user("alice", 2.0)).weight == 2.0
+    assert cache.get_or_load("token-a2", "alice", lambda: _user("alice", 2.0)).weight == 2.0
+    assert cache.get_or_load("token-b", "bob", lambda: _user("bob", 2.0)).weight == 1.0
+    assert cache.info()["invalidations"] == 1
+
+
+def test_a_load_that_raced_an_update_is_not_stored():
+    cache = PrincipalCache(ttl_seconds=60)
+
+    def stale_load():
+        cache.invalidate("alice")  # the update commits while the old row is being read
+        return _user("alice", 1.0)
+
+    assert cache.get_or_load("token-a", "alice", stale_load).weight == 1.0
+    assert cache.get_or_load("token-a", "alice", lambda: _user("alice", 2.0)).weight == 2.0
+
+
+def test_invalidated_users_leave_no_bookkeeping_behind():
+    cache = PrincipalCache(maxsize=4, ttl_seconds=60)
+    for i in range(1000):
+        cache.get_or_load(f"token-{i}", f"user-{i}", lambda: _user(f"user-{i}"))
+        cache.invalidate(f"user-{i}")
+
+    def failing_load():
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("token-a", "alice", failing_load)
+    cache.get_or_load("token-b", "bob", lambda: None)
+
+    assert (cache._tokens, cache._loads) == ({}, {})
+    assert cache.get_or_load("token-a", "alice", lambda: _user("alice")).username == "alice"
+    assert cache.get_or_load("token-a", "alice", lambda: None).username == "alice"
+
+
+def test_least_recently_used_tokens_are_evicted():
+    cache = PrincipalCache(maxsize=2, ttl_seconds=60)
+    cache.get_or_load("token-a", "alice", lambda: _user("alice"))
+    cache.get_or_load("token-b", "bob", lambda: _user("bob"))
+    cache.get_or_load("token-a", "alice", lambda: _user("alice"))
+
+    cache.get_or_load("token-c", "carol", lambda: _user("carol"))
+
+    assert cache.info()["size"] == 2
+    assert cache.get_or_load("token-b", "bob", lambda: None) is None
+    cache.invalidate("bob")  # its evicted token is no longer indexed
+
+
+def test_zero_ttl_disables_caching():
+    cache = PrincipalCache(ttl_seconds=0)
+
+    cache.get_or_load("token-a", "alice", lambda: _user("alice", 1.0))
+
+    assert cache.get_or_load("token-a", "alice", lambda: _user("alice", 2.0)).weight == 2.0
+    info = cache.info()
+    assert (info["enabled"], info["hits"], info["misses"], info["size"]) == (False, 0, 0, 0)
+
+
+async def test_async_loader():
+    cache = PrincipalCache(ttl_seconds=60)
+
+    async def load():
+        return _user("alice")
+
+    assert (await cache.get_or_load_async("token-a", "alice", load)).username == "alice"
+    assert (await cache.get_or_load_async("token-a", "alice", load)).username == "alice"
+    assert (cache.hits, cache.misses) == (1, 1)